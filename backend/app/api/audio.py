@@ -0,0 +1,43 @@
+"""
+Audio API endpoints
+저장된 음성 파일 제공 (Range/ETag/영구 캐시)
+"""
+from fastapi import APIRouter, HTTPException, Request
+
+from app.core.config import settings
+from app.core.http_cache import file_response
+from app.services.audio_store import audio_store
+
+router = APIRouter()
+
+
+@router.get("/{key}")
+async def get_audio(key: str, request: Request):
+    """
+    저장된 음성 파일 다운로드
+
+    Keys are content hashes, so responses are immutable and can be cached
+    by any browser, proxy or CDN. Supports Range requests for seeking.
+    """
+    return await _serve(key, request)
+
+
+@router.head("/{key}", include_in_schema=False)
+async def head_audio(key: str, request: Request):
+    """저장된 음성 파일 메타데이터 (GET과 같은 헤더, 본문 없음)"""
+    return await _serve(key, request)
+
+
+async def _serve(key: str, request: Request):
+    info = await audio_store.head(key)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+
+    return file_response(
+        request,
+        audio_store.local_path(key),
+        etag=info.etag,
+        max_age=settings.AUDIO_CACHE_MAX_AGE_SECONDS,
+        media_type=info.content_type,
+        immutable=True,
+    )
@@ -2,11 +2,29 @@
 Conversation API endpoints
 대화 세션 관리 및 LLM 응답 생성
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Header, Query
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-
+import asyncio
+
+from app.api.schemas import (
+    ConversationEvaluation,
+    ConversationReply,
+    JobAccepted,
+    SuccessResponse,
+    TextAnalysis,
+    VoiceConversationTurn,
+)
+from app.core.config import settings
+from app.core.responses import replayable_response, success_response
+from app.api.uploads import read_audio_upload
 from app.services.llm_service import llm_service
+from app.services.audio_store import audio_store
+from app.services.evaluation_jobs import EVALUATE_CONVERSATION
+from app.services.idempotency import IdempotencyConflictError, fingerprint, idempotency_store
+from app.services.job_queue import SUCCEEDED, QueueFullError, job_queue
+from app.services.reply_bank import reply_bank
+from app.services.speculative_prefetch import speculative_prefetch
 from app.services.stt_service import stt_service
 from app.services.tts_service import tts_service
 
@@ -35,9 +53,13 @@ class VoiceConversationRequest(BaseModel):
 class EvaluationRequest(BaseModel):
     conversation_history: List[Message]
     learning_goals: Optional[List[str]] = None
+    user_id: Optional[int] = None
+    session_id: Optional[int] = None
+    scenario: str = "general"
+    language_code: str = "km-KH"
 
 
-@router.post("/send-message")
+@router.post("/send-message", response_model=SuccessResponse[ConversationReply])
 async def send_message(request: ConversationRequest):
     """
     텍스트 메시지 전송 및 AI 응답 받기
@@ -53,28 +75,41 @@ async def send_message(request: ConversationRequest):
             for msg in request.conversation_history
         ]
 
+        # Use the prefetched reply when the input matches a predicted phrase
+        llm_input = speculative_prefetch.resolve(
+            request.scenario, request.language, context, request.user_input
+        )
+
         # Generate AI response
         response = await llm_service.generate_response(
-            user_input=request.user_input,
+            user_input=llm_input,
             conversation_context=context,
             scenario=request.scenario,
             language=request.language,
         )
 
-        return {
-            "success": True,
-            "data": response,
-        }
+        speculative_prefetch.schedule(
+            request.scenario,
+            request.language,
+            _get_language_code(request.language),
+            context + [
+                {"role": "user", "content": request.user_input},
+                {"role": "assistant", "content": response.get("response_text", "")},
+            ],
+        )
+
+        return success_response(response)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/voice-conversation")
+@router.post("/voice-conversation", response_model=SuccessResponse[VoiceConversationTurn])
 async def voice_conversation(
     audio: UploadFile = File(...),
     scenario: str = "general",
     language_code: str = "km-KH",
+    idempotency_key: Optional[str] = Header(None, max_length=255),
 ):
     """
     음성 대화 - 음성을 받아서 텍스트 응답과 음성 응답을 모두 반환
@@ -84,45 +119,57 @@ async def voice_conversation(
     2. STT: Convert to text
     3. LLM: Generate response
     4. Return both text and audio response
+
+    A retried upload (same Idempotency-Key, or the same audio and
+    parameters) joins the original request or replays its result.
     """
     try:
-        # Step 1: Transcribe user's speech
-        audio_content = await audio.read()
-        transcription = await stt_service.transcribe_audio(
-            audio_content=audio_content,
-            language_code=language_code,
-        )
+        upload = await read_audio_upload(audio)
 
-        if not transcription["transcript"]:
-            raise HTTPException(
-                status_code=400,
-                detail="No speech detected in audio",
+        async def run_turn() -> Dict[str, Any]:
+            # Step 1: Transcribe user's speech
+            transcription = await stt_service.transcribe_audio(
+                audio_content=upload.content,
+                language_code=language_code,
             )
 
-        user_text = transcription["transcript"]
-
-        # Step 2: Generate AI response
-        ai_response = await llm_service.generate_response(
-            user_input=user_text,
-            conversation_context=[],  # Can be extended to include history
-            scenario=scenario,
-            language=_get_language_name(language_code),
-        )
-
-        # Step 3: Convert AI response to speech
-        response_text = ai_response.get("response_text", "")
-        audio_response = await tts_service.synthesize_speech(
-            text=response_text,
-            language_code=language_code,
-        )
-
-        # Encode audio as base64 for JSON response
-        import base64
-        audio_base64 = base64.b64encode(audio_response).decode('utf-8')
+            if not transcription["transcript"]:
+                raise HTTPException(
+                    status_code=400,
+                    detail="No speech detected in audio",
+                )
+
+            user_text = transcription["transcript"]
+
+            # Step 2: Generate AI response
+            language = _get_language_name(language_code)
+            ai_response = await llm_service.generate_response(
+                user_input=speculative_prefetch.resolve(scenario, language, [], user_text),
+                conversation_context=[],  # Can be extended to include history
+                scenario=scenario,
+                language=language,
+            )
 
-        return {
-            "success": True,
-            "data": {
+            # Step 3: Convert AI response to speech (banked replies carry their audio)
+            response_text = ai_response.get("response_text", "")
+            audio_response = None
+            if ai_response.get("source") == "reply_bank":
+                audio_response = await reply_bank.audio(ai_response["bank_entry_id"])
+            if audio_response is None:
+                audio_response = await tts_service.synthesize_speech(
+                    text=response_text,
+                    language_code=language_code,
+                )
+
+            # Voice turns carry no history, so the next turn starts from the same state
+            speculative_prefetch.schedule(scenario, language, language_code, [])
+
+            # Encode audio as base64 for JSON response, and keep it for replay
+            import base64
+            audio_base64 = base64.b64encode(audio_response).decode('utf-8')
+            stored = await audio_store.put(audio_response, "audio/mpeg")
+
+            return {
                 "user_input": {
                     "transcript": user_text,
                     "confidence": transcription["confidence"],
@@ -132,48 +179,86 @@ async def voice_conversation(
                     "translation_kr": ai_response.get("response_translation_kr", ""),
                     "key_phrases": ai_response.get("key_phrases", []),
                     "cultural_note": ai_response.get("cultural_note", ""),
+                    "phrase_annotations": ai_response.get("phrase_annotations", []),
                     "audio": audio_base64,  # Base64 encoded MP3
+                    "audio_url": audio_store.url(stored.key),
                 },
-            },
-        }
+            }
 
+        result, replayed = await idempotency_store.run(
+            "voice-conversation",
+            idempotency_key,
+            fingerprint(upload.content, scenario, language_code),
+            run_turn,
+        )
+        return replayable_response(result, replayed)
+
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/evaluate")
+@router.post("/evaluate", response_model=SuccessResponse[ConversationEvaluation])
 async def evaluate_conversation(request: EvaluationRequest):
     """
-    대화 세션 평가
+    대화 세션 평가 (결과가 나올 때까지 대기)
 
     - **conversation_history**: 전체 대화 기록
     - **learning_goals**: 학습 목표 (선택)
+    - **user_id**: 사용자 ID (선택, 지정하면 학습 통계에 반영)
+
+    Runs on the evaluation job pool at the highest priority; use
+    /evaluations to get a job id back immediately instead.
     """
     try:
-        # Convert Message objects to dicts
-        history = [
-            {"role": msg.role, "content": msg.content}
-            for msg in request.conversation_history
-        ]
+        job = await job_queue.submit(EVALUATE_CONVERSATION, request.model_dump(), priority=0)
+        job = await job_queue.wait(job["id"], timeout=settings.JOB_SYNC_TIMEOUT_SECONDS)
 
-        # Evaluate conversation
-        evaluation = await llm_service.evaluate_conversation(
-            conversation_history=history,
-            learning_goals=request.learning_goals,
-        )
+        if job["status"] != SUCCEEDED:
+            raise HTTPException(status_code=500, detail=job.get("error") or "Evaluation failed")
 
-        return {
-            "success": True,
-            "data": evaluation,
-        }
+        return success_response(job["result"])
 
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Evaluation is still running; poll /api/v1/jobs")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/analyze-text")
+@router.post("/evaluations", status_code=202, response_model=SuccessResponse[JobAccepted])
+async def submit_evaluation(request: EvaluationRequest, priority: int = Query(5, ge=0, le=9)):
+    """
+    대화 세션 평가 작업 등록 (즉시 작업 ID 반환)
+
+    - **priority**: 0(가장 높음) - 9
+
+    Poll GET /api/v1/jobs/{job_id} or stream GET /api/v1/jobs/{job_id}/events.
+    Submitting the same session again returns the same job.
+    """
+    try:
+        job = await job_queue.submit(EVALUATE_CONVERSATION, request.model_dump(), priority=priority)
+
+        return success_response({
+            "job_id": job["id"],
+            "status": job["status"],
+            "status_url": f"/api/v1/jobs/{job['id']}",
+            "events_url": f"/api/v1/jobs/{job['id']}/events",
+        }, status_code=202)
+
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/analyze-text", response_model=SuccessResponse[TextAnalysis])
 async def analyze_text(
     text: str,
     expected_text: Optional[str] = None,
@@ -192,10 +277,7 @@ async def analyze_text(
             language=language,
         )
 
-        return {
-            "success": True,
-            "data": analysis,
-        }
+        return success_response(analysis)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -209,3 +291,13 @@ def _get_language_name(language_code: str) -> str:
         "vi-VN": "Vietnamese",
     }
     return language_map.get(language_code, "Khmer")
+
+
+def _get_language_code(language: str) -> str:
+    """Map language name to language code"""
+    code_map = {
+        "Khmer": "km-KH",
+        "Lao": "lo-LA",
+        "Vietnamese": "vi-VN",
+    }
+    return code_map.get(language, "km-KH")
@@ -0,0 +1,75 @@
+"""
+Jobs API endpoints
+백그라운드 작업 상태 조회 (폴링 / SSE)
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+import asyncio
+import orjson
+import time
+
+from app.api.schemas import JobRecord, SuccessResponse
+from app.core.config import settings
+from app.core.responses import success_response
+from app.services.job_queue import TERMINAL_STATUSES, job_queue
+
+router = APIRouter()
+
+# Comment line sent while nothing changes, so proxies keep the stream open
+SSE_HEARTBEAT_SECONDS = 15
+
+
+@router.get("/{job_id}", response_model=SuccessResponse[JobRecord])
+async def get_job(job_id: str):
+    """
+    작업 상태 조회 (폴링)
+
+    - **job_id**: 작업 ID
+
+    status: queued, running, succeeded, failed (결과는 succeeded일 때 result에 포함)
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+    return success_response(job)
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    작업 상태 스트림 (Server-Sent Events)
+
+    Sends a `status` event whenever the status changes; the last event
+    carries the result and the stream closes.
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+    async def events():
+        last_status = None
+        last_sent = time.monotonic()
+        record = job
+        while True:
+            if record is None:
+                yield b"event: error\ndata: {\"detail\": \"Job expired\"}\n\n"
+                return
+            if record["status"] != last_status:
+                last_status = record["status"]
+                last_sent = time.monotonic()
+                yield b"event: status\ndata: " + orjson.dumps(record) + b"\n\n"
+                if last_status in TERMINAL_STATUSES:
+                    return
+            elif time.monotonic() - last_sent >= SSE_HEARTBEAT_SECONDS:
+                last_sent = time.monotonic()
+                yield b": heartbeat\n\n"
+
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+            record = await job_queue.get(job_id)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
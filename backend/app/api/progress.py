@@ -0,0 +1,29 @@
+"""
+Progress API endpoints
+학습 진도 대시보드
+"""
+from fastapi import APIRouter, HTTPException
+
+from app.api.schemas import ProgressSummary, SuccessResponse
+from app.core.responses import success_response
+from app.services.progress_service import progress_service
+
+router = APIRouter()
+
+
+@router.get("/summary", response_model=SuccessResponse[ProgressSummary])
+async def get_progress_summary(user_id: int):
+    """
+    학습 통계 요약 (전체 및 시나리오별)
+
+    - **user_id**: 사용자 ID
+
+    평균/최고 점수, 연습 횟수, 연속 학습일, 약한 단어를 반환합니다.
+    """
+    try:
+        summary = await progress_service.get_summary(user_id)
+
+        return success_response(summary)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,43 @@
+"""
+Review API endpoints
+간격 반복 복습 일정 조회
+"""
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from app.api.schemas import DueReviews, SuccessResponse
+from app.core.config import settings
+from app.core.responses import success_response
+from app.services.review_scheduler import review_scheduler
+
+router = APIRouter()
+
+
+@router.get("/due", response_model=SuccessResponse[DueReviews])
+async def get_due_reviews(
+    user_id: int,
+    limit: int = Query(20, ge=1),
+    language_code: Optional[str] = None,
+):
+    """
+    복습할 단어 목록 (복습 예정 시각 순)
+
+    - **user_id**: 사용자 ID
+    - **limit**: 최대 개수
+    - **language_code**: 언어 코드 (선택)
+    """
+    try:
+        items = await review_scheduler.get_due(
+            user_id=user_id,
+            limit=min(limit, settings.REVIEW_DUE_MAX_LIMIT),
+            language_code=language_code,
+        )
+
+        return success_response({
+            "user_id": user_id,
+            "items": items,
+            "total": len(items),
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,178 @@
+"""
+API response models
+응답 스키마 (OpenAPI 문서용)
+
+Routes return pre-serialized responses (see app.core.responses), so these
+models document the payloads without being validated on every request.
+Extra keys are allowed; services may add fields without breaking docs.
+"""
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class ResponseModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+class SuccessResponse(BaseModel, Generic[T]):
+    success: bool = True
+    data: T
+
+
+# Voice
+
+class Transcription(ResponseModel):
+    transcript: str
+    confidence: float
+    words: List[Dict[str, Any]] = []
+    language: Optional[str] = None
+
+
+class LongTranscription(Transcription):
+    duration: float
+    chunks: List[Dict[str, Any]]
+
+
+class PronunciationEvaluation(ResponseModel):
+    overall_score: float
+    stt_confidence: Optional[float] = None
+    similarity_score: Optional[float] = None
+    transcription: Optional[str] = None
+    expected_text: Optional[str] = None
+    word_analysis: List[Dict[str, Any]] = []
+    alignment: List[Dict[str, Any]] = []
+    llm_feedback: Dict[str, Any] = {}
+    pronunciation_feedback: str = ""
+    suggestions: List[str] = []
+    feedback_source: Optional[str] = None  # "local", "llm" or "degraded" (scored locally under overload)
+    prosody: Optional[Dict[str, Any]] = None  # pitch/energy/rate analysis (vi-VN, lo-LA)
+    grade: Optional[str] = None
+
+
+class PronunciationBatch(ResponseModel):
+    results: List[PronunciationEvaluation]
+    total: int
+
+
+class VoiceList(ResponseModel):
+    language_code: str
+    voices: List[Dict[str, Any]]
+    default_voices: Dict[str, Optional[str]] = {}  # voice used per gender
+
+
+class StoredAudio(ResponseModel):
+    audio_id: str
+    url: str
+    size: int
+
+
+class SynthesizedClip(ResponseModel):
+    text: str
+    audio: str  # Base64 encoded MP3
+
+
+class SynthesizedBatch(ResponseModel):
+    clips: List[SynthesizedClip]
+    total: int
+
+
+# Conversation
+
+class ConversationReply(ResponseModel):
+    response_text: str
+    response_translation_kr: str = ""
+    key_phrases: List[str] = []
+    cultural_note: str = ""
+    phrase_annotations: List[Dict[str, str]] = []  # known phrases with Korean and romanization
+    phrase_coverage: Optional[float] = None
+    source: Optional[str] = None  # "reply_bank" when served while Gemini is unavailable
+    bank_entry_id: Optional[int] = None
+
+
+class VoiceConversationTurn(ResponseModel):
+    user_input: Dict[str, Any]
+    ai_response: Dict[str, Any]
+
+
+class ConversationEvaluation(ResponseModel):
+    overall_score: int
+    fluency_score: int
+    vocabulary_score: int
+    grammar_score: int
+    strengths: List[str]
+    areas_for_improvement: List[str]
+    recommended_next_steps: List[str]
+    encouraging_message: str
+
+
+class TextAnalysis(ResponseModel):
+    accuracy_score: int
+    pronunciation_feedback: str
+    grammar_feedback: str = ""
+    naturalness_score: int
+    suggestions: List[str]
+    correct_version: str = ""
+
+
+# Jobs
+
+class JobAccepted(ResponseModel):
+    job_id: str
+    status: str
+    status_url: str
+    events_url: str
+
+
+class JobRecord(ResponseModel):
+    id: str
+    kind: str
+    status: str  # queued, running, succeeded, failed
+    priority: int
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+# Scenarios
+
+class ScenarioStart(ResponseModel):
+    scenario: str
+    initial_message: str
+    scenario_name: str
+    tips: str
+
+
+class ScenarioPackManifest(ResponseModel):
+    format: int
+    scenario: str
+    version: str
+    content_version: str
+    language_code: str
+    files: Dict[str, Dict[str, Any]]  # path -> {"sha256", "size"}
+    audio: Dict[str, str]  # spoken text -> audio file path
+    missing_audio: List[str] = []
+
+
+class PhrasePractice(ResponseModel):
+    scenario: str
+    phrase: Dict[str, str]
+    instructions: str
+    tips: List[str]
+
+
+# Learning progress
+
+class DueReviews(ResponseModel):
+    user_id: int
+    items: List[Dict[str, Any]]
+    total: int
+
+
+class ProgressSummary(ResponseModel):
+    user_id: int
+    overall: Dict[str, Any]
+    scenarios: Dict[str, Dict[str, Any]]
@@ -0,0 +1,68 @@
+"""
+Audio upload reading
+업로드 음성을 청크 단위로 읽으며 크기/길이 검증
+"""
+from fastapi import HTTPException, UploadFile
+from app.core.config import settings
+from app.services.audio_segmenter import PCMStreamAnalyzer
+from typing import List, Optional
+
+
+class AudioUpload:
+    """Upload content plus what was learned about it while streaming"""
+
+    def __init__(self, content: bytes, analyzer: PCMStreamAnalyzer):
+        self.content = content
+        self.analyzer = analyzer
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.analyzer.duration_seconds
+
+
+async def read_audio_upload(
+    upload: UploadFile,
+    max_seconds: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+) -> AudioUpload:
+    """
+    Read an uploaded audio file in chunks, rejecting it as soon as it is too big
+
+    Size and duration are checked after every chunk, so an oversized upload
+    is never read completely. Chunks are also fed to the stream analyzer
+    (WAV header and VAD frame energies). The chunks are joined once at the
+    end; later stages slice the result through memoryviews.
+
+    Raises:
+        HTTPException(413): if the upload exceeds the size or duration limit
+    """
+    max_seconds = max_seconds or settings.MAX_AUDIO_DURATION_SECONDS
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    analyzer = PCMStreamAnalyzer(settings.AUDIO_SAMPLE_RATE)
+    chunks: List[bytes] = []
+
+    try:
+        while True:
+            chunk = await upload.read(settings.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            analyzer.feed(chunk)
+            chunks.append(chunk)
+
+            if analyzer.total_bytes > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Audio file exceeds {max_bytes} bytes",
+                )
+            if analyzer.duration_seconds > max_seconds:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Audio is longer than {max_seconds:.0f} seconds",
+                )
+    except ValueError as e:
+        # Unsupported WAV format detected from the header
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await upload.close()
+
+    return AudioUpload(b"".join(chunks), analyzer)
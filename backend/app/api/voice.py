@@ -2,15 +2,33 @@
 Voice API endpoints
 음성 녹음, STT, TTS, 발음 평가
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, List, Optional
+import base64
 import io
 
+from app.api.schemas import (
+    LongTranscription,
+    PronunciationBatch,
+    PronunciationEvaluation,
+    StoredAudio,
+    SuccessResponse,
+    SynthesizedBatch,
+    Transcription,
+    VoiceList,
+)
+from app.core.config import settings
+from app.core.responses import replayable_response, success_response
+from app.api.uploads import read_audio_upload
+from app.services.audio_store import audio_store
+from app.services.idempotency import IdempotencyConflictError, fingerprint, idempotency_store
 from app.services.stt_service import stt_service
 from app.services.tts_service import tts_service
 from app.services.pronunciation_service import pronunciation_service
+from app.services.review_scheduler import review_scheduler
+from app.services.progress_service import progress_service
 
 router = APIRouter()
 
@@ -20,6 +38,15 @@ class TTSRequest(BaseModel):
     language_code: str = "km-KH"
     voice_gender: str = "NEUTRAL"
     speaking_rate: float = 1.0
+    voice_name: Optional[str] = None  # voice name or type (Standard, Wavenet, ...)
+
+
+class TTSBatchRequest(BaseModel):
+    texts: List[str]
+    language_code: str = "km-KH"
+    voice_gender: str = "NEUTRAL"
+    speaking_rate: float = 1.0
+    voice_name: Optional[str] = None
 
 
 class PronunciationRequest(BaseModel):
@@ -27,7 +54,7 @@ class PronunciationRequest(BaseModel):
     language_code: str = "km-KH"
 
 
-@router.post("/transcribe")
+@router.post("/transcribe", response_model=SuccessResponse[Transcription])
 async def transcribe_audio(
     audio: UploadFile = File(...),
     language_code: str = "km-KH",
@@ -38,20 +65,47 @@ async def transcribe_audio(
     - **audio**: 음성 파일 (WAV, MP3, etc.)
     - **language_code**: 언어 코드 (km-KH, lo-LA, vi-VN)
     """
-    try:
-        # Read audio file
-        audio_content = await audio.read()
+    # Read audio file (size/duration validated while streaming)
+    upload = await read_audio_upload(audio)
 
+    try:
         # Transcribe
         result = await stt_service.transcribe_audio(
-            audio_content=audio_content,
+            audio_content=upload.content,
             language_code=language_code,
         )
 
-        return {
-            "success": True,
-            "data": result,
-        }
+        return success_response(result)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/transcribe-long", response_model=SuccessResponse[LongTranscription])
+async def transcribe_long_audio(
+    audio: UploadFile = File(...),
+    language_code: str = "km-KH",
+):
+    """
+    긴 음성을 텍스트로 변환 (읽기 연습, 최대 5분)
+
+    - **audio**: LINEAR16 음성 파일 (WAV 또는 raw PCM)
+    - **language_code**: 언어 코드 (km-KH, lo-LA, vi-VN)
+    """
+    upload = await read_audio_upload(
+        audio,
+        max_seconds=settings.LONG_AUDIO_MAX_SECONDS,
+        max_bytes=settings.MAX_REQUEST_BODY_BYTES,
+    )
+
+    try:
+        result = await stt_service.transcribe_long_audio(
+            audio_content=upload.content,
+            language_code=language_code,
+            frame_energies=upload.analyzer.frame_energies(),
+        )
+
+        return success_response(result)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -71,6 +125,7 @@ async def synthesize_speech(request: TTSRequest):
             language_code=request.language_code,
             voice_gender=request.voice_gender,
             speaking_rate=request.speaking_rate,
+            voice_name=request.voice_name,
         )
 
         # Return as streaming audio
@@ -86,11 +141,77 @@ async def synthesize_speech(request: TTSRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/evaluate-pronunciation")
+@router.post("/synthesize-url", response_model=SuccessResponse[StoredAudio])
+async def synthesize_speech_url(request: TTSRequest):
+    """
+    텍스트를 음성으로 변환하고 저장된 파일 URL 반환
+
+    The audio is kept in the audio store; its URL serves it with Range
+    support and immutable caching.
+    """
+    try:
+        audio_content = await tts_service.synthesize_speech(
+            text=request.text,
+            language_code=request.language_code,
+            voice_gender=request.voice_gender,
+            speaking_rate=request.speaking_rate,
+            voice_name=request.voice_name,
+        )
+        info = await audio_store.put(audio_content, "audio/mpeg")
+
+        return success_response({
+            "audio_id": info.key,
+            "url": audio_store.url(info.key),
+            "size": info.size,
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/synthesize-batch", response_model=SuccessResponse[SynthesizedBatch])
+async def synthesize_batch(request: TTSBatchRequest):
+    """
+    여러 문장을 한 번에 음성으로 변환 (시나리오 표현/단어 미리 듣기)
+
+    Cached texts are returned directly; the rest are synthesized in a
+    single SSML request and split into per-text clips.
+    """
+    if len(request.texts) > settings.TTS_BATCH_MAX_TEXTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many texts. Maximum is {settings.TTS_BATCH_MAX_TEXTS}",
+        )
+
+    try:
+        audio = await tts_service.synthesize_batch(
+            texts=request.texts,
+            language_code=request.language_code,
+            voice_gender=request.voice_gender,
+            speaking_rate=request.speaking_rate,
+            voice_name=request.voice_name,
+        )
+
+        clips = [
+            {"text": text, "audio": base64.b64encode(audio[text]).decode("utf-8")}
+            for text in dict.fromkeys(request.texts)
+            if text in audio
+        ]
+        return success_response({"clips": clips, "total": len(clips)})
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/evaluate-pronunciation", response_model=SuccessResponse[PronunciationEvaluation])
 async def evaluate_pronunciation(
     audio: UploadFile = File(...),
     expected_text: Optional[str] = None,
     language_code: str = "km-KH",
+    user_id: Optional[int] = None,
+    scenario: str = "general",
+    session_id: Optional[int] = None,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
 ):
     """
     발음 평가
@@ -98,42 +219,114 @@ async def evaluate_pronunciation(
     - **audio**: 사용자 음성 파일
     - **expected_text**: 예상 텍스트 (선택)
     - **language_code**: 언어 코드
+    - **user_id**: 사용자 ID (선택, 지정하면 복습 일정과 학습 통계에 반영)
+    - **scenario**: 연습 시나리오 (학습 통계용)
+    - **session_id**: 대화 세션 ID (선택)
+    - **Idempotency-Key** 헤더: 재전송 시 같은 값 (선택, 없으면 음성 내용으로 판별)
     """
-    try:
-        # Read audio file
-        audio_content = await audio.read()
+    # Read audio file (size/duration validated while streaming)
+    upload = await read_audio_upload(audio)
 
-        # Evaluate pronunciation
+    async def evaluate() -> Dict[str, Any]:
         result = await pronunciation_service.evaluate_pronunciation(
-            audio_content=audio_content,
+            audio_content=upload.content,
             expected_text=expected_text,
             language_code=language_code,
         )
 
-        return {
-            "success": True,
-            "data": result,
-        }
+        # Recorded once per logical request; replays skip this. A failed
+        # write is logged by the service and never fails the evaluation.
+        if user_id is not None:
+            await review_scheduler.record_evaluation(user_id, language_code, result)
+            await progress_service.record_evaluation(user_id, scenario, result, session_id)
 
+        return result
+
+    try:
+        result, replayed = await idempotency_store.run(
+            "evaluate-pronunciation",
+            idempotency_key,
+            fingerprint(upload.content, expected_text, language_code, user_id, scenario, session_id),
+            evaluate,
+        )
+        return replayable_response(result, replayed)
+
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/voices")
+@router.post("/evaluate-pronunciation-batch", response_model=SuccessResponse[PronunciationBatch])
+async def evaluate_pronunciation_batch(
+    audios: List[UploadFile] = File(...),
+    expected_texts: List[str] = Form([]),
+    language_code: str = "km-KH",
+    user_id: Optional[int] = None,
+    scenario: str = "general",
+    session_id: Optional[int] = None,
+):
+    """
+    발음 일괄 평가 (연습 드릴)
+
+    - **audios**: 사용자 음성 파일 목록 (녹음 순서)
+    - **expected_texts**: 각 음성의 예상 텍스트 (audios와 같은 순서, 비워두면 생략)
+    - **language_code**: 언어 코드
+    - **user_id**: 사용자 ID (선택, 지정하면 복습 일정과 학습 통계에 반영)
+    - **scenario**: 연습 시나리오 (학습 통계용)
+    - **session_id**: 대화 세션 ID (선택)
+    """
+    if len(audios) > settings.PRONUNCIATION_BATCH_MAX_CLIPS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many clips. Maximum is {settings.PRONUNCIATION_BATCH_MAX_CLIPS}",
+        )
+    if expected_texts and len(expected_texts) != len(audios):
+        raise HTTPException(
+            status_code=400,
+            detail="expected_texts must have one entry per audio clip",
+        )
+
+    clips = []
+    for i, audio in enumerate(audios):
+        expected_text = expected_texts[i] if expected_texts else None
+        upload = await read_audio_upload(audio)
+        clips.append((upload.content, expected_text or None))
+
+    try:
+        results = await pronunciation_service.evaluate_pronunciation_batch(
+            clips=clips,
+            language_code=language_code,
+        )
+
+        if user_id is not None:
+            for result in results:
+                await review_scheduler.record_evaluation(user_id, language_code, result)
+            # One transaction for the whole drill; failures are logged, not raised
+            await progress_service.record_evaluations(user_id, scenario, results, session_id)
+
+        return success_response({
+            "results": results,
+            "total": len(results),
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/voices", response_model=SuccessResponse[VoiceList])
 async def get_available_voices(language_code: str = "km-KH"):
     """
-    사용 가능한 음성 목록 조회
+    사용 가능한 음성 목록 조회 (메모리 캐시)
     """
     try:
         voices = await tts_service.get_available_voices(language_code=language_code)
 
-        return {
-            "success": True,
-            "data": {
-                "language_code": language_code,
-                "voices": voices,
-            },
-        }
+        return success_response({
+            "language_code": language_code,
+            "voices": voices,
+            "default_voices": tts_service.voices.defaults(language_code),
+        })
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,175 @@
+"""
+Admission control for expensive routes
+비용이 큰 요청(음성 대화, 발음 평가)의 과부하 시 조기 거절/저비용 처리
+
+Each route class runs at most a fixed number of requests at once; the rest
+wait in a queue. As in CoDel, overload is detected from queueing delay,
+not queue length. When the delay of admitted requests stays above
+ADMISSION_TARGET_DELAY_MS for a whole ADMISSION_INTERVAL_MS, the class is
+overloaded. New arrivals are then rejected with 503 and Retry-After, or,
+for classes with a cheaper mode, run in degraded mode (see is_degraded).
+Degraded requests still take a slot, but wait at most
+ADMISSION_DEGRADED_WAIT_MS for it before being shed. Requests that still
+wait longer than ADMISSION_MAX_WAIT_SECONDS are shed. The class recovers
+as soon as a request is admitted below the target delay, when its queue
+is empty, or when no delay above the target was seen for a whole interval.
+
+State is per worker process; gunicorn workers each protect themselves.
+"""
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+from app.core.metrics import metrics
+from contextvars import ContextVar
+from typing import Dict, Optional
+import asyncio
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+REJECT = "reject"
+DEGRADE = "degrade"
+
+VOICE_CONVERSATION = "voice_conversation"
+PRONUNCIATION = "pronunciation"
+OUTCOMES = ("admitted", "degraded", "shed_overload", "shed_timeout")
+
+# Set for requests admitted in degraded mode (read by the services)
+_degraded: ContextVar[bool] = ContextVar("admission_degraded", default=False)
+
+
+def is_degraded() -> bool:
+    """Whether the current request should skip optional expensive work"""
+    return _degraded.get()
+
+
+class RouteClass:
+    """Concurrency limit plus CoDel-style overload detection for a group of routes"""
+
+    def __init__(self, name: str, concurrency: int, policy: str):
+        self.name = name
+        self.concurrency = concurrency
+        self.policy = policy
+        self.active = 0
+        self.waiting = 0
+        self.overloaded = False
+        self._above_since: Optional[float] = None
+        self._last_above = 0.0
+        self._service_time = 1.0  # EWMA seconds, for Retry-After
+        self._slots = asyncio.Semaphore(concurrency)
+
+    def observe_delay(self, delay: float, now: float) -> None:
+        """Update the overload state from one admitted request's queueing delay"""
+        if delay < settings.ADMISSION_TARGET_DELAY_MS / 1000:
+            self._above_since = None
+            if self.overloaded:
+                self.overloaded = False
+                logger.info(f"Admission class '{self.name}' recovered")
+            return
+        self._last_above = now
+        if self._above_since is None:
+            self._above_since = now
+        elif not self.overloaded and now - self._above_since >= settings.ADMISSION_INTERVAL_MS / 1000:
+            self.overloaded = True
+            logger.warning(f"Admission class '{self.name}' overloaded (queue delay {delay * 1000:.0f}ms)")
+
+    def refresh(self, now: float) -> None:
+        """Clear a stale overload state before routing a new arrival"""
+        if not self.overloaded:
+            return
+        if self.waiting == 0 or now - self._last_above >= settings.ADMISSION_INTERVAL_MS / 1000:
+            self.overloaded = False
+            self._above_since = None
+            logger.info(f"Admission class '{self.name}' recovered")
+
+    def observe_service(self, seconds: float) -> None:
+        self._service_time = 0.8 * self._service_time + 0.2 * seconds
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog is likely drained"""
+        backlog = (self.waiting + self.active) * self._service_time / self.concurrency
+        return max(1, min(30, math.ceil(backlog)))
+
+
+def _route_classes() -> Dict[str, RouteClass]:
+    """POST paths that are admission-controlled, by route class"""
+    voice = RouteClass(VOICE_CONVERSATION, settings.ADMISSION_VOICE_CONCURRENCY, REJECT)
+    pronunciation = RouteClass(PRONUNCIATION, settings.ADMISSION_PRONUNCIATION_CONCURRENCY, DEGRADE)
+    return {
+        "/api/v1/conversation/voice-conversation": voice,
+        "/api/v1/voice/evaluate-pronunciation": pronunciation,
+        "/api/v1/voice/evaluate-pronunciation-batch": pronunciation,
+    }
+
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware; other routes pass through untouched"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.routes = _route_classes()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        rc = self.routes.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if rc is None or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+        arrived = time.monotonic()
+        rc.refresh(arrived)
+
+        degrade = rc.overloaded and rc.policy == DEGRADE
+        if rc.overloaded and not degrade and rc.waiting > 0:
+            await self._shed(rc, "overload", scope, receive, send)
+            return
+
+        max_wait = settings.ADMISSION_DEGRADED_WAIT_MS / 1000 if degrade else settings.ADMISSION_MAX_WAIT_SECONDS
+        rc.waiting += 1
+        try:
+            await asyncio.wait_for(rc._slots.acquire(), max_wait)
+        except asyncio.TimeoutError:
+            rc.waiting -= 1
+            rc.observe_delay(time.monotonic() - arrived, time.monotonic())
+            await self._shed(rc, "overload" if degrade else "timeout", scope, receive, send)
+            return
+        rc.waiting -= 1
+
+        started = time.monotonic()
+        delay = started - arrived
+        rc.observe_delay(delay, started)
+        degrade = degrade and rc.overloaded  # a prompt slot means the class recovered
+        rc.active += 1
+        metrics.incr("admission_requests_total", route_class=rc.name, outcome="degraded" if degrade else "admitted")
+        metrics.incr("admission_queue_delay_seconds_total", delay, route_class=rc.name)
+        token = _degraded.set(degrade)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _degraded.reset(token)
+            rc.active -= 1
+            rc.observe_service(time.monotonic() - started)
+            rc._slots.release()
+
+    async def _shed(self, rc: RouteClass, reason: str, scope: Scope, receive: Receive, send: Send) -> None:
+        metrics.incr("admission_requests_total", route_class=rc.name, outcome=f"shed_{reason}")
+        response = JSONResponse(
+            status_code=503,
+            content={"detail": "Server is busy, please retry shortly"},
+            headers={"Retry-After": str(rc.retry_after())},
+        )
+        await response(scope, receive, send)
+
+
+def shed_rates() -> Dict[str, float]:
+    """Share of requests shed per route class (this worker)"""
+    rates = {}
+    for name in (VOICE_CONVERSATION, PRONUNCIATION):
+        outcomes = {
+            outcome: metrics.get("admission_requests_total", route_class=name, outcome=outcome)
+            for outcome in OUTCOMES
+        }
+        total = sum(outcomes.values())
+        shed = outcomes["shed_overload"] + outcomes["shed_timeout"]
+        rates[name] = shed / total if total else 0.0
+    return rates
@@ -0,0 +1,301 @@
+"""
+Shared cache backends
+여러 워커 프로세스가 함께 사용하는 캐시/상태 저장소
+
+Backends:
+- local: 프로세스 내부 메모리 (테스트/단일 워커 개발용)
+- sqlite: mmap으로 매핑된 SQLite 파일 (단일 호스트 다중 워커)
+- redis: Redis 호환 서버 (다중 호스트)
+"""
+from app.core.config import settings
+from abc import ABC, abstractmethod
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How often the local backend sweeps out expired entries that are never read again
+LOCAL_PURGE_INTERVAL_SECONDS = 60
+
+
+class CacheBackend(ABC):
+    """Key/value store with TTL shared by TTS cache, LLM cache and rate limiter"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: int) -> int:
+        """
+        Atomically increment a counter
+
+        The TTL is applied only when the counter is created, so a fixed
+        window expires at the same moment for every worker.
+        """
+
+    async def purge_expired(self) -> int:
+        """Remove expired entries; backends with native expiry have nothing to do"""
+        return 0
+
+    async def get_json(self, key: str) -> Optional[Any]:
+        value = await self.get(key)
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            logger.warning(f"Discarding undecodable cache entry: {key}")
+            await self.delete(key)
+            return None
+
+    async def set_json(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        await self.set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"), ttl)
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalCacheBackend(CacheBackend):
+    """In-process cache, only coherent within a single worker"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = asyncio.Lock()
+        self._last_purge = time.time()
+
+    def _get_live(self, key: str) -> Optional[Tuple[bytes, Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._get_live(key)
+        return entry[0] if entry else None
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        self._maybe_purge()
+        expires_at = time.time() + ttl if ttl else None
+        self._data[key] = (value, expires_at)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def incr(self, key: str, ttl: int) -> int:
+        self._maybe_purge()
+        async with self._lock:
+            entry = self._get_live(key)
+            if entry is None:
+                count, expires_at = 1, time.time() + ttl
+            else:
+                count, expires_at = int(entry[0]) + 1, entry[1]
+            self._data[key] = (str(count).encode(), expires_at)
+            return count
+
+    def _maybe_purge(self) -> None:
+        """Sweep expired entries at most once per interval (writes only, reads stay O(1))"""
+        now = time.time()
+        if now - self._last_purge >= LOCAL_PURGE_INTERVAL_SECONDS:
+            self._last_purge = now
+            self._purge(now)
+
+    def _purge(self, now: float) -> int:
+        expired = [key for key, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self._data[key]
+        return len(expired)
+
+    async def purge_expired(self) -> int:
+        return self._purge(time.time())
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache stored in a memory-mapped SQLite file
+
+    Every worker opens its own connection to the same file (WAL mode), so
+    entries written by one worker are immediately visible to the others.
+    sqlite3 calls block (up to the busy timeout under lock contention), so
+    they run in a thread, serialized per worker by a lock.
+    """
+
+    def __init__(self, path: str, mmap_size: int):
+        self.path = path
+        self.mmap_size = mmap_size
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not be shared across fork(); reopen in each worker
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(
+                self.path,
+                timeout=5.0,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    async def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(self._connection(), *args)
+        return await asyncio.to_thread(locked)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._run(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        await self._run(self._set, key, value, expires_at)
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._delete, key)
+
+    async def incr(self, key: str, ttl: int) -> int:
+        return await self._run(self._incr, key, ttl)
+
+    async def purge_expired(self) -> int:
+        """Remove expired rows (safe to call from any worker)"""
+        return await self._run(self._purge)
+
+    @staticmethod
+    def _get(conn: sqlite3.Connection, key: str) -> Optional[bytes]:
+        row = conn.execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    @staticmethod
+    def _set(conn: sqlite3.Connection, key: str, value: bytes, expires_at: Optional[float]) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at),
+        )
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, key: str) -> None:
+        conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    @staticmethod
+    def _incr(conn: sqlite3.Connection, key: str, ttl: int) -> int:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                count, expires_at = 1, now + ttl
+            else:
+                count, expires_at = int(row[0]) + 1, row[1]
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, str(count).encode(), expires_at),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    @staticmethod
+    def _purge(conn: sqlite3.Connection) -> int:
+        cursor = conn.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time(),),
+        )
+        return cursor.rowcount
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache stored in a Redis-compatible server"""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+
+        self.client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        await self.client.set(key, value, ex=ttl or None)
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+    async def incr(self, key: str, ttl: int) -> int:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, ttl, nx=True)
+            count, _ = await pipe.execute()
+        return int(count)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+def create_cache_backend() -> CacheBackend:
+    """Build the cache backend selected by settings.CACHE_BACKEND"""
+    backend = settings.CACHE_BACKEND.lower()
+
+    if backend == "sqlite":
+        return SQLiteCacheBackend(settings.CACHE_SQLITE_PATH, settings.CACHE_SQLITE_MMAP_SIZE)
+    if backend == "redis":
+        return RedisCacheBackend(settings.CACHE_URL)
+    if backend != "local":
+        logger.warning(f"Unknown CACHE_BACKEND '{settings.CACHE_BACKEND}', using local cache")
+
+    if settings.WORKERS > 1:
+        logger.warning(
+            "CACHE_BACKEND=local with WORKERS > 1: caches and rate limits are per worker"
+        )
+    return LocalCacheBackend()
+
+
+def make_key(namespace: str, digest: str) -> str:
+    """Build a namespaced cache key shared by every worker"""
+    return f"{settings.CACHE_KEY_PREFIX}:{namespace}:{digest}"
+
+
+# Global cache instance
+cache = create_cache_backend()
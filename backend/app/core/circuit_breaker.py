@@ -0,0 +1,72 @@
+"""
+Circuit breaker for upstream APIs
+외부 API 장애 시 빠르게 실패하도록 호출 차단
+
+After `failure_threshold` consecutive failures the circuit opens and calls
+fail immediately for `reset_seconds`. Then a single trial call is let
+through (half-open): success closes the circuit, failure opens it again.
+A trial that never reports back (e.g. its task was cancelled) is given up
+after another `reset_seconds`, so the circuit cannot stay half-open forever.
+State is per worker process.
+"""
+from app.core.metrics import metrics
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.reset_seconds:
+                self._transition(HALF_OPEN)
+                self._trial_started = now
+                return True  # the single trial call
+            if self.state == HALF_OPEN and now - self._trial_started >= self.reset_seconds:
+                self._trial_started = now
+                return True  # the previous trial was lost; try again
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"Circuit '{self.name}' {self.state} -> {state}")
+        self.state = state
+        metrics.incr("circuit_transitions_total", circuit=self.name, state=state)
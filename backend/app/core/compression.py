@@ -0,0 +1,170 @@
+"""
+Response compression middleware
+응답 압축 (JSON은 압축, 오디오는 그대로 전송)
+
+JSON from the scenario, conversation and pronunciation routes is
+repetitive Unicode text and shrinks several times over, while MP3/Opus
+audio is already compressed. Responses are compressed with brotli (when
+installed) or gzip depending on Accept-Encoding, skipping small bodies
+and the configured audio/binary content types. Responses that already
+carry a Content-Encoding, such as precompressed scenario payloads, pass
+through untouched.
+"""
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+import gzip
+import zlib
+from typing import Optional
+
+# Larger streamed bodies are compressed incrementally instead of buffered
+STREAM_BUFFER_LIMIT = 512 * 1024
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+
+def available_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Preferred encoding the client accepts (q=0 excluded), or None"""
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    for encoding in available_encodings():
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    """
+    Compress a complete body
+
+    Static payloads (compressed once and reused) use the highest levels;
+    per-request compression uses the cheaper configured levels.
+    """
+    if encoding == "br":
+        quality = 11 if static else settings.COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    level = 9 if static else settings.COMPRESSION_GZIP_LEVEL
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class _StreamCompressor:
+    """Incremental compressor for streamed bodies"""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+            self._process = self._compressor.process
+        else:
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+            self._process = self._compressor.compress
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        out = self._process(data)
+        return out + (self._finish() if last else self._flush())
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware; decides per response from its headers"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.skip_types = tuple(t.lower() for t in settings.COMPRESSION_SKIP_TYPES)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        pending = bytearray()
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def compressing_send(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "").lower()
+                passthrough = (
+                    message["status"] in (204, 304)
+                    or "content-encoding" in headers
+                    or content_type.startswith(self.skip_types)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message  # held until enough of the body is seen
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            more_body = message.get("more_body", False)
+
+            if start is not None:
+                # Bodies behind BaseHTTPMiddleware arrive as several chunks; collect
+                # them so a complete body is compressed once with a Content-Length.
+                pending.extend(message.get("body", b""))
+                if more_body and len(pending) < STREAM_BUFFER_LIMIT:
+                    return
+
+                held, start = start, None
+                headers = MutableHeaders(raw=held["headers"])
+                body = bytes(pending)
+                pending.clear()
+
+                if not more_body and len(body) < self.min_size:
+                    passthrough = True
+                    headers["Content-Length"] = str(len(body))
+                    await send(held)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body:
+                    body = compress(body, encoding)
+                    headers["Content-Length"] = str(len(body))
+                    await send(held)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                # Long stream: compress incrementally from here on
+                del headers["Content-Length"]
+                compressor = _StreamCompressor(encoding)
+                await send(held)
+            else:
+                body = message.get("body", b"")
+
+            await send({
+                "type": "http.response.body",
+                "body": compressor.chunk(body, last=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, compressing_send)
@@ -2,7 +2,7 @@
 Application configuration settings
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 
 
@@ -19,15 +19,120 @@ class Settings(BaseSettings):
     GOOGLE_APPLICATION_CREDENTIALS: str = ""
     GOOGLE_CLOUD_PROJECT_ID: str = ""
     GEMINI_API_KEY: str = ""
+    GEMINI_MODEL: str = "gemini-1.5-flash"
+    LLM_STRUCTURED_OUTPUT: bool = True  # JSON mode with per-method response schemas
+    PROMPT_TEMPLATE_WEIGHTS: Dict[str, int] = {"v1": 100, "v2": 0}  # A/B split by template version
+    LLM_REPLY_DEADLINE_SECONDS: float = 8.0  # conversation replies; 0 waits indefinitely
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5  # consecutive failures before calls fail fast
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0
+
+    # Reply bank (pre-generated replies served when Gemini is slow or down)
+    REPLY_BANK_ENABLED: bool = True
+    REPLY_BANK_PATH: str = "./reply-bank.db"
+    REPLY_BANK_MIN_SIMILARITY: float = 70.0  # 0-100, learner input vs banked input
 
     # Database
     DATABASE_URL: str = "sqlite:///./koicalang.db"
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+
+    # Phrase index (local translations/romanizations for generated Khmer replies)
+    PHRASE_INDEX_ENABLED: bool = True
+    PHRASE_INDEX_MAX_LEARNED: int = 5000
+
+    # Speculative next-turn prefetch (LLM reply + TTS for likely learner replies)
+    PREFETCH_ENABLED: bool = False
+    PREFETCH_TOP_K: int = 3
+    PREFETCH_MAX_CONCURRENT: int = 2
+    PREFETCH_MAX_CALLS_PER_MINUTE: int = 30
+    PREFETCH_MAX_TURNS: int = 1000
+    PREFETCH_TTS: bool = True
+
+    # TTS voice catalog (voices listed once, refreshed in the background)
+    TTS_VOICE_REFRESH_SECONDS: float = 6 * 3600
+    TTS_VOICE_TYPE_PREFERENCE: List[str] = ["Standard", "Wavenet", "Neural2"]  # first available type is used
+
+    # Audio store (content-addressed TTS audio and recordings)
+    AUDIO_STORE_DIR: str = "./audio-store"
+    AUDIO_STORE_URL_PREFIX: str = "/api/v1/audio"
+    AUDIO_STORE_MAX_BYTES: int = 2 * 1024 ** 3  # 0 = no size limit
+    AUDIO_STORE_MAX_AGE_SECONDS: int = 7 * 24 * 3600  # 0 = keep until the size limit
+    AUDIO_STORE_PRUNE_INTERVAL_SECONDS: int = 3600
+    AUDIO_CACHE_MAX_AGE_SECONDS: int = 365 * 24 * 3600  # keys never change content
+
+    # Batch TTS (one SSML request with <mark> timepoints, split into clips)
+    TTS_BATCH_MAX_TEXTS: int = 50
+    TTS_BATCH_MAX_SSML_BYTES: int = 4500  # below the 5000-byte request limit
+    TTS_BATCH_BREAK_MS: int = 400  # pause between items; clips are cut in its middle
+    TTS_WARM_ON_RELOAD: bool = True  # synthesize changed scenarios' phrases after a content reload
+
+    # Response compression (brotli when installed, else gzip)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes; smaller bodies are sent as is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # per-request; static payloads use 11
+    COMPRESSION_SKIP_TYPES: List[str] = [
+        "audio/", "video/", "image/", "application/zip", "application/gzip", "application/octet-stream",
+        "text/event-stream",  # must reach the client event by event
+    ]
+
+    # Scenario content (one JSON file per scenario)
+    SCENARIO_CONTENT_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "content", "scenarios")
+    SCENARIO_CACHE_MAX_AGE_SECONDS: int = 3600  # clients revalidate (ETag) after this, so reloads reach them
+    SCENARIO_RELOAD_INTERVAL_SECONDS: float = 10.0  # 0 disables hot reload
+
+    # Offline scenario packs (zip of scenario JSON + audio, with deltas)
+    PACK_DIR: str = "./scenario-packs"
+    PACK_KEEP_VERSIONS: int = 5  # older versions get full packs instead of deltas
+    PACK_BUILD_ON_RELOAD: bool = True
+    PACK_AUDIO_RETRY_SECONDS: int = 60  # first rebuild of a pack with missing audio
+    PACK_AUDIO_RETRY_MAX_SECONDS: int = 3600
 
     # Audio Settings
     MAX_AUDIO_DURATION_SECONDS: int = 30
     AUDIO_SAMPLE_RATE: int = 16000
     AUDIO_ENCODING: str = "LINEAR16"
 
+    # Uploads (validated while streaming)
+    MAX_UPLOAD_BYTES: int = 2 * 1024 * 1024  # one short clip (30s of 16kHz LINEAR16 is ~1MB)
+    MAX_REQUEST_BODY_BYTES: int = 24 * 1024 * 1024  # whole request (drill batches, long audio)
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024
+
+    # Long audio (reading practice): split at pauses, recognize chunks in parallel
+    LONG_AUDIO_MAX_SECONDS: int = 300
+    LONG_AUDIO_CHUNK_SECONDS: float = 50.0  # below the ~60s synchronous recognize limit
+    LONG_AUDIO_MIN_SILENCE_MS: int = 300
+    LONG_AUDIO_STT_CONCURRENCY: int = 6
+
+    # Pronunciation drills (batch evaluation)
+    PRONUNCIATION_BATCH_MAX_CLIPS: int = 20
+    PRONUNCIATION_BATCH_STT_CONCURRENCY: int = 4
+
+    # Background jobs (conversation evaluation)
+    JOB_EVALUATION_WORKERS: int = 2  # concurrent evaluations per worker process
+    JOB_QUEUE_MAX_SIZE: int = 100  # pending jobs per kind before 503
+    JOB_RESULT_TTL_SECONDS: int = 86400
+    JOB_POLL_INTERVAL_SECONDS: float = 0.5
+    JOB_SYNC_TIMEOUT_SECONDS: float = 120.0  # /conversation/evaluate wait limit
+    JOB_LEASE_SECONDS: int = 60  # a queued/running job whose owner stops renewing this long is failed
+    JOB_HEARTBEAT_SECONDS: float = 15.0
+
+    # Spaced repetition (vocabulary_progress review scheduling)
+    REVIEW_FLUSH_BATCH_SIZE: int = 200
+    REVIEW_FLUSH_INTERVAL_SECONDS: float = 5.0
+    REVIEW_MAX_PENDING: int = 10000  # buffered outcomes kept while the DB is down
+    REVIEW_FLUSH_MAX_BACKOFF_SECONDS: float = 300.0
+    REVIEW_DUE_MAX_LIMIT: int = 100
+
+    # Progress dashboard rollups
+    PROGRESS_WEAK_WORDS_LIMIT: int = 20
+
+    # Local pronunciation scorer (skips Gemini for routine, high-similarity attempts)
+    LOCAL_SCORER_ENABLED: bool = True
+    LOCAL_SCORER_MIN_SIMILARITY: float = 90.0  # 0-100
+    LOCAL_SCORER_MIN_CONFIDENCE: float = 0.8  # STT confidence 0-1
+    LOCAL_SCORER_MAX_WEAK_WORD_RATIO: float = 0.34
+
     # Language Settings
     DEFAULT_TARGET_LANGUAGE: str = "km"  # Khmer
     SUPPORTED_LANGUAGES: List[str] = ["km", "lo", "vi"]
@@ -38,8 +143,44 @@ class Settings(BaseSettings):
         "http://localhost:3000",
     ]
 
-    # Rate Limiting
-    RATE_LIMIT_PER_MINUTE: int = 30
+    # Rate Limiting (per client address; 0 disables)
+    RATE_LIMIT_PER_MINUTE: int = 0
+    RATE_LIMIT_TRUSTED_PROXIES: List[str] = []  # proxies whose X-Forwarded-For is trusted
+
+    # Admission control for expensive routes (per worker, CoDel-style queue delay)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_VOICE_CONCURRENCY: int = 4  # voice conversations processed at once
+    ADMISSION_PRONUNCIATION_CONCURRENCY: int = 8
+    ADMISSION_TARGET_DELAY_MS: float = 100.0  # acceptable queueing delay
+    ADMISSION_INTERVAL_MS: float = 1000.0  # delay above target this long = overloaded
+    ADMISSION_MAX_WAIT_SECONDS: float = 5.0
+    ADMISSION_DEGRADED_WAIT_MS: float = 250.0  # slot wait for degraded requests before shedding
+
+    # Prosody analysis for tonal languages (librosa pYIN in a process pool)
+    PROSODY_ENABLED: bool = True
+    PROSODY_LANGUAGES: List[str] = ["vi-VN", "lo-LA"]
+    PROSODY_WORKERS: int = 2  # analysis processes per worker process
+    PROSODY_TIMEOUT_SECONDS: float = 10.0
+
+    # Idempotent voice uploads (Idempotency-Key header or audio content hash)
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: int = 600  # how long completed results are replayed
+    IDEMPOTENCY_WAIT_SECONDS: int = 60  # duplicates wait this long for the in-flight request
+
+    # Server (production run mode: gunicorn + uvicorn workers)
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WORKERS: int = 1
+    WORKER_TIMEOUT_SECONDS: int = 120
+
+    # Shared cache / state (local, sqlite, redis)
+    CACHE_BACKEND: str = "local"
+    CACHE_URL: str = "redis://localhost:6379/0"
+    CACHE_SQLITE_PATH: str = "./koicalang-cache.db"
+    CACHE_SQLITE_MMAP_SIZE: int = 268435456  # 256 MiB
+    CACHE_KEY_PREFIX: str = "koicalang"
+    TTS_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_TTL_SECONDS: int = 3600
 
     class Config:
         env_file = ".env"
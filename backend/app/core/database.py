@@ -0,0 +1,31 @@
+"""
+Database access
+SQLAlchemy 엔진 및 연결 관리 (database/schema.sql 스키마 사용)
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+import asyncio
+import logging
+from typing import Any, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def create_db_engine() -> Engine:
+    """Create the engine for settings.DATABASE_URL"""
+    kwargs = {"pool_pre_ping": True}
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        kwargs.update(pool_size=settings.DATABASE_POOL_SIZE, max_overflow=settings.DATABASE_MAX_OVERFLOW)
+    return create_engine(settings.DATABASE_URL, **kwargs)
+
+
+async def run_db(fn: Callable[..., T], *args: Any) -> T:
+    """Run blocking database work in a thread so the event loop stays free"""
+    return await asyncio.to_thread(fn, *args)
+
+
+# Global engine instance (connections are opened lazily)
+engine = create_db_engine()
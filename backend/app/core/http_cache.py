@@ -0,0 +1,147 @@
+"""
+HTTP caching helpers
+ETag / If-None-Match 처리 (304 Not Modified), Range 요청 파일 응답
+"""
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+import anyio
+import os
+from typing import Optional, Tuple
+
+# ASGI extension for sendfile-style responses (used when the server offers it)
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison, RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def cached_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    max_age: int,
+    media_type: str = "application/json",
+    content_encoding: Optional[str] = None,
+) -> Response:
+    """Serve a pre-built body with validators, or 304 if the client copy is current"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Byte range (start, end inclusive) of a single-range Range header
+
+    Returns None when the whole file should be sent (no header, multiple
+    ranges, other units). Raises ValueError for an unsatisfiable range.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            start, end = size - int(end_text), size - 1  # suffix range: last N bytes
+    except ValueError:
+        return None
+    start, end = max(0, start), min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+class RangeFileResponse(FileResponse):
+    """
+    File response serving one byte range (206) or the whole file
+
+    Uses the zero-copy send extension when the server provides it and
+    otherwise streams the file in chunks.
+    """
+
+    def __init__(self, path: str, byte_range: Optional[Tuple[int, int]], size: int, **kwargs):
+        super().__init__(path, stat_result=os.stat(path), **kwargs)
+        self.offset, self.count = 0, size
+        if byte_range is not None:
+            start, end = byte_range
+            self.offset, self.count = start, end - start + 1
+            self.status_code = 206
+            self.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            self.headers["Content-Length"] = str(self.count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({"type": ZEROCOPY_EXTENSION, "file": file.wrapped, "offset": self.offset, "count": self.count})
+                return
+
+            await file.seek(self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def file_response(
+    request: Request,
+    path: str,
+    etag: str,
+    max_age: int,
+    media_type: str,
+    immutable: bool = False,
+) -> Response:
+    """
+    Serve a file with validators and byte-range support
+
+    Returns 304 when the client copy is current and 416 for unsatisfiable
+    ranges. A Range request with a stale If-Range gets the whole file.
+    """
+    cache_control = f"public, max-age={max_age}" + (", immutable" if immutable else "")
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    return RangeFileResponse(path, byte_range, size, media_type=media_type, headers=headers)
@@ -0,0 +1,57 @@
+"""
+Lightweight in-process metrics
+서비스 동작 지표 (카운터/누적값) 수집
+
+Counters are kept per worker process; `/metrics` reports the values of the
+worker that served the request together with its pid.
+"""
+from collections import defaultdict
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Metrics:
+    """Thread-safe counter registry keyed by metric name and labels"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """Increase a counter (labels distinguish series of the same metric)"""
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            self._counters[name][key] += value
+
+    def get(self, name: str, **labels: str) -> float:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            return self._counters.get(name, {}).get(key, 0.0)
+
+    def ratio(self, numerator: str, denominator: str) -> float:
+        """Sum of one counter divided by the sum of another (0 if empty)"""
+        with self._lock:
+            num = sum(self._counters.get(numerator, {}).values())
+            den = sum(self._counters.get(denominator, {}).values())
+        return num / den if den else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Export all counters as JSON-friendly data"""
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "counters": {
+                    name: [
+                        {"labels": dict(key), "value": value}
+                        for key, value in series.items()
+                    ]
+                    for name, series in self._counters.items()
+                },
+            }
+
+
+# Global metrics registry
+metrics = Metrics()
@@ -0,0 +1,80 @@
+"""
+Rate limiting middleware
+공유 캐시 기반 분당 요청 제한 (모든 워커에서 일관됨)
+
+Off by default (RATE_LIMIT_PER_MINUTE=0). Behind a reverse proxy every
+request comes from the proxy's address, so list the proxy in
+RATE_LIMIT_TRUSTED_PROXIES to key the limit on the X-Forwarded-For client.
+"""
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from app.core.cache import cache, make_key
+from app.core.config import settings
+import logging
+import time
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 60
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Fixed-window limiter keyed by client address, counted in the shared cache"""
+
+    def __init__(
+        self,
+        app,
+        limit_per_minute: int = settings.RATE_LIMIT_PER_MINUTE,
+        path_prefix: str = "/api/",
+        trusted_proxies: Iterable[str] = settings.RATE_LIMIT_TRUSTED_PROXIES,
+    ):
+        super().__init__(app)
+        self.limit = limit_per_minute
+        self.path_prefix = path_prefix
+        self.trusted_proxies = set(trusted_proxies)
+
+    def client_address(self, request: Request) -> str:
+        """
+        Address to count the request against
+
+        X-Forwarded-For is only honoured when the peer is a trusted proxy;
+        the rightmost untrusted hop is the client (earlier hops can be forged).
+        """
+        peer = request.client.host if request.client else "unknown"
+        if peer not in self.trusted_proxies:
+            return peer
+        hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+        for hop in reversed(hops):
+            if hop not in self.trusted_proxies:
+                return hop
+        return peer
+
+    async def dispatch(self, request: Request, call_next):
+        if self.limit <= 0 or not request.url.path.startswith(self.path_prefix):
+            return await call_next(request)
+
+        client = self.client_address(request)
+        window = int(time.time() // WINDOW_SECONDS)
+        key = make_key("ratelimit", f"{client}:{window}")
+
+        try:
+            count = await cache.incr(key, ttl=WINDOW_SECONDS)
+        except Exception as e:
+            # Never fail a request because the shared store is unavailable
+            logger.error(f"Rate limit check failed: {e}")
+            return await call_next(request)
+
+        if count > self.limit:
+            retry_after = WINDOW_SECONDS - int(time.time() % WINDOW_SECONDS)
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(self.limit)
+        response.headers["X-RateLimit-Remaining"] = str(max(self.limit - count, 0))
+        return response
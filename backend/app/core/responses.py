@@ -0,0 +1,45 @@
+"""
+Fast JSON responses
+orjson 기반 JSON 응답 (jsonable_encoder 생략)
+
+Routes return `success_response(data)` instead of a plain dict. A Response
+instance is sent as is, so FastAPI neither runs jsonable_encoder over the
+payload nor validates it against the route's response_model (which then
+only documents the shape). orjson serializes service output directly,
+including NumPy scalars/arrays and datetimes.
+"""
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import orjson
+from typing import Any
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    """Types orjson does not handle natively"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+def success_response(data: Any, status_code: int = 200) -> FastJSONResponse:
+    """The API's {"success": true, "data": ...} envelope, serialized directly"""
+    return FastJSONResponse({"success": True, "data": data}, status_code=status_code)
+
+
+def replayable_response(data: Any, replayed: bool) -> FastJSONResponse:
+    """success_response for idempotent routes; marks results served from an earlier request"""
+    response = success_response(data)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return response
@@ -0,0 +1,78 @@
+"""
+Request body size limit middleware
+업로드 요청 본문 크기를 스트리밍 중에 제한
+
+Oversized uploads are rejected from the Content-Length header before the
+body is read, and chunked uploads are cut off as soon as they cross the
+limit, before multipart parsing spools them to memory or disk.
+"""
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Pure ASGI middleware (the body stream is never buffered here)
+
+    When a chunked body crosses the limit the 413 is sent from here and the
+    app's receive() gets http.disconnect, so the request ends like a client
+    disconnect instead of surfacing as a body parsing error (400). Anything
+    the app sends afterwards is dropped.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int = settings.MAX_REQUEST_BODY_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    rejected = True
+                    if not response_started:
+                        await self._reject(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except Exception:
+            # The app may fail on the disconnect we simulated; the 413 is already out
+            if not rejected:
+                raise
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": f"Request body exceeds {self.max_bytes} bytes"},
+            headers={"Connection": "close"},
+        )
+        await response(scope, receive, send)
@@ -4,7 +4,20 @@ FastAPI application entry point
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api import conversation, voice, scenarios
+from app.core.cache import cache
+from app.core.admission import AdmissionControlMiddleware, shed_rates
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import metrics
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.responses import FastJSONResponse
+from app.core.upload_limit import UploadSizeLimitMiddleware
+from app.services.review_scheduler import review_scheduler
+from app.services.content_reloader import content_reloader
+from app.services.audio_store import audio_store
+from app.services.job_queue import job_queue
+from app.services.prosody_analyzer import prosody_analyzer
+from app.services.tts_service import tts_service
+from app.api import audio, conversation, voice, scenarios, review, progress, jobs
 
 # Create FastAPI app
 app = FastAPI(
@@ -12,6 +25,7 @@ app = FastAPI(
     description="음성 기반 크메르어 학습 서비스 - Voice-based Khmer language learning platform",
     version="0.1.0",
     debug=settings.DEBUG,
+    default_response_class=FastJSONResponse,
 )
 
 # CORS middleware
@@ -21,8 +35,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Idempotent-Replayed"],
 )
 
+# Bound concurrent expensive requests; shed or degrade when queueing delay builds up
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
+# Rate limiting (counted in the shared cache so all workers agree)
+app.add_middleware(RateLimitMiddleware)
+
+# Compress JSON responses (audio and precompressed payloads pass through)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Reject oversized request bodies before they are parsed
+app.add_middleware(UploadSizeLimitMiddleware)
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    """Start per-worker background loops"""
+    review_scheduler.start()
+    content_reloader.start()
+    job_queue.start()
+    prosody_analyzer.start()
+    await tts_service.voices.start()
+    audio_store.start()
+
+
+@app.on_event("shutdown")
+async def close_shared_cache():
+    """Flush buffered writes and release the shared cache connection of this worker"""
+    await job_queue.stop()
+    prosody_analyzer.stop()
+    await tts_service.voices.stop()
+    await audio_store.stop()
+    await content_reloader.stop()
+    await review_scheduler.stop()
+    await cache.close()
+
 
 @app.get("/")
 async def root():
@@ -41,20 +93,38 @@ async def health_check():
     return {
         "status": "healthy",
         "environment": settings.APP_ENV,
+        "cache_backend": settings.CACHE_BACKEND,
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Service metrics of the worker handling this request"""
+    snapshot = metrics.snapshot()
+    local = metrics.get("pronunciation_evaluations_total", tier="local")
+    total = local + metrics.get("pronunciation_evaluations_total", tier="llm")
+    snapshot["local_pronunciation_share"] = local / total if total else 0.0
+    snapshot["admission_shed_rate"] = shed_rates()
+    snapshot["prefetch_hit_rate"] = metrics.ratio("prefetch_hits_total", "prefetch_lookups_total")
+    return snapshot
+
+
 # Include routers
 app.include_router(conversation.router, prefix="/api/v1/conversation", tags=["conversation"])
 app.include_router(voice.router, prefix="/api/v1/voice", tags=["voice"])
 app.include_router(scenarios.router, prefix="/api/v1/scenarios", tags=["scenarios"])
+app.include_router(review.router, prefix="/api/v1/review", tags=["review"])
+app.include_router(progress.router, prefix="/api/v1/progress", tags=["progress"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["jobs"])
+app.include_router(audio.router, prefix="/api/v1/audio", tags=["audio"])
 
 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=settings.HOST,
+        port=settings.PORT,
         reload=settings.DEBUG,
+        workers=1 if settings.DEBUG else settings.WORKERS,
     )
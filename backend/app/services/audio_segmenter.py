@@ -0,0 +1,230 @@
+"""
+Audio segmentation for long recordings
+긴 녹음을 말 사이 쉼(무음) 구간에서 분할
+
+Google synchronous recognition accepts about one minute of audio, so
+reading-practice recordings are cut at pauses into shorter chunks that
+can be recognized in parallel.
+"""
+import struct
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+FRAME_MS = 30
+# Frames this far above the noise floor (in dB) count as speech
+SPEECH_MARGIN_DB = 12.0
+
+
+BufferLike = Union[bytes, bytearray, memoryview]
+
+
+class WavFormat:
+    """Format of a PCM WAV stream: where samples start and how they are laid out"""
+
+    def __init__(self, data_offset: int, sample_rate: int, channels: int, sample_width: int):
+        self.data_offset = data_offset
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+
+
+def parse_wav_header(head: BufferLike) -> Optional[WavFormat]:
+    """
+    Locate the fmt and data chunks of a RIFF/WAVE header
+
+    Returns None when `head` does not yet contain the complete header (the
+    caller can retry with more bytes). Raises ValueError for WAV files that
+    are not 16-bit PCM.
+    """
+    head = memoryview(head)
+    if len(head) < 12:
+        return None
+
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(head):
+        chunk_id = bytes(head[offset:offset + 4])
+        (chunk_size,) = struct.unpack_from("<I", head, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            if body + 16 > len(head):
+                return None
+            audio_format, channels, sample_rate = struct.unpack_from("<HHI", head, body)
+            (sample_width,) = struct.unpack_from("<H", head, body + 14)
+            if audio_format not in (1, 0xFFFE) or sample_width != 16:
+                raise ValueError("Only 16-bit PCM WAV audio is supported")
+            fmt = (sample_rate, channels)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk precedes its fmt chunk")
+            return WavFormat(body, fmt[0], fmt[1], 2)
+        offset = body + chunk_size + (chunk_size & 1)
+
+    return None
+
+
+def is_wav(head: BufferLike) -> bool:
+    return bytes(head[:4]) == b"RIFF" and bytes(head[8:12]) == b"WAVE"
+
+
+def decode_pcm16(audio_content: BufferLike, default_sample_rate: int) -> Tuple[np.ndarray, int]:
+    """
+    Decode LINEAR16 audio into mono int16 samples
+
+    WAV files are parsed from their header; anything else is treated as
+    raw little-endian 16-bit PCM at `default_sample_rate`. Mono samples are
+    a zero-copy view over `audio_content`.
+    """
+    view = memoryview(audio_content)
+    sample_rate, channels = default_sample_rate, 1
+
+    if is_wav(view):
+        wav_format = parse_wav_header(view)
+        if wav_format is None:
+            raise ValueError("Incomplete WAV header")
+        view = view[wav_format.data_offset:]
+        sample_rate, channels = wav_format.sample_rate, wav_format.channels
+
+    usable = len(view) - len(view) % (2 * channels)
+    samples = np.frombuffer(view[:usable], dtype="<i2")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sample_rate
+
+
+class PCMStreamAnalyzer:
+    """
+    Incremental decoder/VAD front end for uploads arriving in chunks
+
+    Tracks the audio duration as bytes arrive (so oversized uploads can be
+    rejected early) and computes frame energies for the VAD chunk by chunk,
+    so nothing has to be re-scanned once the upload is complete.
+    """
+
+    def __init__(self, default_sample_rate: int):
+        self.sample_rate = default_sample_rate
+        self.channels = 1
+        self.data_offset: Optional[int] = None
+        self.total_bytes = 0
+        self._head = bytearray()
+        self._pending = bytearray()
+        self._energies: List[np.ndarray] = []
+
+    @property
+    def duration_seconds(self) -> float:
+        """Duration of the audio received so far"""
+        if self.data_offset is None:
+            return 0.0
+        data_bytes = max(0, self.total_bytes - self.data_offset)
+        return data_bytes / (self.sample_rate * self.channels * 2)
+
+    def feed(self, chunk: BufferLike) -> None:
+        """Consume the next chunk of the upload"""
+        self.total_bytes += len(chunk)
+
+        if self.data_offset is None:
+            self._head += chunk
+            if len(self._head) < 12:
+                return
+            if is_wav(self._head):
+                wav_format = parse_wav_header(self._head)
+                if wav_format is None:
+                    return
+                self.sample_rate, self.channels = wav_format.sample_rate, wav_format.channels
+                self.data_offset = wav_format.data_offset
+            else:
+                self.data_offset = 0
+            chunk = bytes(self._head[self.data_offset:])
+            self._head = bytearray()
+
+        if self.channels != 1:
+            return  # energies for multi-channel audio are computed after decoding
+
+        self._pending += chunk
+        frame_bytes = max(1, self.sample_rate * FRAME_MS // 1000) * 2
+        complete = len(self._pending) - len(self._pending) % frame_bytes
+        if complete:
+            # Copy out the complete frames so the pending buffer can be trimmed
+            samples = np.frombuffer(bytes(self._pending[:complete]), dtype="<i2")
+            self._energies.append(frame_energy_db(samples, self.sample_rate))
+            del self._pending[:complete]
+
+    def frame_energies(self) -> Optional[np.ndarray]:
+        """Frame energies of the whole stream (None if they must be recomputed)"""
+        if self.channels != 1 or not self._energies:
+            return None
+        return np.concatenate(self._energies)
+
+
+def frame_energy_db(samples: np.ndarray, sample_rate: int, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """RMS energy per frame in dBFS (vectorized)"""
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    frames = samples[: n_frames * frame_len].astype(np.float32).reshape(n_frames, frame_len) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-6))
+
+
+def find_split_points(
+    samples: np.ndarray,
+    sample_rate: int,
+    max_chunk_seconds: float,
+    min_silence_ms: int,
+    energy: Optional[np.ndarray] = None,
+) -> List[Tuple[int, int]]:
+    """
+    Split a recording into (start, end) sample ranges at pauses
+
+    Each chunk is at most `max_chunk_seconds` long. Within that window the
+    cut is placed in the middle of the longest pause (a run of non-speech
+    frames of at least `min_silence_ms`) that lies in the second half of
+    the window, preferring the latest of equally long pauses; when there
+    is no such pause the chunk is cut hard at the limit. Frame energies
+    computed while streaming can be passed in `energy` to skip the VAD
+    pass.
+    """
+    total = len(samples)
+    max_len = int(max_chunk_seconds * sample_rate)
+    if total <= max_len:
+        return [(0, total)]
+
+    if energy is None:
+        energy = frame_energy_db(samples, sample_rate)
+    frame_len = max(1, sample_rate * FRAME_MS // 1000)
+    noise_floor = np.percentile(energy, 2)
+    speech_level = np.percentile(energy, 95)
+    threshold = min(noise_floor + SPEECH_MARGIN_DB, (noise_floor + speech_level) / 2)
+    silent = energy < threshold
+    min_silent_frames = max(1, min_silence_ms // FRAME_MS)
+
+    # Pauses as (first frame, frame count)
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    lengths = ends - starts
+    keep = lengths >= min_silent_frames
+    pause_mid = ((starts[keep] + ends[keep]) // 2) * frame_len
+    pause_len = lengths[keep]
+
+    ranges = []
+    start = 0
+    while total - start > max_len:
+        window_end = start + max_len
+        candidates = (pause_mid > start + max_len // 2) & (pause_mid < window_end)
+        if candidates.any():
+            # Longest pause; among equally long ones the latest, so chunks stay near the limit
+            indices = np.flatnonzero(candidates)
+            lengths_in_window = pause_len[indices]
+            best = indices[len(indices) - 1 - np.argmax(lengths_in_window[::-1])]
+            cut = int(pause_mid[best])
+        else:
+            cut = window_end
+        ranges.append((start, cut))
+        start = cut
+
+    ranges.append((start, total))
+    return ranges
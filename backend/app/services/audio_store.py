@@ -0,0 +1,216 @@
+"""
+Content-addressed audio store
+TTS 음성/사용자 녹음 파일 저장소 (내용 해시 기반 주소)
+
+Blobs are addressed by the SHA-256 of their content plus a file extension
+(e.g. 3f2a...c9.mp3), so identical audio is stored once. A key never
+changes its content, which makes it safe to cache forever. The interface
+(put/head/get/delete) follows object-store semantics. The local
+implementation shards files into two directory levels by key prefix and
+writes them atomically in a worker thread.
+
+Every voice turn stores its reply audio, so the store is pruned in the
+background: blobs older than AUDIO_STORE_MAX_AGE_SECONDS are removed, then
+the least recently written ones until the store fits AUDIO_STORE_MAX_BYTES.
+Writing an existing blob again refreshes it.
+"""
+from app.core.config import settings
+from app.core.metrics import metrics
+from abc import ABC, abstractmethod
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES: Dict[str, str] = {
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".ogg": "audio/ogg",
+    ".webm": "audio/webm",
+    ".m4a": "audio/mp4",
+}
+EXTENSIONS = {content_type: ext for ext, content_type in CONTENT_TYPES.items()}
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]{2,4}$")
+
+
+class BlobInfo:
+    """Metadata of a stored blob"""
+
+    __slots__ = ("key", "size", "content_type")
+
+    def __init__(self, key: str, size: int, content_type: str):
+        self.key = key
+        self.size = size
+        self.content_type = content_type
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.key.split(".")[0]}"'
+
+
+class BlobStore(ABC):
+    """Object-store style interface for content-addressed blobs"""
+
+    _prune_task: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def put(self, data: bytes, content_type: str) -> BlobInfo:
+        ...
+
+    @abstractmethod
+    async def head(self, key: str) -> Optional[BlobInfo]:
+        ...
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def prune(self, max_bytes: int, max_age_seconds: float) -> int:
+        """Apply the retention policy; returns the number of blobs removed"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path for zero-copy serving (None for remote stores)"""
+        return None
+
+    def url(self, key: str) -> str:
+        return f"{settings.AUDIO_STORE_URL_PREFIX}/{key}"
+
+    async def _prune_periodically(self) -> None:
+        while True:
+            try:
+                removed = await self.prune(settings.AUDIO_STORE_MAX_BYTES, settings.AUDIO_STORE_MAX_AGE_SECONDS)
+                if removed:
+                    metrics.incr("audio_store_pruned_total", removed)
+                    logger.info(f"Pruned {removed} blobs from the audio store")
+            except Exception as e:
+                logger.error(f"Audio store pruning failed: {e}")
+            await asyncio.sleep(settings.AUDIO_STORE_PRUNE_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        """Start the background pruning loop (call from app startup)"""
+        if self._prune_task is None:
+            self._prune_task = asyncio.create_task(self._prune_periodically())
+
+    async def stop(self) -> None:
+        if self._prune_task is not None:
+            self._prune_task.cancel()
+            self._prune_task = None
+
+
+def blob_key(data: bytes, content_type: str) -> str:
+    """Content address of a blob"""
+    ext = EXTENSIONS.get(content_type.split(";")[0].strip())
+    if ext is None:
+        raise ValueError(f"Unsupported audio type: {content_type}")
+    return hashlib.sha256(data).hexdigest() + ext
+
+
+def content_type_of(key: str) -> str:
+    return CONTENT_TYPES.get(os.path.splitext(key)[1], "application/octet-stream")
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under root/ab/cd/<key>"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        if not KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid blob key: {key}")
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file and rename, so readers never see partial blobs
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    async def put(self, data: bytes, content_type: str) -> BlobInfo:
+        key = blob_key(data, content_type)
+        path = self._path(key)
+        try:
+            os.utime(path)  # same key, same content: only refresh it for retention
+        except FileNotFoundError:
+            await asyncio.to_thread(self._write, path, data)
+        return BlobInfo(key, len(data), content_type_of(key))
+
+    async def head(self, key: str) -> Optional[BlobInfo]:
+        try:
+            size = os.path.getsize(self._path(key))
+        except (OSError, ValueError):
+            return None
+        return BlobInfo(key, size, content_type_of(key))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        def read() -> Optional[bytes]:
+            try:
+                with open(self._path(key), "rb") as f:
+                    return f.read()
+            except (OSError, ValueError):
+                return None
+
+        return await asyncio.to_thread(read)
+
+    async def delete(self, key: str) -> None:
+        try:
+            await asyncio.to_thread(os.unlink, self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+    async def prune(self, max_bytes: int, max_age_seconds: float) -> int:
+        return await asyncio.to_thread(self._prune, max_bytes, max_age_seconds)
+
+    def _prune(self, max_bytes: int, max_age_seconds: float) -> int:
+        blobs: List[Tuple[float, int, str]] = []  # (mtime, size, path)
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not KEY_PATTERN.match(name):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, path))
+
+        blobs.sort()
+        cutoff = time.time() - max_age_seconds if max_age_seconds > 0 else None
+        total = sum(size for _, size, _ in blobs)
+        removed = 0
+        for mtime, size, path in blobs:
+            expired = cutoff is not None and mtime < cutoff
+            if not expired and (max_bytes <= 0 or total <= max_bytes):
+                break  # the rest is newer and fits
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+# Global audio store instance
+audio_store: BlobStore = LocalBlobStore(settings.AUDIO_STORE_DIR)
@@ -0,0 +1,129 @@
+"""
+Scenario Content Reloader
+시나리오 콘텐츠 변경 감지 및 무중단 교체
+
+Polls the scenario content directory. When files change, the new content
+is loaded and validated off the event loop; an invalid version is logged
+and ignored. A valid one replaces the catalog snapshot in one swap, and
+only the caches derived from the scenarios that changed are invalidated:
+
+- ETags: recomputed from the new bodies, so unchanged scenarios keep theirs
+- Prompts: compiled templates (and their Gemini models) of changed scenarios
+- Phrase index: content phrases rebuilt (learned phrases kept)
+- TTS: cached audio for phrases that no longer exist in the new content
+"""
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.llm_service import llm_service
+from app.services.phrase_index import phrase_index
+from app.services.prompt_registry import prompt_registry
+from app.services.scenario_catalog import (
+    CONTENT_LANGUAGE_CODE,
+    ScenarioCatalog,
+    content_fingerprint,
+    load_scenario_catalog,
+    scenario_catalog,
+)
+from app.services.scenario_packs import scenario_packs
+from app.services.tts_service import tts_service
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ContentReloader:
+    """Watches scenario files and swaps in validated new versions"""
+
+    def __init__(self, content_dir: str):
+        self.content_dir = content_dir
+        self._fingerprint = content_fingerprint(content_dir)
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def reload(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Reload the content if the files changed (or `force`)
+
+        Returns:
+            Dictionary with "reloaded", "version" and "changed" (scenario ids)
+        """
+        async with self._lock:
+            fingerprint = await asyncio.to_thread(content_fingerprint, self.content_dir)
+            if not force and fingerprint == self._fingerprint:
+                return {"reloaded": False, "version": scenario_catalog.current.version, "changed": []}
+
+            try:
+                catalog = await asyncio.to_thread(load_scenario_catalog, self.content_dir)
+            except Exception as e:
+                # Keep serving the current snapshot; retry once the files change again
+                self._fingerprint = fingerprint
+                metrics.incr("content_reloads_total", outcome="invalid")
+                logger.error(f"Rejected scenario content update: {e}")
+                return {"reloaded": False, "version": scenario_catalog.current.version, "changed": [], "error": str(e)}
+
+            self._fingerprint = fingerprint
+            previous = scenario_catalog.swap(catalog)
+            changed = previous.changed_scenarios(catalog)
+            await self._invalidate(previous, catalog, changed)
+
+            metrics.incr("content_reloads_total", outcome="swapped")
+            logger.info(
+                f"Scenario content {previous.version} -> {catalog.version}, changed: {sorted(changed) or 'none'}"
+            )
+            return {"reloaded": True, "version": catalog.version, "changed": sorted(changed)}
+
+    async def _invalidate(self, previous: ScenarioCatalog, catalog: ScenarioCatalog, changed: set) -> None:
+        if not changed:
+            return
+
+        phrase_index.load_catalog(catalog)
+        # The general scenario's glossary lists every scenario's phrases
+        stale_prompts = changed | {"general"} if settings.PHRASE_INDEX_ENABLED else changed
+        llm_service.forget_prefixes(prompt_registry.invalidate(stale_prompts))
+
+        stale_texts = set()
+        for scenario_id in changed:
+            stale_texts |= previous.spoken_texts(scenario_id)
+        for scenario_id in catalog.scenarios:
+            stale_texts -= catalog.spoken_texts(scenario_id)
+        for text in stale_texts:
+            await tts_service.invalidate(text, CONTENT_LANGUAGE_CODE)
+        metrics.incr("content_tts_invalidations_total", len(stale_texts))
+
+        if settings.TTS_WARM_ON_RELOAD and tts_service.client is not None:
+            for scenario_id in sorted(changed & set(catalog.scenarios)):
+                try:
+                    await tts_service.synthesize_batch(sorted(catalog.spoken_texts(scenario_id)), CONTENT_LANGUAGE_CODE)
+                except Exception as e:
+                    logger.warning(f"Could not warm audio for scenario {scenario_id}: {e}")
+
+        if settings.PACK_BUILD_ON_RELOAD:
+            for scenario_id in sorted(changed & set(catalog.scenarios)):
+                try:
+                    await scenario_packs.build(scenario_id)
+                except Exception as e:
+                    logger.warning(f"Could not rebuild the pack for scenario {scenario_id}: {e}")
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(settings.SCENARIO_RELOAD_INTERVAL_SECONDS)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Scenario content reload failed: {e}")
+
+    def start(self) -> None:
+        """Start watching (call from app startup); disabled when the interval is 0"""
+        if self._task is None and settings.SCENARIO_RELOAD_INTERVAL_SECONDS > 0:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Global reloader instance
+content_reloader = ContentReloader(settings.SCENARIO_CONTENT_DIR)
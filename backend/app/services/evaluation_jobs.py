@@ -0,0 +1,46 @@
+"""
+Conversation evaluation jobs
+대화 평가 작업 (작업 큐에서 실행)
+"""
+from app.core.config import settings
+from app.services.job_queue import job_queue
+from app.services.llm_service import llm_service
+from app.services.progress_service import progress_service
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+EVALUATE_CONVERSATION = "evaluate_conversation"
+
+
+async def run_conversation_evaluation(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Evaluate a session transcript and record the score for the learner
+
+    Payload keys match EvaluationRequest in app/api/conversation.py.
+    """
+    history = [
+        {"role": msg["role"], "content": msg["content"]}
+        for msg in payload["conversation_history"]
+    ]
+
+    evaluation = await llm_service.evaluate_conversation(
+        conversation_history=history,
+        learning_goals=payload.get("learning_goals"),
+    )
+
+    if payload.get("user_id") is not None and not evaluation.get("is_fallback"):
+        await progress_service.record_session(
+            user_id=payload["user_id"],
+            scenario=payload.get("scenario", "general"),
+            language_code=payload.get("language_code", "km-KH"),
+            overall_score=evaluation.get("overall_score", 0),
+            message_count=len(history),
+            session_id=payload.get("session_id"),
+        )
+
+    return evaluation
+
+
+job_queue.register(EVALUATE_CONVERSATION, run_conversation_evaluation, workers=settings.JOB_EVALUATION_WORKERS)
@@ -0,0 +1,170 @@
+"""
+Idempotent request handling
+재전송된 음성 요청의 중복 처리 방지 (진행 중 요청 합류, 결과 재사용)
+
+Mobile clients retry uploads after timeouts. A retried request is
+identified by its Idempotency-Key header or, without one, by a hash of the
+audio and parameters. A duplicate that arrives while the original is still
+running waits for it: in-process through a shared future, across worker
+processes through a claim in the shared cache. A duplicate that arrives
+afterwards gets the stored result, which is kept for
+IDEMPOTENCY_TTL_SECONDS. STT, Gemini, TTS and the progress writes
+therefore run once per logical request.
+
+Failed computations are not stored, so a retry after an error runs again.
+If the original request is cancelled (its client disconnected), the
+duplicates waiting on it compute the result themselves.
+"""
+from app.core.cache import cache, make_key
+from app.core.config import settings
+from app.core.metrics import metrics
+import asyncio
+import contextlib
+import hashlib
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyConflictError(Exception):
+    """An Idempotency-Key was reused with a different request"""
+
+
+def fingerprint(*parts: Union[bytes, str, int, float, None]) -> str:
+    """Hash of the request content (audio bytes and parameters)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    """Runs each logical request once and replays its result"""
+
+    def __init__(self):
+        # key -> (request fingerprint, future of the running computation)
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+    async def run(
+        self,
+        route: str,
+        idempotency_key: Optional[str],
+        request_fingerprint: str,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """
+        Return the result for this request, computing it at most once
+
+        Args:
+            route: Name of the endpoint (keys are scoped per route)
+            idempotency_key: Client-supplied key, or None to use the fingerprint
+            request_fingerprint: fingerprint() of the request content
+            compute: Produces a JSON-serializable result
+
+        Returns:
+            (result, replayed); replayed is True when another request computed it
+
+        Raises:
+            IdempotencyConflictError: If the key was used for different content
+        """
+        if not settings.IDEMPOTENCY_ENABLED:
+            return await compute(), False
+
+        key = hashlib.sha256(f"{route}\x1f{idempotency_key or request_fingerprint}".encode("utf-8")).hexdigest()[:32]
+        result_key = make_key("idem", key)
+
+        stored = await self._stored(result_key, request_fingerprint, route)
+        if stored is not None:
+            return stored, True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            inflight_fingerprint, future = inflight
+            if inflight_fingerprint != request_fingerprint:
+                metrics.incr("idempotent_requests_total", route=route, outcome="conflict")
+                raise IdempotencyConflictError("Idempotency-Key was already used for a different request")
+            metrics.incr("idempotent_requests_total", route=route, outcome="joined")
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), settings.IDEMPOTENCY_WAIT_SECONDS), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # this request itself was cancelled
+            except asyncio.TimeoutError:
+                # The owner is too slow; compute instead of failing the retry
+                logger.warning(f"Idempotent {route} request still running after {settings.IDEMPOTENCY_WAIT_SECONDS}s")
+                return await compute(), False
+            # The owner was cancelled; start over (one of the joiners takes over)
+            return await self.run(route, idempotency_key, request_fingerprint, compute)
+
+        # Only the first concurrent request (across processes) computes
+        claim_key = make_key("idemclaim", key)
+        claims = await cache.incr(claim_key, ttl=settings.IDEMPOTENCY_WAIT_SECONDS)
+        if claims > 1:
+            stored = await self._wait_for_result(result_key, claim_key, request_fingerprint)
+            if stored is not None:
+                metrics.incr("idempotent_requests_total", route=route, outcome="joined")
+                return stored, True
+            # The owner failed or is too slow; compute instead of failing the retry
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = (request_fingerprint, future)
+        try:
+            result = await compute()
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()  # joined requests recompute instead of failing
+            await cache.delete(claim_key)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved; joined requests re-raise it themselves
+            await cache.delete(claim_key)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        try:
+            await cache.set_json(
+                result_key,
+                {"fingerprint": request_fingerprint, "result": result},
+                ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+            )
+        except Exception as e:
+            # The work is done; a later retry just runs again instead of replaying
+            logger.error(f"Failed to store idempotent {route} result: {e}")
+            with contextlib.suppress(Exception):
+                await cache.delete(claim_key)
+        metrics.incr("idempotent_requests_total", route=route, outcome="computed")
+        return result, False
+
+    async def _stored(self, result_key: str, request_fingerprint: str, route: str) -> Optional[Any]:
+        stored = await cache.get_json(result_key)
+        if stored is None:
+            return None
+        if stored["fingerprint"] != request_fingerprint:
+            metrics.incr("idempotent_requests_total", route=route, outcome="conflict")
+            raise IdempotencyConflictError("Idempotency-Key was already used for a different request")
+        metrics.incr("idempotent_requests_total", route=route, outcome="replayed")
+        return stored["result"]
+
+    async def _wait_for_result(self, result_key: str, claim_key: str, request_fingerprint: str) -> Optional[Any]:
+        """Poll for the result another worker process is computing"""
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+            stored = await cache.get_json(result_key)
+            if stored is not None:
+                if stored["fingerprint"] != request_fingerprint:
+                    raise IdempotencyConflictError("Idempotency-Key was already used for a different request")
+                return stored["result"]
+            if await cache.get(claim_key) is None:
+                return None  # the owner failed and released its claim
+        return None
+
+
+# Global idempotency store instance
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,244 @@
+"""
+Background Job Queue
+오래 걸리는 작업(대화 평가)의 비동기 처리
+
+Slow LLM work is submitted as a job and processed by a bounded pool of
+asyncio workers per job kind, so its throughput is tuned independently of
+interactive requests. Jobs are prioritized (lower number first) and
+deduplicated: the job id is a hash of the kind and payload, and an
+identical submission while the job is queued, running or finished returns
+the same id. Job records live in the shared cache, so any worker process
+can answer status polls and SSE streams.
+
+The process that queued a job holds a lease on it, renewed by a heartbeat
+while the job is queued or running. A queued/running record whose lease
+has expired belongs to a crashed or killed worker; it is marked failed
+when read, so resubmissions run the job again instead of waiting on it.
+"""
+from app.core.cache import cache, make_key
+from app.core.config import settings
+from app.core.metrics import metrics
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TERMINAL_STATUSES = (SUCCEEDED, FAILED)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class QueueFullError(Exception):
+    """Raised when a job kind has reached its queue limit"""
+
+
+class JobQueue:
+    """Priority queues and worker pools per job kind"""
+
+    def __init__(self):
+        self._handlers: Dict[str, Tuple[JobHandler, int]] = {}
+        self._queues: Dict[str, asyncio.PriorityQueue] = {}
+        self._workers: List[asyncio.Task] = []
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._sequence = itertools.count()  # FIFO within a priority
+        self._owned: Dict[str, str] = {}  # job id -> kind, queued or running in this process
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def register(self, kind: str, handler: JobHandler, workers: int) -> None:
+        """Register the coroutine that runs jobs of `kind` and its pool size"""
+        self._handlers[kind] = (handler, workers)
+
+    def _record_key(self, job_id: str) -> str:
+        return make_key("job", job_id)
+
+    def _lease_key(self, job_id: str) -> str:
+        return make_key("joblease", job_id)
+
+    async def _renew_lease(self, job_id: str) -> None:
+        await cache.set(self._lease_key(job_id), str(os.getpid()).encode(), ttl=settings.JOB_LEASE_SECONDS)
+
+    def job_id(self, kind: str, payload: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(
+            (kind + "\n" + json.dumps(payload, sort_keys=True, ensure_ascii=False)).encode("utf-8")
+        ).hexdigest()
+        return digest[:32]
+
+    async def submit(self, kind: str, payload: Dict[str, Any], priority: int = 5) -> Dict[str, Any]:
+        """
+        Queue a job (or return the existing identical one)
+
+        Returns:
+            The job record
+
+        Raises:
+            QueueFullError: If the queue of this kind is at capacity
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job_id = self.job_id(kind, payload)
+        existing = await self.get(job_id)
+        if existing is not None and existing["status"] != FAILED:
+            metrics.incr("jobs_deduplicated_total", kind=kind)
+            return existing
+
+        # Only the first concurrent submitter (across processes) enqueues the job
+        claims = await cache.incr(make_key("jobclaim", job_id), ttl=settings.JOB_RESULT_TTL_SECONDS)
+        if claims > 1 and existing is None:
+            metrics.incr("jobs_deduplicated_total", kind=kind)
+            return await self._wait_for_record(job_id)
+
+        queue = self._queues.setdefault(kind, asyncio.PriorityQueue())
+        if queue.qsize() >= settings.JOB_QUEUE_MAX_SIZE:
+            await cache.delete(make_key("jobclaim", job_id))
+            metrics.incr("jobs_rejected_total", kind=kind)
+            raise QueueFullError(f"Too many pending {kind} jobs")
+
+        record = {
+            "id": job_id,
+            "kind": kind,
+            "status": QUEUED,
+            "priority": priority,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        self._owned[job_id] = kind
+        await self._renew_lease(job_id)
+        await self._save(record)
+        self._waiters[job_id] = asyncio.get_running_loop().create_future()
+        queue.put_nowait((priority, next(self._sequence), job_id, payload))
+        metrics.incr("jobs_submitted_total", kind=kind)
+        return record
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current job record, from any worker process (orphaned jobs read as failed)"""
+        record = await cache.get_json(self._record_key(job_id))
+        if record is None or record["status"] in TERMINAL_STATUSES or job_id in self._owned:
+            return record
+        if await cache.get(self._lease_key(job_id)) is not None:
+            return record
+
+        # The owning worker died before finishing: fail the job so it can be resubmitted
+        logger.warning(f"Job {record.get('kind')}/{job_id} lost its worker; marking it failed")
+        record.update(status=FAILED, error="Worker lost before the job finished", finished_at=time.time())
+        await self._save(record)
+        await cache.delete(make_key("jobclaim", job_id))
+        metrics.incr("jobs_completed_total", kind=record.get("kind", ""), outcome="orphaned")
+        return record
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait until the job finishes and return its final record"""
+        waiter = self._waiters.get(job_id)
+        if waiter is not None:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            return await self.get(job_id)
+
+        # Job owned by another process: poll the shared record
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            record = await self.get(job_id)
+            if record is None or record["status"] in TERMINAL_STATUSES:
+                return record
+            if deadline is not None and time.monotonic() >= deadline:
+                raise asyncio.TimeoutError()
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+
+    async def _wait_for_record(self, job_id: str) -> Dict[str, Any]:
+        """The record of a job another submitter is creating right now"""
+        for _ in range(50):
+            record = await self.get(job_id)
+            if record is not None:
+                return record
+            await asyncio.sleep(0.02)
+        raise RuntimeError(f"Job {job_id} was claimed but never recorded")
+
+    async def _save(self, record: Dict[str, Any]) -> None:
+        await cache.set_json(self._record_key(record["id"]), record, ttl=settings.JOB_RESULT_TTL_SECONDS)
+
+    async def _run(self, kind: str, handler: JobHandler) -> None:
+        queue = self._queues.setdefault(kind, asyncio.PriorityQueue())
+        while True:
+            _, _, job_id, payload = await queue.get()
+            record = await self.get(job_id) or {"id": job_id, "kind": kind}
+            record.update(status=RUNNING, started_at=time.time())
+            await self._save(record)
+
+            try:
+                record.update(status=SUCCEEDED, result=await handler(payload))
+                metrics.incr("jobs_completed_total", kind=kind, outcome="succeeded")
+            except asyncio.CancelledError:
+                record.update(status=FAILED, error="Interrupted by shutdown")
+                await self._finish(record)
+                raise
+            except Exception as e:
+                logger.error(f"Job {kind}/{job_id} failed: {e}")
+                record.update(status=FAILED, error=str(e))
+                metrics.incr("jobs_completed_total", kind=kind, outcome="failed")
+
+            await self._finish(record)
+            metrics.incr("jobs_run_seconds_total", record["finished_at"] - record["started_at"], kind=kind)
+            queue.task_done()
+
+    async def _finish(self, record: Dict[str, Any]) -> None:
+        record["finished_at"] = time.time()
+        await self._save(record)
+        self._owned.pop(record["id"], None)
+        await cache.delete(self._lease_key(record["id"]))
+        if record["status"] == FAILED:
+            await cache.delete(make_key("jobclaim", record["id"]))  # allow a retry
+        waiter = self._waiters.pop(record["id"], None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(record["status"])
+
+    async def _renew_leases(self) -> None:
+        """Heartbeat: keep the leases of this process's jobs alive"""
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            for job_id in list(self._owned):
+                try:
+                    await self._renew_lease(job_id)
+                except Exception as e:
+                    logger.error(f"Failed to renew lease of job {job_id}: {e}")
+
+    def start(self) -> None:
+        """Start the worker pools (call from app startup)"""
+        if self._workers:
+            return
+        for kind, (handler, workers) in self._handlers.items():
+            for _ in range(workers):
+                self._workers.append(asyncio.create_task(self._run(kind, handler)))
+        self._heartbeat = asyncio.create_task(self._renew_leases())
+        logger.info(f"Job workers started: { {k: w for k, (_, w) in self._handlers.items()} }")
+
+    async def stop(self) -> None:
+        """Cancel the workers; queued jobs are marked failed so clients can resubmit"""
+        tasks = self._workers + ([self._heartbeat] if self._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat = None
+
+        for kind, queue in self._queues.items():
+            while not queue.empty():
+                _, _, job_id, _ = queue.get_nowait()
+                record = await self.get(job_id) or {"id": job_id, "kind": kind}
+                record.update(status=FAILED, error="Interrupted by shutdown")
+                await self._finish(record)
+
+
+# Global queue instance
+job_queue = JobQueue()
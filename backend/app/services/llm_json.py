@@ -0,0 +1,160 @@
+"""
+Tolerant JSON parsing for LLM responses
+마크다운 코드펜스 제거 및 사소한 JSON 오류 복구
+
+Gemini sometimes wraps its JSON in ```json fences, adds a sentence before
+or after the object, or leaves a trailing comma. These are repaired locally
+instead of falling back to canned output (which makes learners retry).
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+class LLMJSONError(ValueError):
+    """Raised when a response cannot be turned into a JSON object"""
+
+
+class JSONObjectScanner:
+    """
+    Incremental scanner that finds the first complete top-level JSON object
+
+    Feed streamed text chunks; once `complete` is True the object text is
+    available in `text` and the rest of the stream can be ignored.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escaped = False
+        self.complete = False
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk of text; returns True once an object is complete"""
+        if self.complete:
+            return True
+
+        for char in chunk:
+            if not self._started:
+                if char != "{":
+                    continue
+                self._started = True
+
+            self._buffer.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+                    return True
+
+        return False
+
+    @property
+    def text(self) -> str:
+        """Object text seen so far, closing any brackets left open by truncation"""
+        text = "".join(self._buffer)
+        if self.complete or not self._started:
+            return text
+
+        # Best-effort repair of a truncated object
+        if self._in_string:
+            text += '"'
+        stack = []
+        in_string = escaped = False
+        for char in text:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in "{[":
+                stack.append("}" if char == "{" else "]")
+            elif char in "}]" and stack:
+                stack.pop()
+        return text.rstrip().rstrip(",") + "".join(reversed(stack))
+
+
+def _repair(text: str) -> str:
+    """Apply trivial syntax repairs that do not change the content"""
+    return _TRAILING_COMMA.sub(r"\1", text)
+
+
+def parse_llm_json(text: Optional[str]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Parse a JSON object out of an LLM response
+
+    Returns:
+        (parsed object, repaired) where `repaired` is True when the raw text
+        was not valid JSON as-is
+
+    Raises:
+        LLMJSONError: if no JSON object can be recovered
+    """
+    if not text:
+        raise LLMJSONError("Empty response")
+
+    try:
+        result = json.loads(text)
+        if isinstance(result, dict):
+            return result, False
+    except ValueError:
+        pass
+
+    scanner = JSONObjectScanner()
+    scanner.feed(text)
+    candidate = scanner.text
+    if not candidate:
+        raise LLMJSONError("No JSON object found in response")
+
+    for attempt in (candidate, _repair(candidate)):
+        try:
+            result = json.loads(attempt, strict=False)
+        except ValueError:
+            continue
+        if isinstance(result, dict):
+            return result, True
+
+    raise LLMJSONError("Could not repair JSON response")
+
+
+def missing_required(value: Any, schema: Dict[str, Any], path: str = "") -> List[str]:
+    """
+    Required keys (dotted paths) absent from a parsed response
+
+    Follows the Gemini response schema into nested objects and array items,
+    so a truncated batch entry is caught as well as a truncated top level.
+    """
+    missing = []
+    if schema.get("type") == "OBJECT" and isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                missing.append(f"{path}{key}")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                missing.extend(missing_required(value[key], sub_schema, f"{path}{key}."))
+    elif schema.get("type") == "ARRAY" and isinstance(value, list):
+        for i, item in enumerate(value):
+            missing.extend(missing_required(item, schema.get("items", {}), f"{path}{i}."))
+    return missing
@@ -1,29 +1,256 @@
 """
 LLM Service using Google Gemini API
 크메르어 대화 분석 및 피드백 생성
+
+Gemini calls go through a circuit breaker. Conversation replies also have
+a deadline; when it is missed, the call fails or the circuit is open, the
+closest reply from the pre-generated reply bank is served instead.
 """
 import google.generativeai as genai
 from app.core.config import settings
+from app.core.cache import cache, make_key
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.metrics import metrics
+from app.services.llm_json import JSONObjectScanner, LLMJSONError, missing_required, parse_llm_json
+from app.services.phrase_index import phrase_index
+from app.services.prompt_registry import CompiledPrompt, prompt_registry
+from app.services.reply_bank import reply_bank
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
-import json
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+# JSON response schemas for Gemini structured output (one per method)
+ANALYSIS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "accuracy_score": {"type": "INTEGER"},
+        "pronunciation_feedback": {"type": "STRING"},
+        "grammar_feedback": {"type": "STRING"},
+        "naturalness_score": {"type": "INTEGER"},
+        "suggestions": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "correct_version": {"type": "STRING"},
+    },
+    "required": [
+        "accuracy_score",
+        "pronunciation_feedback",
+        "grammar_feedback",
+        "naturalness_score",
+        "suggestions",
+        "correct_version",
+    ],
+}
+
+BATCH_ANALYSIS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "results": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {"index": {"type": "INTEGER"}, **ANALYSIS_SCHEMA["properties"]},
+                "required": ["index"] + ANALYSIS_SCHEMA["required"],
+            },
+        },
+    },
+    "required": ["results"],
+}
+
+RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "response_text": {"type": "STRING"},
+        "response_translation_kr": {"type": "STRING"},
+        "key_phrases": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "cultural_note": {"type": "STRING"},
+    },
+    "required": ["response_text", "response_translation_kr", "key_phrases"],
+}
+
+EVALUATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "overall_score": {"type": "INTEGER"},
+        "fluency_score": {"type": "INTEGER"},
+        "vocabulary_score": {"type": "INTEGER"},
+        "grammar_score": {"type": "INTEGER"},
+        "strengths": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "areas_for_improvement": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "recommended_next_steps": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "encouraging_message": {"type": "STRING"},
+    },
+    "required": [
+        "overall_score",
+        "fluency_score",
+        "vocabulary_score",
+        "grammar_score",
+        "strengths",
+        "areas_for_improvement",
+        "recommended_next_steps",
+        "encouraging_message",
+    ],
+}
+
+
 class LLMService:
     """Language Learning Model service for conversation and feedback"""
 
     def __init__(self):
         """Initialize Gemini API"""
+        self.breaker = CircuitBreaker(
+            "gemini",
+            settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            settings.LLM_CIRCUIT_RESET_SECONDS,
+        )
         try:
             genai.configure(api_key=settings.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel('gemini-pro')
+            self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+            # One model per compiled system instruction (stable prefix for context caching)
+            self._prefix_models: Dict[str, Any] = {}
             logger.info("LLM Service initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize LLM Service: {e}")
             self.model = None
 
+    def _cache_key(self, prompt: str) -> str:
+        """Cache key for a fully rendered prompt"""
+        return make_key("llm", hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+
+    def _model_for(self, compiled: CompiledPrompt):
+        """Model carrying the compiled system instruction, created once per prefix"""
+        model = self._prefix_models.get(compiled.prefix_id)
+        if model is None:
+            model = genai.GenerativeModel(
+                settings.GEMINI_MODEL,
+                system_instruction=compiled.system_instruction,
+            )
+            self._prefix_models[compiled.prefix_id] = model
+        return model
+
+    def forget_prefixes(self, prefix_ids: Set[str]) -> None:
+        """Release per-prefix models whose templates were invalidated"""
+        if self.model is None:
+            return
+        for prefix_id in prefix_ids:
+            self._prefix_models.pop(prefix_id, None)
+
+    async def _get_cached(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Return a previously parsed response for an identical prompt"""
+        return await cache.get_json(self._cache_key(prompt))
+
+    async def _store_cached(self, prompt: str, result: Dict[str, Any]) -> None:
+        """Store a successfully parsed response (fallbacks are never cached)"""
+        await cache.set_json(self._cache_key(prompt), result, ttl=settings.LLM_CACHE_TTL_SECONDS)
+
+    async def _generate_json(
+        self,
+        compiled: CompiledPrompt,
+        user_prompt: str,
+        schema: Dict[str, Any],
+        deadline: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a compiled prompt and parse its JSON object response
+
+        Uses Gemini structured output with the method's response schema and
+        stops reading the stream as soon as a complete object has arrived.
+        Latency and token usage are recorded per template version. The
+        blocking stream is read in a worker thread; with `deadline` (seconds)
+        the call is abandoned when it takes longer.
+
+        A response cut off mid-object is only accepted when the closed-up
+        object still has every required key, and it is never cached.
+
+        Raises:
+            LLMJSONError: if no JSON object with the required keys could be recovered
+            CircuitOpenError: if Gemini is failing and the circuit is open
+            asyncio.TimeoutError: if the deadline passed
+        """
+        method = compiled.method
+        cache_prompt = f"{compiled.prefix_id}\n{user_prompt}"
+        cached = await self._get_cached(cache_prompt)
+        if cached is not None:
+            return cached
+
+        generation_config = None
+        if settings.LLM_STRUCTURED_OUTPUT:
+            generation_config = genai.GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=schema,
+            )
+
+        if not self.breaker.allow():
+            raise CircuitOpenError("Gemini circuit is open")
+
+        started = time.perf_counter()
+        try:
+            scanner, raw_text, usage = await asyncio.wait_for(
+                asyncio.to_thread(self._stream_json, compiled, user_prompt, generation_config),
+                deadline,
+            )
+        except BaseException:
+            # Cancellation counts too, or a half-open trial would never report back
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+        self._record_template_usage(compiled, time.perf_counter() - started, usage)
+
+        try:
+            result, repaired = parse_llm_json(scanner.text if scanner.complete else raw_text)
+        except LLMJSONError:
+            metrics.incr("llm_json_parse_total", method=method, outcome="failed")
+            logger.warning(f"{method}: unparseable LLM response: {raw_text[:200]!r}")
+            raise
+
+        missing = missing_required(result, schema)
+        if missing:
+            metrics.incr("llm_json_parse_total", method=method, outcome="incomplete")
+            logger.warning(f"{method}: LLM response is missing required keys {missing}")
+            raise LLMJSONError(f"Response is missing required keys: {', '.join(missing)}")
+
+        # The stream ended before the object closed: usable once, but not worth caching
+        truncated = not scanner.complete
+        if truncated:
+            outcome = "truncated"
+        else:
+            outcome = "repaired" if repaired else "ok"
+        metrics.incr("llm_json_parse_total", method=method, outcome=outcome)
+        if not truncated:
+            await self._store_cached(cache_prompt, result)
+        return result
+
+    def _stream_json(self, compiled: CompiledPrompt, user_prompt: str, generation_config: Any) -> Tuple[JSONObjectScanner, str, Any]:
+        """Read the response stream until a complete JSON object has arrived"""
+        response = self._model_for(compiled).generate_content(
+            user_prompt,
+            generation_config=generation_config,
+            stream=True,
+        )
+
+        scanner = JSONObjectScanner()
+        raw_chunks = []
+        usage = None
+        for chunk in response:
+            raw_chunks.append(chunk.text)
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if scanner.feed(chunk.text):
+                break
+        return scanner, "".join(raw_chunks), usage
+
+    def _record_template_usage(self, compiled: CompiledPrompt, latency: float, usage: Any) -> None:
+        """Record per-template latency and token cost for A/B comparison"""
+        labels = {"method": compiled.method, "version": compiled.version}
+        metrics.incr("llm_prompt_requests_total", **labels)
+        metrics.incr("llm_prompt_latency_seconds_total", latency, **labels)
+        if usage is not None:
+            metrics.incr("llm_prompt_input_tokens_total", getattr(usage, "prompt_token_count", 0) or 0, **labels)
+            metrics.incr("llm_prompt_output_tokens_total", getattr(usage, "candidates_token_count", 0) or 0, **labels)
+
     async def analyze_pronunciation(
         self,
         user_text: str,
@@ -45,46 +272,92 @@ class LLMService:
             raise RuntimeError("LLM Service not initialized")
 
         try:
-            prompt = f"""
-You are a {language} language teacher helping Korean volunteers learn practical conversation skills.
-
-Analyze this {language} speech:
-User said: "{user_text}"
-{f'Expected: "{expected_text}"' if expected_text else ''}
-
-Provide a detailed analysis in JSON format:
-{{
-    "accuracy_score": 0-100,
-    "pronunciation_feedback": "Clear, specific feedback in Korean",
-    "grammar_feedback": "Grammar notes in Korean",
-    "naturalness_score": 0-100,
-    "suggestions": ["Practical improvement tips in Korean"],
-    "correct_version": "Corrected {language} text if needed"
-}}
-
-Focus on practical communication, not academic perfection. Be encouraging but honest.
-"""
+            compiled = prompt_registry.get("analyze_pronunciation", language=language)
+            user_prompt = compiled.render(
+                user_text=user_text,
+                expected_line=f'Expected: "{expected_text}"' if expected_text else "",
+            )
 
-            response = self.model.generate_content(prompt)
-            result = json.loads(response.text)
+            return await self._generate_json(compiled, user_prompt, ANALYSIS_SCHEMA)
 
-            return result
-
-        except json.JSONDecodeError:
-            # Fallback if response is not JSON
-            logger.warning("LLM response was not valid JSON, returning raw response")
+        except LLMJSONError:
+            # Fallback if no JSON object could be recovered
             return {
                 "accuracy_score": 50,
-                "pronunciation_feedback": response.text,
+                "pronunciation_feedback": "",
                 "grammar_feedback": "",
                 "naturalness_score": 50,
                 "suggestions": [],
                 "correct_version": user_text,
+                "is_fallback": True,
             }
         except Exception as e:
             logger.error(f"LLM analysis error: {e}")
             raise Exception(f"Failed to analyze pronunciation: {str(e)}")
 
+    async def analyze_pronunciation_batch(
+        self,
+        attempts: List[Dict[str, Optional[str]]],
+        language: str = "Khmer",
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze several drill attempts with a single LLM call
+
+        Args:
+            attempts: List of {"user_text", "expected_text"} in recording order
+            language: Target language
+
+        Returns:
+            One analysis per attempt, in the same order
+        """
+        if not self.model:
+            raise RuntimeError("LLM Service not initialized")
+
+        if not attempts:
+            return []
+
+        try:
+            attempts_text = "\n".join(
+                f'{i}. User said: "{a["user_text"]}"'
+                + (f' / Expected: "{a["expected_text"]}"' if a.get("expected_text") else "")
+                for i, a in enumerate(attempts)
+            )
+
+            compiled = prompt_registry.get("analyze_pronunciation_batch", language=language)
+            user_prompt = compiled.render(attempts_text=attempts_text)
+
+            result = await self._generate_json(compiled, user_prompt, BATCH_ANALYSIS_SCHEMA)
+            by_index = {
+                item.get("index"): item
+                for item in result.get("results", [])
+                if isinstance(item, dict)
+            }
+        except LLMJSONError:
+            by_index = {}
+        except Exception as e:
+            logger.error(f"LLM batch analysis error: {e}")
+            raise Exception(f"Failed to analyze pronunciation batch: {str(e)}")
+
+        analyses = []
+        for i, attempt in enumerate(attempts):
+            analysis = by_index.get(i)
+            if analysis is None:
+                # Missing entry: same neutral fallback as the single-attempt call
+                analysis = {
+                    "accuracy_score": 50,
+                    "pronunciation_feedback": "",
+                    "grammar_feedback": "",
+                    "naturalness_score": 50,
+                    "suggestions": [],
+                    "correct_version": attempt["user_text"],
+                    "is_fallback": True,
+                }
+            else:
+                analysis = {k: v for k, v in analysis.items() if k != "index"}
+            analyses.append(analysis)
+
+        return analyses
+
     async def generate_response(
         self,
         user_input: str,
@@ -105,6 +378,9 @@ Focus on practical communication, not academic perfection. Be encouraging but ho
             AI response with text and metadata
         """
         if not self.model:
+            banked = self._banked_reply(scenario, language, user_input, reason="unavailable")
+            if banked is not None:
+                return banked
             raise RuntimeError("LLM Service not initialized")
 
         try:
@@ -114,54 +390,54 @@ Focus on practical communication, not academic perfection. Be encouraging but ho
                 for msg in conversation_context[-5:]  # Last 5 messages
             ])
 
-            scenario_prompts = {
-                "market": "You are a market vendor in Cambodia. Use simple, practical Khmer. Focus on prices, products, and basic negotiation.",
-                "transport": "You are a tuk-tuk driver in Cambodia. Use casual Khmer for directions, prices, and small talk.",
-                "workplace": "You are a Cambodian colleague at work. Use polite Khmer with appropriate honorifics.",
-                "general": "You are a friendly Cambodian local helping a Korean volunteer practice Khmer.",
-            }
-
-            scenario_instruction = scenario_prompts.get(scenario, scenario_prompts["general"])
-
-            prompt = f"""
-{scenario_instruction}
-
-Previous conversation:
-{context_text}
-
-User just said: "{user_input}"
-
-Generate a natural response in {language} that:
-1. Continues the conversation naturally
-2. Uses vocabulary appropriate for the scenario
-3. Keeps responses short and conversational (1-2 sentences)
-4. Helps the learner practice practical phrases
-
-Respond in JSON format:
-{{
-    "response_text": "Your {language} response",
-    "response_translation_kr": "한국어 번역",
-    "key_phrases": ["Important phrases from your response with Korean translation"],
-    "cultural_note": "Optional cultural tip in Korean"
-}}
-"""
-
-            response = self.model.generate_content(prompt)
-            result = json.loads(response.text)
-
-            return result
-
-        except json.JSONDecodeError:
-            logger.warning("LLM response was not valid JSON")
+            compiled = prompt_registry.get("generate_response", scenario=scenario, language=language)
+            user_prompt = compiled.render(context_text=context_text, user_input=user_input)
+
+            reply = await self._generate_json(
+                compiled,
+                user_prompt,
+                RESPONSE_SCHEMA,
+                deadline=settings.LLM_REPLY_DEADLINE_SECONDS or None,
+            )
+            if settings.PHRASE_INDEX_ENABLED and language == "Khmer":
+                reply = phrase_index.enrich_reply(reply)
+                metrics.incr("phrase_index_replies_total", coverage=self._coverage_bucket(reply["phrase_coverage"]))
+            return reply
+
+        except LLMJSONError:
             return {
                 "response_text": "សូមអភ័យទោស (Som aphey tos - Sorry)",
                 "response_translation_kr": "죄송합니다",
                 "key_phrases": [],
                 "cultural_note": "",
+                "is_fallback": True,
             }
         except Exception as e:
-            logger.error(f"LLM response generation error: {e}")
-            raise Exception(f"Failed to generate response: {str(e)}")
+            if isinstance(e, asyncio.TimeoutError):
+                reason = "deadline"
+            elif isinstance(e, CircuitOpenError):
+                reason = "circuit_open"
+            else:
+                reason = "error"
+            banked = self._banked_reply(scenario, language, user_input, reason)
+            if banked is not None:
+                return banked
+            logger.error(f"LLM response generation error ({reason}): {e!r}")
+            raise Exception(f"Failed to generate response: {str(e) or reason}")
+
+    def _banked_reply(self, scenario: str, language: str, user_input: str, reason: str) -> Optional[Dict[str, Any]]:
+        """Closest pre-generated reply when Gemini cannot answer in time"""
+        entry = reply_bank.lookup(scenario, language, user_input) if settings.REPLY_BANK_ENABLED else None
+        metrics.incr("llm_degraded_replies_total", reason=reason, outcome="bank" if entry else "miss")
+        if entry is None:
+            return None
+        logger.warning(f"Serving banked reply {entry.id} for {scenario} ({reason})")
+        return {**entry.reply, "source": "reply_bank", "bank_entry_id": entry.id}
+
+    def _coverage_bucket(self, coverage: float) -> str:
+        if coverage >= 1.0:
+            return "full"
+        return "partial" if coverage > 0 else "none"
 
     async def evaluate_conversation(
         self,
@@ -189,35 +465,12 @@ Respond in JSON format:
 
             goals_text = f"\nLearning goals: {', '.join(learning_goals)}" if learning_goals else ""
 
-            prompt = f"""
-You are evaluating a Korean volunteer's Khmer language practice session.
-
-Conversation:
-{conversation_text}
-{goals_text}
-
-Provide a comprehensive evaluation in JSON format:
-{{
-    "overall_score": 0-100,
-    "fluency_score": 0-100,
-    "vocabulary_score": 0-100,
-    "grammar_score": 0-100,
-    "strengths": ["List strengths in Korean"],
-    "areas_for_improvement": ["List areas to work on in Korean"],
-    "recommended_next_steps": ["Specific practice recommendations in Korean"],
-    "encouraging_message": "Motivational message in Korean"
-}}
-
-Be constructive and encouraging. Focus on practical progress.
-"""
-
-            response = self.model.generate_content(prompt)
-            result = json.loads(response.text)
+            compiled = prompt_registry.get("evaluate_conversation")
+            user_prompt = compiled.render(conversation_text=conversation_text, goals_text=goals_text)
 
-            return result
+            return await self._generate_json(compiled, user_prompt, EVALUATION_SCHEMA)
 
-        except json.JSONDecodeError:
-            logger.warning("LLM evaluation response was not valid JSON")
+        except LLMJSONError:
             return {
                 "overall_score": 70,
                 "fluency_score": 70,
@@ -227,6 +480,7 @@ Be constructive and encouraging. Focus on practical progress.
                 "areas_for_improvement": ["더 많은 연습이 필요합니다"],
                 "recommended_next_steps": ["매일 대화 연습을 하세요"],
                 "encouraging_message": "잘하고 계십니다! 계속 노력하세요!",
+                "is_fallback": True,
             }
         except Exception as e:
             logger.error(f"LLM evaluation error: {e}")
@@ -0,0 +1,147 @@
+"""
+Local Pronunciation Scorer
+Gemini 호출 없이 처리하는 로컬 발음 평가 (일상적인 연습용)
+
+Attempts that closely match the expected text with confident recognition
+get complete, templated Korean feedback built from a grapheme cluster
+alignment. Ambiguous or poor attempts return None and are escalated to
+the LLM.
+"""
+from app.core.config import settings
+from app.services.text_alignment import (
+    DELETE,
+    INSERT,
+    SUBSTITUTE,
+    align_clusters,
+    classify_substitution,
+    segment_clusters,
+)
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Korean feedback templates per error pattern
+FEEDBACK_TEMPLATES = {
+    "tone": "'{expected}' 음절의 성조를 '{actual}'(으)로 발음했습니다. 성조의 높낮이에 주의하세요.",
+    "vowel": "'{expected}' 음절의 모음을 '{actual}'(으)로 발음했습니다. 모음 소리를 확인하세요.",
+    "subscript": "'{expected}' 음절의 겹자음(아래 첨자)을 분명하게 발음하세요.",
+    "diacritic": "'{expected}' 음절의 발음 기호(길이/억양)에 주의하세요.",
+    "consonant": "'{expected}' 음절의 자음을 '{actual}'(으)로 발음했습니다.",
+    DELETE: "'{expected}' 음절이 빠졌습니다. 모든 음절을 천천히 발음해보세요.",
+    INSERT: "불필요한 음절 '{actual}'이(가) 들어갔습니다.",
+    "weak_word": "'{word}' 단어를 더 또렷하게 발음해보세요.",
+}
+
+SUGGESTIONS = {
+    "tone": "원어민 발음을 듣고 성조(음의 높낮이와 방향)를 따라해보세요",
+    "vowel": "원어민 발음을 듣고 모음 길이와 입 모양을 따라해보세요",
+    "subscript": "겹자음이 있는 음절은 두 자음을 이어서 천천히 연습하세요",
+    "diacritic": "발음 기호가 있는 음절을 따로 떼어 반복 연습하세요",
+    "consonant": "헷갈리는 자음을 짝지어 비교하며 연습하세요",
+    DELETE: "문장을 음절 단위로 끊어 천천히 말한 뒤 속도를 높이세요",
+    INSERT: "문장을 음절 단위로 끊어 천천히 말한 뒤 속도를 높이세요",
+    "weak_word": "자신 없는 단어를 5번씩 소리 내어 반복하세요",
+}
+
+MAX_FEEDBACK_ITEMS = 3
+
+
+class LocalPronunciationScorer:
+    """Rule-based scorer for high-similarity attempts"""
+
+    def __init__(self):
+        self.min_similarity = settings.LOCAL_SCORER_MIN_SIMILARITY
+        self.min_confidence = settings.LOCAL_SCORER_MIN_CONFIDENCE
+        self.max_weak_word_ratio = settings.LOCAL_SCORER_MAX_WEAK_WORD_RATIO
+
+    def analyze(
+        self,
+        user_text: str,
+        expected_text: Optional[str],
+        stt_confidence: float,
+        similarity_score: float,
+        word_scores: List[Dict[str, Any]],
+        force: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Produce an LLM-compatible analysis, or None to escalate
+
+        Args:
+            user_text: Transcript of the attempt
+            expected_text: Target phrase (required for local scoring)
+            stt_confidence: Overall recognition confidence (0-1)
+            similarity_score: Transcript/target similarity (0-100)
+            word_scores: Output of PronunciationService._analyze_word_confidence
+            force: Always score locally (degraded mode under overload)
+
+        Returns:
+            Analysis with the same keys as LLMService.analyze_pronunciation
+        """
+        weak_words = [w for w in word_scores if w.get("needs_practice")]
+
+        if not force:
+            if not settings.LOCAL_SCORER_ENABLED or not expected_text:
+                return None
+            if similarity_score < self.min_similarity or stt_confidence < self.min_confidence:
+                return None
+            if word_scores and len(weak_words) / len(word_scores) > self.max_weak_word_ratio:
+                return None
+
+        issues = self._find_issues(expected_text or user_text, user_text, weak_words)
+
+        if issues:
+            feedback = " ".join(FEEDBACK_TEMPLATES[kind].format(**values) for kind, values in issues)
+        elif not expected_text:
+            feedback = f"'{user_text}'(으)로 인식되었습니다. 자세한 피드백은 잠시 후 다시 받아보세요."
+        else:
+            feedback = "정확하게 발음했습니다! 기대 문장과 일치합니다."
+
+        suggestions = []
+        for kind, _ in issues:
+            if SUGGESTIONS[kind] not in suggestions:
+                suggestions.append(SUGGESTIONS[kind])
+        if not suggestions:
+            suggestions.append("같은 표현을 실제 대화 속도로 말해보세요")
+
+        if word_scores:
+            naturalness = sum(w["confidence"] for w in word_scores) / len(word_scores)
+        else:
+            naturalness = stt_confidence * 100
+
+        return {
+            "accuracy_score": round(similarity_score),
+            "pronunciation_feedback": feedback,
+            "grammar_feedback": "",
+            "naturalness_score": round(naturalness),
+            "suggestions": suggestions,
+            "correct_version": expected_text or user_text,
+            "source": "degraded" if force else "local",
+        }
+
+    def _find_issues(
+        self,
+        expected_text: str,
+        user_text: str,
+        weak_words: List[Dict[str, Any]],
+    ) -> List[Tuple[str, Dict[str, str]]]:
+        """Collect the most relevant (pattern, template values) pairs"""
+        issues = []
+        for op in align_clusters(segment_clusters(expected_text), segment_clusters(user_text)):
+            if op["op"] == SUBSTITUTE:
+                kind = classify_substitution(op["expected"], op["actual"])
+            elif op["op"] in (DELETE, INSERT):
+                kind = op["op"]
+            else:
+                continue
+            issues.append((kind, {"expected": op["expected"], "actual": op["actual"]}))
+
+        for word in weak_words:
+            issues.append(("weak_word", {"word": word["word"]}))
+
+        return issues[:MAX_FEEDBACK_ITEMS]
+
+
+# Global scorer instance
+local_scorer = LocalPronunciationScorer()
@@ -0,0 +1,199 @@
+"""
+Phrase Index
+알려진 크메르어 표현의 번역/로마자 표기 조회 (트라이 최장 일치)
+
+Generated replies keep reusing the same phrases, so translations and
+romanizations of known phrases are looked up locally instead of being
+generated again. The index is built from the scenario content (key
+phrases and vocabulary) and grows with replies Gemini has already
+translated. Matching walks a trie of grapheme clusters, so a match never
+ends inside a consonant cluster, and takes the longest known phrase at
+each position.
+"""
+from app.core.config import settings
+from app.services.scenario_catalog import ScenarioCatalog, scenario_catalog
+from app.services.text_alignment import segment_clusters
+from collections import OrderedDict
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TERMINAL = ""  # trie key holding the entry of a complete phrase (clusters are never empty)
+
+# Longer replies are rarely repeated verbatim; not worth remembering
+MAX_LEARNED_CLUSTERS = 40
+
+# "ផ្សារ (phsar) - 시장" / "ផ្សារ - 시장" style key phrases returned by the LLM
+KEY_PHRASE_PATTERN = re.compile(r"^\s*(?P<phrase>[^()\-–:]+?)\s*(?:\((?P<romanization>[^)]*)\))?\s*[-–:]\s*(?P<korean>.+?)\s*$")
+
+
+class PhraseEntry:
+    __slots__ = ("phrase", "korean", "romanization", "source")
+
+    def __init__(self, phrase: str, korean: str, romanization: str = "", source: str = "content"):
+        self.phrase = phrase
+        self.korean = korean
+        self.romanization = romanization
+        self.source = source
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"phrase": self.phrase, "korean": self.korean, "romanization": self.romanization}
+
+
+class PhraseIndex:
+    """Cluster trie with longest-match lookup"""
+
+    def __init__(self, max_learned: int):
+        self.max_learned = max_learned
+        self._root: Dict[str, Any] = {}
+        self._content: Dict[Tuple[str, ...], PhraseEntry] = {}
+        self._learned: "OrderedDict[Tuple[str, ...], PhraseEntry]" = OrderedDict()
+        self._glossaries: Dict[Tuple[str, str], str] = {}
+
+    def __len__(self) -> int:
+        return len(self._content) + len(self._learned)
+
+    def _insert(self, key: Tuple[str, ...], entry: PhraseEntry) -> None:
+        node = self._root
+        for cluster in key:
+            node = node.setdefault(cluster, {})
+        node[_TERMINAL] = entry
+
+    def _remove(self, key: Tuple[str, ...]) -> None:
+        node = self._root
+        for cluster in key:
+            node = node.get(cluster)
+            if node is None:
+                return
+        node.pop(_TERMINAL, None)
+
+    def load_catalog(self, catalog: ScenarioCatalog) -> None:
+        """Rebuild the content part of the index from a scenario catalog"""
+        self._root = {}
+        self._content = {}
+        for scenario in catalog.scenarios.values():
+            items = [(p["khmer"], p["korean"], p["romanization"]) for p in scenario["key_phrases"]]
+            items += [(v["khmer"], v["meaning"], v["romanization"]) for v in scenario["vocabulary"]]
+            for phrase, korean, romanization in items:
+                if "..." in phrase:
+                    continue  # templates with a blank to fill in
+                for variant in phrase.split("/"):
+                    key = tuple(segment_clusters(variant))
+                    if key:
+                        self._content[key] = PhraseEntry(variant.strip(), korean, romanization)
+
+        for key, entry in self._content.items():
+            self._insert(key, entry)
+        for key, entry in self._learned.items():
+            if key not in self._content:
+                self._insert(key, entry)
+        logger.info(f"Phrase index: {len(self._content)} content phrases, {len(self._learned)} learned")
+
+    def learn(self, phrase: str, korean: str, romanization: str = "") -> None:
+        """Remember a translation produced by the LLM (oldest learned phrases are evicted)"""
+        key = tuple(segment_clusters(phrase))
+        if not key or len(key) > MAX_LEARNED_CLUSTERS or not korean or key in self._content:
+            return
+        self._learned[key] = PhraseEntry(phrase.strip(), korean.strip(), romanization.strip(), source="learned")
+        self._learned.move_to_end(key)
+        self._insert(key, self._learned[key])
+        while len(self._learned) > self.max_learned:
+            old_key, _ = self._learned.popitem(last=False)
+            self._remove(old_key)
+
+    def lookup(self, text: str) -> Tuple[List[PhraseEntry], float, Optional[PhraseEntry]]:
+        """
+        Longest-match scan over `text`
+
+        Returns:
+            (matched entries in order, share of clusters covered 0-1,
+            entry for the whole text if it is a known phrase)
+        """
+        clusters = segment_clusters(text)
+        matches: List[PhraseEntry] = []
+        covered = 0
+        i = 0
+        while i < len(clusters):
+            node, best, best_end = self._root, None, i
+            for j in range(i, len(clusters)):
+                node = node.get(clusters[j])
+                if node is None:
+                    break
+                if _TERMINAL in node:
+                    best, best_end = node[_TERMINAL], j + 1
+            if best is None:
+                i += 1
+                continue
+            matches.append(best)
+            covered += best_end - i
+            i = best_end
+
+        whole = matches[0] if len(matches) == 1 and covered == len(clusters) else None
+        return matches, (covered / len(clusters) if clusters else 0.0), whole
+
+    def glossary(self, catalog: ScenarioCatalog, scenario: str) -> str:
+        """Known phrases of a scenario as prompt lines (all scenarios for general)"""
+        cache_key = (catalog.version, scenario)
+        cached = self._glossaries.get(cache_key)
+        if cached is not None:
+            return cached
+
+        scenarios = [catalog.get(scenario)] if catalog.get(scenario) else list(catalog.scenarios.values())
+        lines = []
+        for item in scenarios:
+            lines += [f"- {p['khmer']} = {p['korean']}" for p in item["key_phrases"]]
+            lines += [f"- {v['khmer']} = {v['meaning']}" for v in item["vocabulary"]]
+        glossary = "\n".join(dict.fromkeys(lines))
+
+        if len(self._glossaries) > 64:
+            self._glossaries.clear()  # only old catalog versions accumulate here
+        self._glossaries[cache_key] = glossary
+        return glossary
+
+    def enrich_reply(self, reply: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Complete a generated reply from the index
+
+        Fills response_translation_kr when the model left it out and the
+        reply is exactly one known phrase, adds key phrases for known
+        phrases it did not list, attaches romanizations
+        ("phrase_annotations"), and learns what the model translated.
+        """
+        text = reply.get("response_text", "")
+        matches, coverage, whole = self.lookup(text)
+
+        translation = reply.get("response_translation_kr") or ""
+        if translation:
+            self.learn(text, translation)
+        elif whole is not None:
+            # Only a reply that is exactly one known phrase has a known translation;
+            # partial matches stay in key_phrases/phrase_annotations
+            translation = whole.korean
+
+        key_phrases = list(reply.get("key_phrases") or [])
+        listed = set()
+        for item in key_phrases:
+            parsed = KEY_PHRASE_PATTERN.match(item)
+            if parsed:
+                self.learn(parsed["phrase"], parsed["korean"], parsed["romanization"] or "")
+                listed.add(tuple(segment_clusters(parsed["phrase"])))
+        for entry in matches:
+            key = tuple(segment_clusters(entry.phrase))
+            if key not in listed:
+                key_phrases.append(f"{entry.phrase} - {entry.korean}")
+                listed.add(key)
+
+        return {
+            **reply,
+            "response_translation_kr": translation,
+            "key_phrases": key_phrases,
+            "phrase_annotations": [entry.as_dict() for entry in matches],
+            "phrase_coverage": round(coverage, 2),
+        }
+
+
+# Global index instance
+phrase_index = PhraseIndex(settings.PHRASE_INDEX_MAX_LEARNED)
+phrase_index.load_catalog(scenario_catalog.current)
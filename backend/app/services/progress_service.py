@@ -0,0 +1,439 @@
+"""
+Learning Progress Service
+사용자별 학습 통계 집계 (대시보드용)
+
+Evaluations and session scores are written together with per-user,
+per-scenario rollup rows (count, score sum, best, streak, weak words) in
+the same transaction, so the dashboard reads a handful of primary-key rows
+instead of scanning pronunciation_evaluations and conversation_sessions.
+A scenario of "all" holds the user's overall totals. rebuild() recomputes
+the rollups from the raw rows, one user per transaction with that user's
+rollup rows locked (see jobs/backfill_progress.py).
+"""
+from sqlalchemy import bindparam, text
+from app.core.config import settings
+from app.core.database import engine, run_db
+from app.core.metrics import metrics
+import json
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ALL_SCENARIOS = "all"
+
+# A word counts as weak when it was not pronounced correctly
+WEAK_WORD_STATUSES = ("partial", "missed")
+
+ROLLUP_COLUMNS = (
+    "attempt_count", "score_sum", "best_score", "last_score",
+    "session_count", "session_score_sum",
+    "current_streak", "longest_streak", "last_practice_date", "weak_words",
+)
+
+
+def empty_rollup() -> Dict[str, Any]:
+    return {
+        "attempt_count": 0,
+        "score_sum": 0.0,
+        "best_score": None,
+        "last_score": None,
+        "session_count": 0,
+        "session_score_sum": 0.0,
+        "current_streak": 0,
+        "longest_streak": 0,
+        "last_practice_date": None,
+        "weak_words": {},
+    }
+
+
+def _to_date(value: Any) -> Optional[date]:
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (str, bytes)):
+        return json.loads(value)
+    return value
+
+
+def _practice_day(rollup: Dict[str, Any], day: date) -> None:
+    """Advance the daily practice streak"""
+    last = rollup["last_practice_date"]
+    if last == day:
+        return
+    if last is not None and day < last:
+        return  # late-arriving row for a day already counted
+    if last == day - timedelta(days=1):
+        rollup["current_streak"] += 1
+    else:
+        rollup["current_streak"] = 1
+    rollup["longest_streak"] = max(rollup["longest_streak"], rollup["current_streak"])
+    rollup["last_practice_date"] = day
+
+
+def apply_attempt(rollup: Dict[str, Any], score: float, day: date, words: Iterable[Dict[str, Any]]) -> None:
+    """
+    Fold one pronunciation attempt into a rollup
+
+    Each word the learner got wrong adds a miss; a correct attempt at a
+    weak word takes one back. Only the most-missed words are kept.
+    """
+    rollup["attempt_count"] += 1
+    rollup["score_sum"] += score
+    rollup["best_score"] = score if rollup["best_score"] is None else max(rollup["best_score"], score)
+    rollup["last_score"] = score
+    _practice_day(rollup, day)
+
+    weak = rollup["weak_words"]
+    for word in words:
+        if word.get("status") in WEAK_WORD_STATUSES:
+            weak[word["word"]] = weak.get(word["word"], 0) + 1
+        elif word["word"] in weak:
+            weak[word["word"]] -= 1
+            if weak[word["word"]] <= 0:
+                del weak[word["word"]]
+
+    if len(weak) > settings.PROGRESS_WEAK_WORDS_LIMIT:
+        kept = sorted(weak.items(), key=lambda item: -item[1])[: settings.PROGRESS_WEAK_WORDS_LIMIT]
+        rollup["weak_words"] = dict(kept)
+
+
+def apply_session(rollup: Dict[str, Any], score: float, day: date) -> None:
+    """Fold one evaluated conversation session into a rollup"""
+    rollup["session_count"] += 1
+    rollup["session_score_sum"] += score
+    _practice_day(rollup, day)
+
+
+def _alignment_of(word_analysis: Any) -> List[Dict[str, Any]]:
+    """Per-word alignment stored in pronunciation_evaluations.word_analysis"""
+    word_analysis = _to_json(word_analysis) or {}
+    if isinstance(word_analysis, dict):
+        return word_analysis.get("alignment", [])
+    return []
+
+
+class ProgressService:
+    """Writes evaluations with incremental rollups and serves dashboard summaries"""
+
+    _select_rollups_sql = (
+        "SELECT scenario, " + ", ".join(ROLLUP_COLUMNS) + " "
+        "FROM user_progress_rollups "
+        "WHERE user_id = :user_id AND scenario IN :scenarios "
+    )
+    # Row lock order shared by writers and rebuild (overall row first)
+    _lock_order_sql = f"ORDER BY CASE WHEN scenario = '{ALL_SCENARIOS}' THEN 0 ELSE 1 END, scenario"
+
+    _upsert_rollup = text(
+        "INSERT INTO user_progress_rollups (user_id, scenario, " + ", ".join(ROLLUP_COLUMNS) + ", updated_at) "
+        "VALUES (:user_id, :scenario, " + ", ".join(f":{c}" for c in ROLLUP_COLUMNS) + ", :updated_at) "
+        "ON CONFLICT (user_id, scenario) DO UPDATE SET "
+        + ", ".join(f"{c} = excluded.{c}" for c in ROLLUP_COLUMNS)
+        + ", updated_at = excluded.updated_at"
+    )
+
+    async def record_evaluation(
+        self,
+        user_id: int,
+        scenario: str,
+        evaluation: Dict[str, Any],
+        session_id: Optional[int] = None,
+    ) -> bool:
+        """Store a pronunciation evaluation and update the user's rollups"""
+        return await self.record_evaluations(user_id, scenario, [evaluation], session_id)
+
+    async def record_evaluations(
+        self,
+        user_id: int,
+        scenario: str,
+        evaluations: List[Dict[str, Any]],
+        session_id: Optional[int] = None,
+    ) -> bool:
+        """
+        Store several evaluations (a drill) and update the rollups in one transaction
+
+        The evaluations are already computed (and paid for) when this runs,
+        so a failed write (database down, unknown user) is logged and
+        reported as False instead of failing the request.
+        """
+        evaluations = [e for e in evaluations if "error" not in e]
+        if not evaluations:
+            return True
+        try:
+            await run_db(self._write_evaluations, user_id, scenario, evaluations, session_id)
+        except Exception as e:
+            metrics.incr("progress_write_failures_total", len(evaluations))
+            logger.error(f"Failed to record {len(evaluations)} evaluations for user {user_id}: {e}")
+            return False
+        return True
+
+    async def record_session(
+        self,
+        user_id: int,
+        scenario: str,
+        language_code: str,
+        overall_score: float,
+        message_count: int,
+        session_id: Optional[int] = None,
+    ) -> None:
+        """Store a conversation session score and update the user's rollups"""
+        await run_db(self._write_session, user_id, scenario, language_code, overall_score, message_count, session_id)
+
+    async def get_summary(self, user_id: int) -> Dict[str, Any]:
+        """Dashboard summary from the rollup rows (no raw-table scans)"""
+        return await run_db(self._read_summary, user_id)
+
+    def _write_evaluations(
+        self,
+        user_id: int,
+        scenario: str,
+        evaluations: List[Dict[str, Any]],
+        session_id: Optional[int],
+    ) -> None:
+        now = datetime.utcnow()
+
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO pronunciation_evaluations (user_id, session_id, scenario, transcript, "
+                    "expected_text, overall_score, stt_confidence, similarity_score, pronunciation_grade, "
+                    "feedback, word_analysis, created_at) "
+                    "VALUES (:user_id, :session_id, :scenario, :transcript, :expected_text, :overall_score, "
+                    ":stt_confidence, :similarity_score, :grade, :feedback, :word_analysis, :created_at)"
+                ),
+                [
+                    {
+                        "user_id": user_id,
+                        "session_id": session_id,
+                        "scenario": scenario,
+                        "transcript": evaluation.get("transcription", ""),
+                        "expected_text": evaluation.get("expected_text") or None,
+                        "overall_score": float(evaluation["overall_score"]),
+                        "stt_confidence": evaluation.get("stt_confidence"),
+                        "similarity_score": evaluation.get("similarity_score"),
+                        "grade": evaluation.get("grade", "")[:1],
+                        "feedback": json.dumps(evaluation.get("llm_feedback", {}), ensure_ascii=False),
+                        "word_analysis": json.dumps(
+                            {
+                                "confidence": evaluation.get("word_analysis", []),
+                                "alignment": evaluation.get("alignment", []),
+                            },
+                            ensure_ascii=False,
+                        ),
+                        "created_at": now,
+                    }
+                    for evaluation in evaluations
+                ],
+            )
+            rollups = self._lock_rollups(conn, user_id, scenario)
+            for evaluation in evaluations:
+                for rollup in rollups.values():
+                    apply_attempt(rollup, float(evaluation["overall_score"]), now.date(), evaluation.get("alignment", []))
+            self._store_rollups(conn, user_id, rollups, now)
+
+    def _write_session(
+        self,
+        user_id: int,
+        scenario: str,
+        language_code: str,
+        overall_score: float,
+        message_count: int,
+        session_id: Optional[int],
+    ) -> None:
+        now = datetime.utcnow()
+        with engine.begin() as conn:
+            if session_id is not None:
+                conn.execute(
+                    text(
+                        "UPDATE conversation_sessions SET overall_score = :score, ended_at = :now, "
+                        "message_count = :message_count WHERE id = :session_id AND user_id = :user_id"
+                    ),
+                    {"score": overall_score, "now": now, "message_count": message_count,
+                     "session_id": session_id, "user_id": user_id},
+                )
+            else:
+                conn.execute(
+                    text(
+                        "INSERT INTO conversation_sessions (user_id, scenario, language_code, started_at, "
+                        "ended_at, message_count, overall_score) "
+                        "VALUES (:user_id, :scenario, :language_code, :now, :now, :message_count, :score)"
+                    ),
+                    {"user_id": user_id, "scenario": scenario, "language_code": language_code,
+                     "now": now, "message_count": message_count, "score": overall_score},
+                )
+            rollups = self._lock_rollups(conn, user_id, scenario)
+            for rollup in rollups.values():
+                apply_session(rollup, overall_score, now.date())
+            self._store_rollups(conn, user_id, rollups, now)
+
+    def _lock_rollups(self, conn, user_id: int, scenario: str) -> Dict[str, Dict[str, Any]]:
+        """Load (and on PostgreSQL lock) the scenario and overall rollups of a user"""
+        sql = self._select_rollups_sql + self._lock_order_sql
+        if conn.dialect.name == "postgresql":
+            sql += " FOR UPDATE"
+        query = text(sql).bindparams(bindparam("scenarios", expanding=True))
+
+        rollups = {name: empty_rollup() for name in (scenario, ALL_SCENARIOS)}
+        for row in conn.execute(query, {"user_id": user_id, "scenarios": list(rollups)}).mappings():
+            rollups[row["scenario"]] = self._from_row(row)
+        return rollups
+
+    def _store_rollups(self, conn, user_id: int, rollups: Dict[str, Dict[str, Any]], now: datetime) -> None:
+        conn.execute(
+            self._upsert_rollup,
+            [
+                {
+                    "user_id": user_id,
+                    "scenario": scenario,
+                    **rollup,
+                    "weak_words": json.dumps(rollup["weak_words"], ensure_ascii=False),
+                    "updated_at": now,
+                }
+                for scenario, rollup in rollups.items()
+            ],
+        )
+
+    def _from_row(self, row) -> Dict[str, Any]:
+        rollup = {column: row[column] for column in ROLLUP_COLUMNS}
+        rollup["last_practice_date"] = _to_date(rollup["last_practice_date"])
+        rollup["weak_words"] = _to_json(rollup["weak_words"]) or {}
+        return rollup
+
+    def _read_summary(self, user_id: int) -> Dict[str, Any]:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT scenario, " + ", ".join(ROLLUP_COLUMNS) + " "
+                    "FROM user_progress_rollups WHERE user_id = :user_id"
+                ),
+                {"user_id": user_id},
+            ).mappings().all()
+
+        rollups = {row["scenario"]: self._from_row(row) for row in rows}
+        overall = rollups.pop(ALL_SCENARIOS, empty_rollup())
+        return {
+            "user_id": user_id,
+            "overall": self._format(overall),
+            "scenarios": {scenario: self._format(rollup) for scenario, rollup in sorted(rollups.items())},
+        }
+
+    def _format(self, rollup: Dict[str, Any]) -> Dict[str, Any]:
+        attempts, sessions = rollup["attempt_count"], rollup["session_count"]
+        last = rollup["last_practice_date"]
+        # A streak is only current if the learner practiced today or yesterday
+        active = last is not None and last >= datetime.utcnow().date() - timedelta(days=1)
+        weak = sorted(rollup["weak_words"].items(), key=lambda item: -item[1])
+
+        return {
+            "attempt_count": attempts,
+            "average_score": round(rollup["score_sum"] / attempts, 1) if attempts else None,
+            "best_score": rollup["best_score"],
+            "last_score": rollup["last_score"],
+            "session_count": sessions,
+            "average_session_score": round(rollup["session_score_sum"] / sessions, 1) if sessions else None,
+            "current_streak_days": rollup["current_streak"] if active else 0,
+            "longest_streak_days": rollup["longest_streak"],
+            "last_practice_date": last.isoformat() if last else None,
+            "weak_words": [{"word": word, "misses": misses} for word, misses in weak],
+        }
+
+    def rebuild(self, user_id: Optional[int] = None) -> int:
+        """
+        Recompute rollups from pronunciation_evaluations and conversation_sessions
+
+        Users are rebuilt one at a time, each in its own transaction that
+        first locks the user's rollup rows (overall row first, the order the
+        incremental writers use). An evaluation written during the rebuild
+        either committed before the lock, and is read from the raw rows, or
+        waits for the rebuild and is then applied on top of it. Only one
+        user's rows are held in memory at a time. Returns the number of
+        users rebuilt.
+        """
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            with engine.connect() as conn:
+                user_ids = sorted(
+                    row[0] for row in conn.execute(text(
+                        "SELECT user_id FROM pronunciation_evaluations WHERE user_id IS NOT NULL "
+                        "UNION SELECT user_id FROM conversation_sessions WHERE user_id IS NOT NULL "
+                        "UNION SELECT user_id FROM user_progress_rollups"
+                    ))
+                )
+
+        for uid in user_ids:
+            self._rebuild_user(uid)
+        logger.info(f"Rebuilt progress rollups for {len(user_ids)} users")
+        return len(user_ids)
+
+    def _rebuild_user(self, user_id: int) -> None:
+        """Fold one user's raw rows in time order (so streaks come out the same)"""
+        params = {"user_id": user_id}
+        now = datetime.utcnow()
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # The overall row exists once locked, so writers of a new user wait too
+                conn.execute(
+                    text(
+                        "INSERT INTO user_progress_rollups (user_id, scenario) VALUES (:user_id, :scenario) "
+                        "ON CONFLICT (user_id, scenario) DO NOTHING"
+                    ),
+                    {**params, "scenario": ALL_SCENARIOS},
+                )
+                conn.execute(
+                    text(
+                        "SELECT scenario FROM user_progress_rollups WHERE user_id = :user_id "
+                        + self._lock_order_sql + " FOR UPDATE"
+                    ),
+                    params,
+                )
+
+            events: List[Tuple[datetime, str, str, float, Any]] = []
+            evaluations = conn.execute(
+                text(
+                    "SELECT COALESCE(pe.scenario, cs.scenario, 'general') AS scenario, "
+                    "pe.overall_score, pe.word_analysis, pe.created_at "
+                    "FROM pronunciation_evaluations pe "
+                    "LEFT JOIN conversation_sessions cs ON cs.id = pe.session_id "
+                    "WHERE pe.user_id = :user_id"
+                ),
+                params,
+            ).mappings()
+            for row in evaluations:
+                events.append((row["created_at"], row["scenario"], "attempt", row["overall_score"], row["word_analysis"]))
+
+            sessions = conn.execute(
+                text(
+                    "SELECT scenario, overall_score, COALESCE(ended_at, started_at) AS finished_at "
+                    "FROM conversation_sessions "
+                    "WHERE user_id = :user_id AND overall_score IS NOT NULL"
+                ),
+                params,
+            ).mappings()
+            for row in sessions:
+                events.append((row["finished_at"], row["scenario"], "session", row["overall_score"], None))
+
+            rollups: Dict[str, Dict[str, Any]] = {}
+            events.sort(key=lambda event: str(event[0]))
+            for when, scenario, kind, score, word_analysis in events:
+                day = _to_date(when)
+                for name in (scenario, ALL_SCENARIOS):
+                    rollup = rollups.setdefault(name, empty_rollup())
+                    if kind == "attempt":
+                        apply_attempt(rollup, float(score), day, _alignment_of(word_analysis))
+                    else:
+                        apply_session(rollup, float(score), day)
+
+            conn.execute(text("DELETE FROM user_progress_rollups WHERE user_id = :user_id"), params)
+            if rollups:
+                self._store_rollups(conn, user_id, rollups, now)
+
+
+# Global service instance
+progress_service = ProgressService()
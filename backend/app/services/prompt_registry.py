@@ -0,0 +1,286 @@
+"""
+Prompt Template Registry
+프롬프트 템플릿 사전 컴파일 및 버전 관리
+
+Each template is split into a system instruction that depends only on
+(method, scenario, language, version) and a short per-call user part.
+The system instruction is compiled once and reused verbatim, so Gemini's
+context/prefix caching sees an identical prefix on every call.
+"""
+from app.core.config import settings
+from app.services.phrase_index import phrase_index
+from app.services.scenario_catalog import scenario_catalog
+import hashlib
+import logging
+import random
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Persona for the "general" scenario and for unknown scenarios; the other
+# scenarios take theirs from llm_instruction in the scenario content files.
+SCENARIO_INSTRUCTIONS = {
+    "general": "You are a friendly Cambodian local helping a Korean volunteer practice Khmer.",
+}
+
+
+# Template sources: method -> version -> {"system", "user"}
+# `system` may use {scenario_instruction} and {language}; `user` takes per-call values.
+# v2 drops the JSON example because structured output already enforces the schema.
+PROMPT_TEMPLATES: Dict[str, Dict[str, Dict[str, str]]] = {
+    "analyze_pronunciation": {
+        "v1": {
+            "system": """
+You are a {language} language teacher helping Korean volunteers learn practical conversation skills.
+
+Provide a detailed analysis in JSON format:
+{{
+    "accuracy_score": 0-100,
+    "pronunciation_feedback": "Clear, specific feedback in Korean",
+    "grammar_feedback": "Grammar notes in Korean",
+    "naturalness_score": 0-100,
+    "suggestions": ["Practical improvement tips in Korean"],
+    "correct_version": "Corrected {language} text if needed"
+}}
+
+Focus on practical communication, not academic perfection. Be encouraging but honest.
+""",
+            "user": """
+Analyze this {language} speech:
+User said: "{user_text}"
+{expected_line}
+""",
+        },
+        "v2": {
+            "system": """
+You are a {language} teacher for Korean volunteers. Analyze the learner's {language} speech.
+Scores are 0-100. Write feedback and suggestions in Korean; correct_version in {language}.
+Be practical, encouraging and honest.
+""",
+            "user": """
+User said: "{user_text}"
+{expected_line}
+""",
+        },
+    },
+    "analyze_pronunciation_batch": {
+        "v1": {
+            "system": """
+You are a {language} language teacher helping Korean volunteers learn practical conversation skills.
+The learner recorded several drill phrases in a row. Analyze every attempt separately.
+
+Return JSON with one entry per attempt, in order, each carrying its attempt index:
+{{
+    "results": [
+        {{
+            "index": 0,
+            "accuracy_score": 0-100,
+            "pronunciation_feedback": "Clear, specific feedback in Korean",
+            "grammar_feedback": "Grammar notes in Korean",
+            "naturalness_score": 0-100,
+            "suggestions": ["Practical improvement tips in Korean"],
+            "correct_version": "Corrected {language} text if needed"
+        }}
+    ]
+}}
+
+Focus on practical communication, not academic perfection. Be encouraging but honest.
+""",
+            "user": """
+Attempts:
+{attempts_text}
+""",
+        },
+    },
+    "generate_response": {
+        "v1": {
+            "system": """
+{scenario_instruction}
+
+Generate a natural response in {language} that:
+1. Continues the conversation naturally
+2. Uses vocabulary appropriate for the scenario
+3. Keeps responses short and conversational (1-2 sentences)
+4. Helps the learner practice practical phrases
+
+Respond in JSON format:
+{{
+    "response_text": "Your {language} response",
+    "response_translation_kr": "한국어 번역",
+    "key_phrases": ["Important phrases from your response with Korean translation"],
+    "cultural_note": "Optional cultural tip in Korean"
+}}
+""",
+            "user": """
+Previous conversation:
+{context_text}
+
+User just said: "{user_input}"
+""",
+        },
+        "v2": {
+            "system": """
+{scenario_instruction}
+
+Reply in {language}, 1-2 short conversational sentences that fit the scenario and help the learner practice.
+Give a Korean translation, key phrases with Korean meaning, and an optional Korean cultural note.
+""",
+            "user": """
+Previous conversation:
+{context_text}
+
+User just said: "{user_input}"
+""",
+        },
+    },
+    "evaluate_conversation": {
+        "v1": {
+            "system": """
+You are evaluating a Korean volunteer's {language} language practice session.
+
+Provide a comprehensive evaluation in JSON format:
+{{
+    "overall_score": 0-100,
+    "fluency_score": 0-100,
+    "vocabulary_score": 0-100,
+    "grammar_score": 0-100,
+    "strengths": ["List strengths in Korean"],
+    "areas_for_improvement": ["List areas to work on in Korean"],
+    "recommended_next_steps": ["Specific practice recommendations in Korean"],
+    "encouraging_message": "Motivational message in Korean"
+}}
+
+Be constructive and encouraging. Focus on practical progress.
+""",
+            "user": """
+Conversation:
+{conversation_text}
+{goals_text}
+""",
+        },
+        "v2": {
+            "system": """
+You evaluate a Korean volunteer's {language} practice session.
+Scores are 0-100. Write strengths, improvements, next steps and an encouraging message in Korean.
+Be constructive and focus on practical progress.
+""",
+            "user": """
+Conversation:
+{conversation_text}
+{goals_text}
+""",
+        },
+    },
+}
+
+
+# Methods whose replies are completed from the phrase index; their system
+# instruction lists the known phrases so the model does not repeat them.
+GLOSSARY_METHODS = ("generate_response",)
+
+GLOSSARY_INSTRUCTION = """
+
+Known phrases (the app already has their Korean meaning and romanization):
+{glossary}
+
+List in key_phrases only phrases that are NOT known phrases; known ones are added automatically.
+If your whole reply is exactly one known phrase, leave response_translation_kr empty.
+"""
+
+
+class CompiledPrompt:
+    """A template resolved for one (method, scenario, language, version)"""
+
+    def __init__(self, method: str, version: str, scenario: str, language: str, system_instruction: str, user_template: str):
+        self.method = method
+        self.version = version
+        self.scenario = scenario
+        self.language = language
+        self.system_instruction = system_instruction
+        self.user_template = user_template
+        # Stable identifier of the system prefix (used for model reuse and cache keys)
+        self.prefix_id = hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()[:16]
+
+    def render(self, **values: Any) -> str:
+        """Render the per-call user part"""
+        return self.user_template.format(**values)
+
+
+class PromptRegistry:
+    """Compiles prompt templates once and selects versions for A/B comparison"""
+
+    def __init__(self, templates: Dict[str, Dict[str, Dict[str, str]]], weights: Dict[str, int]):
+        self.templates = templates
+        self.weights = weights
+        self._compiled: Dict[Tuple[str, ...], CompiledPrompt] = {}
+        self._lock = threading.Lock()
+
+    def choose_version(self, method: str) -> str:
+        """Pick a template version by the configured A/B weights"""
+        versions = [v for v in self.templates[method] if self.weights.get(v, 0) > 0]
+        if not versions:
+            return next(iter(self.templates[method]))
+        return random.choices(versions, weights=[self.weights[v] for v in versions])[0]
+
+    def get(
+        self,
+        method: str,
+        scenario: str = "general",
+        language: str = "Khmer",
+        version: Optional[str] = None,
+    ) -> CompiledPrompt:
+        """Return the compiled template, compiling it on first use"""
+        catalog = scenario_catalog.current
+        instruction = catalog.instructions.get(scenario) or SCENARIO_INSTRUCTIONS.get(scenario)
+        if instruction is None:
+            scenario, instruction = "general", SCENARIO_INSTRUCTIONS["general"]
+        version = version or self.choose_version(method)
+
+        glossary = ""
+        if settings.PHRASE_INDEX_ENABLED and method in GLOSSARY_METHODS and language == "Khmer":
+            glossary = phrase_index.glossary(catalog, scenario)
+
+        # Content-derived parts are in the key so a content reload never serves a stale prefix
+        key = (method, scenario, language, version, instruction, glossary)
+
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            return compiled
+
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is None:
+                source = self.templates[method][version]
+                system_instruction = source["system"].format(
+                    scenario_instruction=instruction,
+                    language=language,
+                ).strip()
+                if glossary:
+                    system_instruction += GLOSSARY_INSTRUCTION.format(glossary=glossary).rstrip()
+                # Language is fixed per compiled template; leave other fields for render()
+                user_template = source["user"].replace("{language}", language)
+                compiled = CompiledPrompt(method, version, scenario, language, system_instruction, user_template)
+                self._compiled[key] = compiled
+                logger.info(f"Compiled prompt template {method}/{version} ({scenario}, {language})")
+
+        return compiled
+
+    def invalidate(self, scenarios: Set[str]) -> Set[str]:
+        """
+        Drop compiled templates of the given scenarios
+
+        Returns the prefix ids that were dropped so dependent caches
+        (per-prefix models) can release them too.
+        """
+        with self._lock:
+            stale = [key for key in self._compiled if key[1] in scenarios]
+            dropped = {self._compiled.pop(key).prefix_id for key in stale}
+        if stale:
+            logger.info(f"Invalidated {len(stale)} compiled prompts for scenarios {sorted(scenarios)}")
+        return dropped
+
+
+# Global registry instance
+prompt_registry = PromptRegistry(PROMPT_TEMPLATES, settings.PROMPT_TEMPLATE_WEIGHTS)
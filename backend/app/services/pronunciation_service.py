@@ -2,11 +2,17 @@
 Pronunciation Evaluation Service
 STT와 LLM을 결합하여 발음 평가
 """
+from app.core.admission import is_degraded
+from app.core.config import settings
 from app.services.stt_service import stt_service
+from app.core.metrics import metrics
 from app.services.llm_service import llm_service
+from app.services.local_scorer import local_scorer
+from app.services.prosody_analyzer import prosody_analyzer
+from app.services.text_alignment import compare_texts
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-import difflib
+from typing import Dict, Any, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +24,8 @@ class PronunciationService:
         """Initialize pronunciation service"""
         self.stt = stt_service
         self.llm = llm_service
+        self.local_scorer = local_scorer
+        self.prosody = prosody_analyzer
         logger.info("Pronunciation Service initialized")
 
     async def evaluate_pronunciation(
@@ -53,59 +61,236 @@ class PronunciationService:
                 }
 
             user_text = transcription["transcript"]
-            stt_confidence = transcription["confidence"]
 
-            # Step 2: Calculate similarity if expected text is provided
-            similarity_score = 100.0
-            if expected_text:
-                similarity_score = self._calculate_text_similarity(user_text, expected_text)
+            # Acoustic prosody (tonal languages) runs alongside the text analysis
+            prosody_task = asyncio.create_task(
+                self._prosody(audio_content, transcription, expected_text, language_code)
+            )
+            try:
+                # Step 2: Score routine attempts locally, escalate the rest to the LLM
+                comparison = self._compare(user_text, expected_text)
+                llm_analysis = self._local_analysis(transcription, expected_text, comparison)
+                if llm_analysis is None:
+                    llm_analysis = await self.llm.analyze_pronunciation(
+                        user_text=user_text,
+                        expected_text=expected_text,
+                        language=self._get_language_name(language_code),
+                    )
+                    metrics.incr("pronunciation_evaluations_total", tier="llm")
+
+                # Step 3: Combine similarity, word confidence, prosody and LLM feedback
+                return self._build_result(transcription, expected_text, comparison, llm_analysis, await prosody_task)
+            finally:
+                await self._discard(prosody_task)
 
-            # Step 3: Analyze word-level pronunciation
-            word_scores = self._analyze_word_confidence(transcription.get("words", []))
+        except Exception as e:
+            logger.error(f"Pronunciation evaluation error: {e}")
+            raise Exception(f"Failed to evaluate pronunciation: {str(e)}")
 
-            # Step 4: Get LLM feedback
-            llm_analysis = await self.llm.analyze_pronunciation(
-                user_text=user_text,
-                expected_text=expected_text,
-                language=self._get_language_name(language_code),
-            )
+    async def evaluate_pronunciation_batch(
+        self,
+        clips: List[Tuple[bytes, Optional[str]]],
+        language_code: str = "km-KH",
+    ) -> List[Dict[str, Any]]:
+        """
+        Evaluate a drill session of several recordings
 
-            # Step 5: Calculate composite scores
-            pronunciation_score = self._calculate_pronunciation_score(
-                stt_confidence=stt_confidence,
-                similarity_score=similarity_score,
-                word_scores=word_scores,
-            )
+        Clips are transcribed concurrently (bounded by
+        PRONUNCIATION_BATCH_STT_CONCURRENCY) and all transcripts are
+        analyzed by the LLM in a single batched prompt.
 
-            return {
-                "overall_score": pronunciation_score,
-                "stt_confidence": round(stt_confidence * 100, 1),
-                "similarity_score": round(similarity_score, 1),
-                "transcription": user_text,
-                "expected_text": expected_text or "",
-                "word_analysis": word_scores,
-                "llm_feedback": llm_analysis,
-                "pronunciation_feedback": llm_analysis.get("pronunciation_feedback", ""),
-                "suggestions": llm_analysis.get("suggestions", []),
-                "grade": self._get_grade(pronunciation_score),
-            }
+        Args:
+            clips: List of (audio_content, expected_text) in recording order
+            language_code: Language code
+
+        Returns:
+            One evaluation per clip, in the same order
+        """
+        try:
+            semaphore = asyncio.Semaphore(settings.PRONUNCIATION_BATCH_STT_CONCURRENCY)
+
+            async def transcribe(audio_content: bytes) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.stt.transcribe_audio(
+                        audio_content=audio_content,
+                        language_code=language_code,
+                        enable_word_time_offsets=True,
+                    )
+
+            transcriptions = await asyncio.gather(*(transcribe(audio) for audio, _ in clips))
+
+            # Prosody of every clip is analyzed in the process pool while the LLM runs
+            prosody_task = asyncio.ensure_future(asyncio.gather(*(
+                self._prosody(audio, transcription, expected_text, language_code)
+                for (audio, expected_text), transcription in zip(clips, transcriptions)
+            )))
+            try:
+                # Clips with speech are scored locally when possible; the rest go to the LLM
+                analysis_by_clip = {}
+                comparisons = {}
+                escalated = []
+                for i, transcription in enumerate(transcriptions):
+                    if not transcription["transcript"]:
+                        continue
+                    comparisons[i] = self._compare(transcription["transcript"], clips[i][1])
+                    local_analysis = self._local_analysis(transcription, clips[i][1], comparisons[i])
+                    if local_analysis is None:
+                        escalated.append(i)
+                    else:
+                        analysis_by_clip[i] = local_analysis
+
+                if escalated:
+                    analyses = await self.llm.analyze_pronunciation_batch(
+                        attempts=[
+                            {"user_text": transcriptions[i]["transcript"], "expected_text": clips[i][1]}
+                            for i in escalated
+                        ],
+                        language=self._get_language_name(language_code),
+                    )
+                    analysis_by_clip.update(zip(escalated, analyses))
+                    metrics.incr("pronunciation_evaluations_total", len(escalated), tier="llm")
+                prosody_by_clip = await prosody_task
+
+                results = []
+                for i, (transcription, (_, expected_text)) in enumerate(zip(transcriptions, clips)):
+                    if i not in analysis_by_clip:
+                        results.append({
+                            "error": "No speech detected",
+                            "overall_score": 0,
+                            "feedback": "음성이 감지되지 않았습니다. 다시 시도해주세요.",
+                            "expected_text": expected_text or "",
+                        })
+                        continue
+                    results.append(self._build_result(
+                        transcription, expected_text, comparisons[i], analysis_by_clip[i], prosody_by_clip[i]
+                    ))
+
+                return results
+            finally:
+                await self._discard(prosody_task)
 
         except Exception as e:
-            logger.error(f"Pronunciation evaluation error: {e}")
-            raise Exception(f"Failed to evaluate pronunciation: {str(e)}")
+            logger.error(f"Batch pronunciation evaluation error: {e}")
+            raise Exception(f"Failed to evaluate pronunciation batch: {str(e)}")
 
-    def _calculate_text_similarity(self, text1: str, text2: str) -> float:
+    def _compare(self, user_text: str, expected_text: Optional[str]) -> Dict[str, Any]:
         """
-        Calculate similarity between two texts using sequence matching
+        Similarity (0-100) and per-word alignment against the expected text
 
-        Returns similarity score 0-100
+        Computed once per attempt and shared by the local scorer and the result.
         """
-        if not text1 or not text2:
-            return 0.0
+        if expected_text and user_text:
+            return compare_texts(expected_text, user_text)
+        if expected_text:
+            return {"similarity": 0.0, "words": []}
+        return {"similarity": 100.0, "words": []}
 
-        # Use SequenceMatcher for similarity
-        similarity = difflib.SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
-        return similarity * 100
+    def _local_analysis(
+        self,
+        transcription: Dict[str, Any],
+        expected_text: Optional[str],
+        comparison: Dict[str, Any],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Try the local scoring tier; None means the attempt needs the LLM
+
+        Under overload (degraded admission) every attempt is scored locally.
+        """
+        degraded = is_degraded()
+        analysis = self.local_scorer.analyze(
+            user_text=transcription["transcript"],
+            expected_text=expected_text,
+            stt_confidence=transcription["confidence"],
+            similarity_score=comparison["similarity"],
+            word_scores=self._analyze_word_confidence(transcription.get("words", [])),
+            force=degraded,
+        )
+        if analysis is not None:
+            metrics.incr("pronunciation_evaluations_total", tier="degraded" if degraded else "local")
+        return analysis
+
+    @staticmethod
+    async def _discard(task: asyncio.Future) -> None:
+        """Cancel prosody work nobody will read (queued pool jobs are dropped too)"""
+        if not task.done():
+            task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def _prosody(
+        self,
+        audio_content: bytes,
+        transcription: Dict[str, Any],
+        expected_text: Optional[str],
+        language_code: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Prosody analysis for tonal languages (skipped without speech or under overload)"""
+        if not transcription["transcript"] or is_degraded():
+            return None
+        return await self.prosody.analyze(
+            audio_content, transcription.get("words", []), language_code, expected_text
+        )
+
+    def _build_result(
+        self,
+        transcription: Dict[str, Any],
+        expected_text: Optional[str],
+        comparison: Dict[str, Any],
+        llm_analysis: Dict[str, Any],
+        prosody: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Combine transcription, similarity, prosody and LLM feedback into an evaluation"""
+        user_text = transcription["transcript"]
+        stt_confidence = transcription["confidence"]
+
+        # Similarity and per-word alignment against the expected text (if provided)
+        similarity_score = comparison["similarity"]
+        alignment = comparison["words"]
+
+        # Word-level pronunciation
+        word_scores = self._analyze_word_confidence(transcription.get("words", []))
+
+        # Composite score
+        pronunciation_score = self._calculate_pronunciation_score(
+            stt_confidence=stt_confidence,
+            similarity_score=similarity_score,
+            word_scores=word_scores,
+        )
+
+        suggestions = list(llm_analysis.get("suggestions", []))
+        if prosody:
+            suggestions.extend(self._prosody_suggestions(prosody))
+
+        return {
+            "overall_score": pronunciation_score,
+            "stt_confidence": round(stt_confidence * 100, 1),
+            "similarity_score": round(similarity_score, 1),
+            "transcription": user_text,
+            "expected_text": expected_text or "",
+            "word_analysis": word_scores,
+            "alignment": alignment,
+            "llm_feedback": llm_analysis,
+            "pronunciation_feedback": llm_analysis.get("pronunciation_feedback", ""),
+            "suggestions": suggestions,
+            "feedback_source": llm_analysis.get("source", "llm"),
+            "prosody": prosody,
+            "grade": self._get_grade(pronunciation_score),
+        }
+
+    def _prosody_suggestions(self, prosody: Dict[str, Any]) -> List[str]:
+        """Korean practice tips for weak prosody scores"""
+        suggestions = []
+        mistoned = [w["word"] for w in prosody["words"] if w.get("tone_match") is False]
+        if mistoned:
+            suggestions.append(f"'{', '.join(mistoned[:3])}'의 성조를 원어민 발음과 비교하며 다시 연습해보세요")
+        weak = [w["word"] for w in prosody["words"] if w["weak"]]
+        if weak:
+            suggestions.append(f"'{', '.join(weak[:3])}' 부분을 더 크고 분명하게 발음해보세요")
+        if prosody["speaking_rate_score"] < 60:
+            if prosody["speaking_rate"] < 2.5:
+                suggestions.append("음절 사이를 너무 끊지 말고 조금 더 자연스러운 속도로 말해보세요")
+            else:
+                suggestions.append("조금 더 천천히, 음절마다 성조를 살려 말해보세요")
+        return suggestions
 
     def _analyze_word_confidence(self, words: list) -> list:
         """
@@ -139,6 +324,8 @@ class PronunciationService:
         - STT confidence: 40%
         - Text similarity: 30%
         - Average word confidence: 30%
+
+        Prosody is reported separately and does not affect this score.
         """
         # STT confidence (0-1) -> 0-100
         stt_score = stt_confidence * 100
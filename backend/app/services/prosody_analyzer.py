@@ -0,0 +1,340 @@
+"""
+Prosody analysis for tonal languages
+베트남어/라오어 성조, 억양, 발화 속도 분석 (로컬 음향 분석)
+
+In Vietnamese and Lao a wrong tone is a different word, yet STT confidence
+and text similarity barely notice it. This stage reads the recording
+itself: a pYIN pitch track, frame energy and energy peaks (syllable
+nuclei) are computed once for the whole clip and sliced per word with the
+time offsets STT already returned, so no further upstream call is made.
+
+There is no reference recording to compare against, so the scores describe
+how tonal the speech is (pitch movement across and within words), how much
+of each word was voiced and whether the speaking rate is natural. For
+Vietnamese the expected tone of every syllable is read from the diacritics
+of the expected text, and each spoken syllable's contour shape is checked
+against it (tone_accuracy_score). Only the shape is checked, not the pitch
+register, so high and low tones of the same shape are not told apart. The
+analysis is CPU-bound and runs in a process pool outside the event loop.
+
+Prosody is reported next to the pronunciation score, not folded into it.
+"""
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.audio_segmenter import decode_pcm16
+from app.services.text_alignment import VIETNAMESE_TONE_MARKS
+import asyncio
+import difflib
+import logging
+import multiprocessing
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import librosa
+except ImportError:  # optional; evaluations are then scored without prosody
+    librosa = None
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_SAMPLE_RATE = 16000
+FRAME_LENGTH = 1024
+HOP_LENGTH = 160  # 10 ms
+PITCH_FMIN = 65.0
+PITCH_FMAX = 400.0
+CONTOUR_POINTS = 5
+
+# A shape change of this many semitones counts as a rising/falling tone
+TONE_SHAPE_SEMITONES = 1.5
+# Pitch movement (semitones) of clearly tonal speech; less scores proportionally
+TONE_VARIETY_TARGET = 4.0
+# Voiced share of a word's duration treated as fully voiced
+VOICING_TARGET = 0.5
+# Natural speaking rate in syllables per second
+RATE_RANGE = (2.5, 6.5)
+# Words this far (dB) below the utterance median energy are flagged as weak
+WEAK_WORD_DB = 10.0
+
+# Vietnamese tone mark -> (tone name, contour shapes accepted for it)
+VIETNAMESE_TONES = {
+    "": ("ngang", ("level",)),
+    "\u0300": ("huyen", ("falling", "level")),  # low, gently falling
+    "\u0301": ("sac", ("rising",)),
+    "\u0303": ("nga", ("rising", "dipping")),  # rising, broken by a glottal stop
+    "\u0309": ("hoi", ("dipping", "falling")),
+    "\u0323": ("nang", ("falling", "level")),  # low, short, glottalized
+}
+
+
+def _tone_shape(contour: np.ndarray) -> str:
+    """Name the shape of a word's pitch contour (semitones)"""
+    start, end = contour[0], contour[-1]
+    if contour[1:-1].min() < min(start, end) - TONE_SHAPE_SEMITONES:
+        return "dipping"
+    if end - start > TONE_SHAPE_SEMITONES:
+        return "rising"
+    if start - end > TONE_SHAPE_SEMITONES:
+        return "falling"
+    return "level"
+
+
+def _rate_score(rate: float) -> float:
+    """100 inside RATE_RANGE, falling linearly to 0 at half/double the range"""
+    low, high = RATE_RANGE
+    if rate < low:
+        return max(0.0, (rate - low / 2) / (low / 2)) * 100
+    if rate > high:
+        return max(0.0, (2 * high - rate) / high) * 100
+    return 100.0
+
+
+def analyze_prosody(
+    audio_content: bytes,
+    words: List[Dict[str, Any]],
+    default_sample_rate: int,
+) -> Optional[Dict[str, Any]]:
+    """
+    Pitch, energy and speaking rate per word of a recording
+
+    Runs in a worker process. Pitch is expressed in semitones relative to
+    the speaker's median pitch, so male and female voices compare alike.
+
+    Args:
+        audio_content: LINEAR16 audio (WAV or raw PCM)
+        words: STT words with start_time/end_time in seconds
+        default_sample_rate: Sample rate for raw PCM
+
+    Returns:
+        Prosody scores and per-word details, or None without timed words
+    """
+    samples, rate = decode_pcm16(audio_content, default_sample_rate)
+    y = samples.astype(np.float32) / 32768.0
+    if rate != ANALYSIS_SAMPLE_RATE:
+        y = librosa.resample(y, orig_sr=rate, target_sr=ANALYSIS_SAMPLE_RATE)
+    if len(y) < FRAME_LENGTH:
+        return None
+
+    f0, voiced, _ = librosa.pyin(
+        y,
+        fmin=PITCH_FMIN,
+        fmax=PITCH_FMAX,
+        sr=ANALYSIS_SAMPLE_RATE,
+        frame_length=FRAME_LENGTH,
+        hop_length=HOP_LENGTH,
+    )
+    energy_db = librosa.amplitude_to_db(
+        librosa.feature.rms(y=y, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH)[0],
+        ref=1.0,
+    )
+    n_frames = min(len(f0), len(energy_db))
+    f0, voiced, energy_db = f0[:n_frames], voiced[:n_frames], energy_db[:n_frames]
+    if not voiced.any():
+        return None
+
+    semitones = np.full(n_frames, np.nan, dtype=np.float32)
+    semitones[voiced] = 12.0 * np.log2(f0[voiced] / np.median(f0[voiced]))
+
+    # Syllable nuclei: voiced energy peaks at least 100 ms apart
+    peaks = librosa.util.peak_pick(
+        np.where(voiced, energy_db, energy_db.min()).astype(np.float32),
+        pre_max=5, post_max=5, pre_avg=10, post_avg=10, delta=1.0, wait=10,
+    )
+
+    timed = [w for w in words if w.get("end_time", 0.0) > w.get("start_time", 0.0)]
+    if not timed:
+        return None
+    frames_per_second = ANALYSIS_SAMPLE_RATE / HOP_LENGTH
+    starts = np.clip((np.array([w["start_time"] for w in timed]) * frames_per_second).astype(int), 0, n_frames - 1)
+    ends = np.clip((np.array([w["end_time"] for w in timed]) * frames_per_second).astype(int), starts + 1, n_frames)
+    syllables = np.searchsorted(peaks, ends) - np.searchsorted(peaks, starts)
+    median_energy = float(np.median(energy_db[voiced]))
+
+    word_details = []
+    word_means = []
+    word_ranges = []
+    voiced_ratios = []
+    for word, start, end, count in zip(timed, starts, ends, syllables):
+        pitch = semitones[start:end]
+        pitch = pitch[~np.isnan(pitch)]
+        voiced_ratio = len(pitch) / (end - start)
+        energy = float(np.mean(energy_db[start:end]))
+        voiced_ratios.append(voiced_ratio)
+
+        detail = {
+            "word": word.get("word", ""),
+            "start_time": word["start_time"],
+            "end_time": word["end_time"],
+            "voiced_ratio": round(voiced_ratio, 2),
+            "energy_db": round(energy, 1),
+            "syllables": int(max(count, 1)),
+            "weak": bool(energy < median_energy - WEAK_WORD_DB),
+            "tone_shape": None,
+            "pitch_contour": [],
+            "pitch_range": None,
+        }
+        if len(pitch) >= CONTOUR_POINTS:
+            # Resample the voiced part of the word to a fixed number of points
+            contour = np.interp(
+                np.linspace(0, len(pitch) - 1, CONTOUR_POINTS),
+                np.arange(len(pitch)),
+                pitch,
+            )
+            pitch_range = float(pitch.max() - pitch.min())
+            word_means.append(float(pitch.mean()))
+            word_ranges.append(pitch_range)
+            detail.update({
+                "tone_shape": _tone_shape(contour),
+                "pitch_contour": [round(float(v), 2) for v in contour],
+                "pitch_range": round(pitch_range, 2),
+            })
+        word_details.append(detail)
+
+    # Tonal speech moves pitch within words and between neighbouring words
+    variety = 0.0
+    if word_ranges:
+        variety = float(np.mean(word_ranges)) + (float(np.std(word_means)) if len(word_means) > 1 else 0.0)
+    tone_variety_score = min(1.0, variety / TONE_VARIETY_TARGET) * 100
+    voicing_score = min(1.0, float(np.mean(voiced_ratios)) / VOICING_TARGET) * 100
+
+    spoken_seconds = float(np.sum(ends - starts)) / frames_per_second
+    speaking_rate = sum(d["syllables"] for d in word_details) / spoken_seconds
+    rate_score = _rate_score(speaking_rate)
+
+    score = tone_variety_score * 0.5 + voicing_score * 0.25 + rate_score * 0.25
+    return {
+        "score": round(score, 1),
+        "tone_variety_score": round(tone_variety_score, 1),
+        "voicing_score": round(voicing_score, 1),
+        "speaking_rate": round(speaking_rate, 2),  # syllables per second
+        "speaking_rate_score": round(rate_score, 1),
+        "pitch_range": round(float(np.nanmax(semitones) - np.nanmin(semitones)), 2),
+        "words": word_details,
+    }
+
+
+def _syllable_key(syllable: str) -> Tuple[str, str]:
+    """(toneless lowercase syllable, tone mark) of a Vietnamese syllable"""
+    decomposed = unicodedata.normalize("NFD", syllable.lower())
+    tone = next((c for c in decomposed if c in VIETNAMESE_TONE_MARKS), "")
+    toneless = "".join(c for c in decomposed if c not in VIETNAMESE_TONE_MARKS and (c.isalnum() or unicodedata.combining(c)))
+    return unicodedata.normalize("NFC", toneless), tone
+
+
+def score_vietnamese_tones(prosody: Dict[str, Any], expected_text: str) -> None:
+    """
+    Check each spoken syllable's tone shape against the expected text
+
+    Spoken words are aligned to the expected syllables without their tone
+    marks, so a syllable said (and transcribed) with the wrong tone still
+    lines up with the syllable it should have been. Sets expected_tone and
+    tone_match on the aligned words and tone_accuracy_score on the result
+    (None when no syllable could be checked).
+    """
+    expected = [_syllable_key(s) for s in expected_text.split()]
+    words = prosody["words"]
+    spoken = [_syllable_key(w["word"]) if len(w["word"].split()) == 1 else ("", "") for w in words]
+
+    checked = matched = 0
+    matcher = difflib.SequenceMatcher(a=[s for s, _ in expected], b=[s for s, _ in spoken], autojunk=False)
+    for block in matcher.get_matching_blocks():
+        for offset in range(block.size):
+            syllable, mark = expected[block.a + offset]
+            word = words[block.b + offset]
+            if not syllable or word["tone_shape"] is None:
+                continue
+            name, shapes = VIETNAMESE_TONES[mark]
+            word["expected_tone"] = name
+            word["tone_match"] = word["tone_shape"] in shapes
+            checked += 1
+            matched += word["tone_match"]
+
+    prosody["tone_accuracy_score"] = round(matched / checked * 100, 1) if checked else None
+    if checked:
+        score = (
+            prosody["tone_accuracy_score"] * 0.5
+            + prosody["voicing_score"] * 0.25
+            + prosody["speaking_rate_score"] * 0.25
+        )
+        prosody["score"] = round(score, 1)
+
+
+def _warm_worker() -> None:
+    """Pay the librosa/numba import and JIT cost once per worker process"""
+    analyze_prosody(np.zeros(ANALYSIS_SAMPLE_RATE // 2, dtype="<i2").tobytes(), [], ANALYSIS_SAMPLE_RATE)
+
+
+class ProsodyAnalyzer:
+    """Runs analyze_prosody in a process pool for the configured languages"""
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        if librosa is None and settings.PROSODY_ENABLED:
+            logger.warning("librosa is not installed; prosody analysis is disabled")
+
+    def supports(self, language_code: str) -> bool:
+        return settings.PROSODY_ENABLED and librosa is not None and language_code in settings.PROSODY_LANGUAGES
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that holds gRPC clients is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.PROSODY_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        return self._pool
+
+    def start(self) -> None:
+        """Spawn and warm the worker processes (call from app startup)"""
+        if any(self.supports(code) for code in settings.PROSODY_LANGUAGES):
+            self._executor().submit(int)
+
+    async def analyze(
+        self,
+        audio_content: bytes,
+        words: List[Dict[str, Any]],
+        language_code: str,
+        expected_text: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Prosody of a recording, or None when unsupported, skipped or failed
+
+        A failure never fails the evaluation; it is reported without prosody.
+        """
+        if not self.supports(language_code) or not words:
+            return None
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(
+                    self._executor(), analyze_prosody, audio_content, words, settings.AUDIO_SAMPLE_RATE
+                ),
+                timeout=settings.PROSODY_TIMEOUT_SECONDS,
+            )
+        except asyncio.TimeoutError:
+            metrics.incr("prosody_analyses_total", outcome="timeout")
+            logger.warning(f"Prosody analysis timed out after {settings.PROSODY_TIMEOUT_SECONDS}s")
+            return None
+        except Exception as e:
+            metrics.incr("prosody_analyses_total", outcome="failed")
+            logger.error(f"Prosody analysis error: {e}")
+            return None
+
+        metrics.incr("prosody_analyses_total", outcome="ok" if result else "empty")
+        if result and expected_text and language_code == "vi-VN":
+            score_vietnamese_tones(result, expected_text)
+        return result
+
+    def stop(self) -> None:
+        """Shut the worker processes down (call from app shutdown)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global analyzer instance
+prosody_analyzer = ProsodyAnalyzer()
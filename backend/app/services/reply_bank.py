@@ -0,0 +1,159 @@
+"""
+Pre-generated scenario reply bank
+LLM 장애/오프라인 시 사용할 시나리오별 사전 생성 응답 (텍스트/번역/음성)
+
+Replies to common learner inputs are generated ahead of time with
+`python -m jobs.build_reply_bank`. They are stored in a local SQLite file
+so a site can review the file and ship it with the deployment. When Gemini
+misses its deadline, fails, or its circuit is open, generate_response
+serves the closest banked reply instead of an error.
+
+Entries are held in memory with an inverted index from grapheme cluster to
+entry. Lookup scores only the entries sharing the most clusters with the
+input (cluster similarity via compare_texts). Audio stays in the file and
+is read on demand.
+"""
+from app.core.config import settings
+from app.services.text_alignment import compare_texts, segment_clusters
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Entries scored with compare_texts per lookup (by shared cluster count)
+MAX_CANDIDATES = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reply_bank (
+    id INTEGER PRIMARY KEY,
+    scenario TEXT NOT NULL,
+    language TEXT NOT NULL,
+    input_text TEXT NOT NULL,
+    reply_json TEXT NOT NULL,
+    audio BLOB,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (scenario, language, input_text)
+);
+CREATE INDEX IF NOT EXISTS idx_reply_bank_scenario ON reply_bank (scenario, language);
+"""
+
+
+class BankedReply:
+    """One pre-generated reply"""
+
+    __slots__ = ("id", "input_text", "reply")
+
+    def __init__(self, entry_id: int, input_text: str, reply: Dict[str, Any]):
+        self.id = entry_id
+        self.input_text = input_text
+        self.reply = reply
+
+
+class ReplyBank:
+    """In-memory index over the reply bank file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[Tuple[str, str], List[BankedReply]] = {}
+        self._index: Dict[Tuple[str, str], Dict[str, List[int]]] = {}
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def load(self) -> int:
+        """(Re)load the bank file; returns the number of entries"""
+        if not os.path.exists(self.path):
+            logger.info(f"No reply bank at {self.path}; degraded replies disabled")
+            return 0
+
+        entries: Dict[Tuple[str, str], List[BankedReply]] = defaultdict(list)
+        index: Dict[Tuple[str, str], Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, scenario, language, input_text, reply_json "
+                "FROM reply_bank ORDER BY id"
+            ).fetchall()
+        finally:
+            conn.close()
+
+        for entry_id, scenario, language, input_text, reply_json in rows:
+            key = (scenario, language)
+            position = len(entries[key])
+            entries[key].append(BankedReply(entry_id, input_text, json.loads(reply_json)))
+            for cluster in set(segment_clusters(input_text)):
+                index[key][cluster].append(position)
+
+        with self._lock:
+            self._entries, self._index = dict(entries), {k: dict(v) for k, v in index.items()}
+        logger.info(f"Loaded {len(rows)} banked replies from {self.path}")
+        return len(rows)
+
+    def lookup(self, scenario: str, language: str, user_input: str) -> Optional[BankedReply]:
+        """
+        Closest banked reply for the input, or None
+
+        Searches the scenario first, then the general scenario.
+        """
+        clusters = set(segment_clusters(user_input))
+        for key in ((scenario, language), ("general", language)):
+            entries = self._entries.get(key)
+            if not entries:
+                continue
+
+            shared: Counter = Counter()
+            for cluster in clusters:
+                shared.update(self._index[key].get(cluster, ()))
+
+            best, best_score = None, 0.0
+            for position, _ in shared.most_common(MAX_CANDIDATES):
+                entry = entries[position]
+                score = compare_texts(entry.input_text, user_input)["similarity"]
+                if score > best_score:
+                    best, best_score = entry, score
+            if best is not None and best_score >= settings.REPLY_BANK_MIN_SIMILARITY:
+                return best
+        return None
+
+    async def audio(self, entry_id: int) -> Optional[bytes]:
+        """Stored MP3 audio of an entry"""
+        def read() -> Optional[bytes]:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT audio FROM reply_bank WHERE id = ?", (entry_id,)).fetchone()
+            finally:
+                conn.close()
+            return row[0] if row else None
+
+        return await asyncio.to_thread(read)
+
+    def store(self, scenario: str, language: str, input_text: str, reply: Dict[str, Any], audio: Optional[bytes]) -> None:
+        """Insert or replace one entry (used by the build job)"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO reply_bank (scenario, language, input_text, reply_json, audio) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (scenario, language, input_text) DO UPDATE SET "
+                    "reply_json = excluded.reply_json, audio = excluded.audio, "
+                    "created_at = CURRENT_TIMESTAMP",
+                    (scenario, language, input_text, json.dumps(reply, ensure_ascii=False), audio),
+                )
+        finally:
+            conn.close()
+
+
+# Global reply bank instance
+reply_bank = ReplyBank(settings.REPLY_BANK_PATH)
+if settings.REPLY_BANK_ENABLED:
+    reply_bank.load()
@@ -0,0 +1,284 @@
+"""
+Spaced Repetition Scheduler
+발음 평가 결과로 단어 복습 일정 관리 (SM-2)
+
+Review outcomes are buffered in memory and written to vocabulary_progress
+in one transaction per flush, so a drill of 20 phrases does not cost 20
+round trips per word. Flushes only run in the background loop, every
+REVIEW_FLUSH_INTERVAL_SECONDS or as soon as REVIEW_FLUSH_BATCH_SIZE outcomes
+are buffered; requests never wait on them. Each flush locks the rows it
+updates, so workers flushing reviews of the same word do not overwrite each
+other. Due items are read with a single query served by the
+(user_id, next_review_at) index.
+
+While the database is unavailable, flushes back off exponentially up to
+REVIEW_FLUSH_MAX_BACKOFF_SECONDS and at most REVIEW_MAX_PENDING outcomes are
+kept; the oldest are dropped beyond that.
+"""
+from sqlalchemy import bindparam, text
+from app.core.config import settings
+from app.core.database import engine, run_db
+from app.core.metrics import metrics
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ReviewKey = Tuple[int, str, str]  # (user_id, word, language_code)
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+
+def score_to_quality(score: float) -> int:
+    """Map a 0-100 pronunciation score to SM-2 recall quality (0-5)"""
+    for threshold, quality in ((90, 5), (80, 4), (70, 3), (55, 2), (40, 1)):
+        if score >= threshold:
+            return quality
+    return 0
+
+
+def schedule_review(state: Dict[str, Any], quality: int, now: datetime) -> Dict[str, Any]:
+    """
+    Apply one SM-2 review to a progress state
+
+    Args:
+        state: ease_factor, interval_days, repetitions, lapses,
+            times_practiced, times_correct
+        quality: Recall quality 0-5 (3 or more counts as correct)
+        now: Review time
+
+    Returns:
+        New state including next_review_at and proficiency_level
+    """
+    ease = state.get("ease_factor") or DEFAULT_EASE
+    interval = state.get("interval_days") or 0.0
+    repetitions = state.get("repetitions") or 0
+    lapses = state.get("lapses") or 0
+
+    if quality >= 3:
+        if repetitions == 0:
+            interval = 1.0
+        elif repetitions == 1:
+            interval = 6.0
+        else:
+            interval = round(interval * ease, 2)
+        repetitions += 1
+    else:
+        if repetitions > 0:
+            lapses += 1
+        repetitions = 0
+        interval = 1.0
+
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+    if repetitions >= 5:
+        proficiency = "advanced"
+    elif repetitions >= 2:
+        proficiency = "intermediate"
+    else:
+        proficiency = "beginner"
+
+    return {
+        "ease_factor": round(ease, 3),
+        "interval_days": interval,
+        "repetitions": repetitions,
+        "lapses": lapses,
+        "times_practiced": (state.get("times_practiced") or 0) + 1,
+        "times_correct": (state.get("times_correct") or 0) + (1 if quality >= 3 else 0),
+        "proficiency_level": proficiency,
+        "last_practiced_at": now,
+        "next_review_at": now + timedelta(days=interval),
+    }
+
+
+class ReviewScheduler:
+    """Buffers review outcomes and serves due-review queries"""
+
+    def __init__(self):
+        self._pending: List[Tuple[ReviewKey, int, datetime]] = []
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._batch_ready = asyncio.Event()
+        self._failures = 0  # consecutive failed flushes
+
+    async def record(self, user_id: int, word: str, language_code: str, score: float) -> None:
+        """Queue a review outcome; the background loop writes it"""
+        self._pending.append(((user_id, word, language_code), score_to_quality(score), datetime.utcnow()))
+        if len(self._pending) >= settings.REVIEW_FLUSH_BATCH_SIZE:
+            self._batch_ready.set()
+
+    async def record_evaluation(self, user_id: int, language_code: str, evaluation: Dict[str, Any]) -> None:
+        """
+        Queue reviews for every expected word of a pronunciation evaluation
+
+        Correct words take the overall score, partially matched words are
+        capped at a failing score and missed words count as forgotten.
+        """
+        overall = evaluation.get("overall_score", 0)
+        for word in evaluation.get("alignment", []):
+            if word["status"] == "correct":
+                score = overall
+            elif word["status"] == "partial":
+                score = min(overall, 60)
+            else:
+                score = 0
+            await self.record(user_id, word["word"], language_code, score)
+
+    async def flush(self) -> int:
+        """Write all buffered outcomes in a single transaction"""
+        async with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            try:
+                await run_db(self._apply_reviews, pending)
+            except Exception as e:
+                self._failures += 1
+                logger.error(f"Failed to flush {len(pending)} review updates: {e}")
+                # Keep the updates for the next flush, bounded while the DB stays down
+                retained = pending + self._pending
+                overflow = len(retained) - settings.REVIEW_MAX_PENDING
+                if overflow > 0:
+                    retained = retained[overflow:]
+                    metrics.incr("review_updates_dropped_total", overflow)
+                    logger.warning(f"Dropped {overflow} oldest review updates (pending limit reached)")
+                self._pending = retained
+                return 0
+            self._failures = 0
+            return len(pending)
+
+    def _apply_reviews(self, pending: List[Tuple[ReviewKey, int, datetime]]) -> None:
+        keys = list({key for key, _, _ in pending})
+
+        select_states = (
+            "SELECT user_id, word, language_code, ease_factor, interval_days, repetitions, "
+            "lapses, times_practiced, times_correct "
+            "FROM vocabulary_progress "
+            "WHERE user_id IN :user_ids AND word IN :words "
+            "ORDER BY user_id, word, language_code"
+        )
+
+        upsert = text(
+            "INSERT INTO vocabulary_progress (user_id, word, language_code, proficiency_level, "
+            "times_practiced, times_correct, last_practiced_at, ease_factor, interval_days, "
+            "repetitions, lapses, next_review_at) "
+            "VALUES (:user_id, :word, :language_code, :proficiency_level, :times_practiced, "
+            ":times_correct, :last_practiced_at, :ease_factor, :interval_days, :repetitions, "
+            ":lapses, :next_review_at) "
+            "ON CONFLICT (user_id, word, language_code) DO UPDATE SET "
+            "proficiency_level = excluded.proficiency_level, "
+            "times_practiced = excluded.times_practiced, "
+            "times_correct = excluded.times_correct, "
+            "last_practiced_at = excluded.last_practiced_at, "
+            "ease_factor = excluded.ease_factor, "
+            "interval_days = excluded.interval_days, "
+            "repetitions = excluded.repetitions, "
+            "lapses = excluded.lapses, "
+            "next_review_at = excluded.next_review_at"
+        )
+
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # Create missing rows first so FOR UPDATE also covers new words;
+                # concurrent flushes from other workers then wait for this one
+                conn.execute(
+                    text(
+                        "INSERT INTO vocabulary_progress (user_id, word, language_code) "
+                        "VALUES (:user_id, :word, :language_code) "
+                        "ON CONFLICT (user_id, word, language_code) DO NOTHING"
+                    ),
+                    [{"user_id": k[0], "word": k[1], "language_code": k[2]} for k in sorted(keys)],
+                )
+                select_states += " FOR UPDATE"
+            query = text(select_states).bindparams(
+                bindparam("user_ids", expanding=True), bindparam("words", expanding=True)
+            )
+            rows = conn.execute(
+                query,
+                {
+                    "user_ids": sorted({k[0] for k in keys}),
+                    "words": sorted({k[1] for k in keys}),
+                },
+            ).mappings()
+            states: Dict[ReviewKey, Dict[str, Any]] = {
+                (row["user_id"], row["word"], row["language_code"]): dict(row)
+                for row in rows
+            }
+
+            # Apply buffered reviews in order; repeated words build on each other
+            for key, quality, reviewed_at in pending:
+                states[key] = schedule_review(states.get(key, {}), quality, reviewed_at)
+
+            conn.execute(
+                upsert,
+                [
+                    {"user_id": k[0], "word": k[1], "language_code": k[2], **states[k]}
+                    for k in keys
+                ],
+            )
+
+    async def get_due(self, user_id: int, limit: int, language_code: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Next `limit` due items for a user (one indexed range scan)
+
+        Reviews still buffered (up to REVIEW_FLUSH_INTERVAL_SECONDS old) are
+        not reflected yet.
+        """
+        return await run_db(self._select_due, user_id, limit, language_code)
+
+    def _select_due(self, user_id: int, limit: int, language_code: Optional[str]) -> List[Dict[str, Any]]:
+        query = (
+            "SELECT word, language_code, proficiency_level, times_practiced, times_correct, "
+            "interval_days, repetitions, next_review_at "
+            "FROM vocabulary_progress "
+            "WHERE user_id = :user_id AND next_review_at <= :now "
+        )
+        params: Dict[str, Any] = {"user_id": user_id, "now": datetime.utcnow(), "limit": limit}
+        if language_code:
+            query += "AND language_code = :language_code "
+            params["language_code"] = language_code
+        query += "ORDER BY next_review_at LIMIT :limit"
+
+        with engine.connect() as conn:
+            rows = conn.execute(text(query), params).mappings().all()
+
+        items = []
+        for row in rows:
+            item = dict(row)
+            if isinstance(item["next_review_at"], datetime):
+                item["next_review_at"] = item["next_review_at"].isoformat()
+            items.append(item)
+        return items
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            if self._failures:
+                # Back off while the database is down; a full batch does not cut this short
+                delay = settings.REVIEW_FLUSH_INTERVAL_SECONDS * 2 ** (self._failures - 1)
+                await asyncio.sleep(min(settings.REVIEW_FLUSH_MAX_BACKOFF_SECONDS, delay))
+            else:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), settings.REVIEW_FLUSH_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_ready.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flush loop (call from app startup)"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """Stop the loop and write whatever is still buffered"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+
+# Global scheduler instance
+review_scheduler = ReviewScheduler()
@@ -0,0 +1,209 @@
+"""
+Scenario Catalog
+시나리오 콘텐츠 로딩, 검증 및 응답 사전 직렬화
+
+Scenarios live in JSON files (one per scenario, see app/content/scenarios)
+so content can be added without code changes. Files are validated once
+when the catalog is built and every read-only response body is serialized
+to bytes up front together with its strong ETag, so serving them is a
+dictionary lookup.
+
+A catalog is an immutable snapshot. ScenarioContent holds the current one
+and replaces it with a single reference swap on reload, so a request that
+already took a snapshot finishes on it.
+"""
+from pydantic import BaseModel, Field, ValidationError
+from app.core.config import settings
+from app.core.compression import available_encodings, compress
+import hashlib
+import logging
+import orjson
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SCHEMA_VERSIONS = (1,)
+
+# Language the scenario phrases are synthesized in
+CONTENT_LANGUAGE_CODE = "km-KH"
+
+
+class KeyPhrase(BaseModel):
+    khmer: str
+    romanization: str
+    korean: str
+    english: str
+
+
+class VocabularyItem(BaseModel):
+    khmer: str
+    romanization: str
+    meaning: str
+
+
+class Scenario(BaseModel):
+    schema_version: int
+    id: str = Field(pattern=r"^[a-z0-9_-]+$")
+    order: int = 100
+    name_kr: str
+    name_en: str
+    description: str
+    difficulty: str
+    llm_instruction: Optional[str] = None  # scenario persona for the conversation prompt
+    key_phrases: List[KeyPhrase] = Field(min_length=1)
+    vocabulary: List[VocabularyItem] = []
+    conversation_starters: List[str] = Field(min_length=1)
+
+
+class PreparedResponse:
+    """
+    A serialized JSON body, its strong ETag and precompressed variants
+
+    Each encoding is its own representation, so variants get their own
+    ETag (the identity ETag with an encoding suffix).
+    """
+
+    __slots__ = ("body", "etag", "variants")
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.body = orjson.dumps(payload)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.variants: Dict[str, Tuple[bytes, str]] = {}
+        if len(self.body) >= settings.COMPRESSION_MIN_SIZE:
+            for encoding in available_encodings():
+                self.variants[encoding] = (compress(self.body, encoding, static=True), f'"{digest}-{encoding}"')
+
+    def representation(self, encoding: Optional[str]) -> Tuple[bytes, str, Optional[str]]:
+        """(body, etag, content encoding) for the client's preferred encoding"""
+        if encoding in self.variants:
+            body, etag = self.variants[encoding]
+            return body, etag, encoding
+        return self.body, self.etag, None
+
+
+class ScenarioCatalog:
+    """Validated scenarios plus pre-serialized responses for the read-only endpoints"""
+
+    def __init__(self, scenarios: List[Scenario]):
+        ordered = sorted(scenarios, key=lambda s: (s.order, s.id))
+        # Public scenario dicts (file bookkeeping and prompt fields removed)
+        self.scenarios: Dict[str, Dict[str, Any]] = {
+            s.id: s.model_dump(exclude={"schema_version", "order", "llm_instruction"}) for s in ordered
+        }
+        self.instructions: Dict[str, str] = {s.id: s.llm_instruction for s in ordered if s.llm_instruction}
+        self.responses: Dict[str, PreparedResponse] = {}
+
+        summaries = [
+            {key: s[key] for key in ("id", "name_kr", "name_en", "description", "difficulty")}
+            for s in self.scenarios.values()
+        ]
+        self.responses["list"] = PreparedResponse({
+            "success": True,
+            "data": {"scenarios": summaries, "total": len(summaries)},
+        })
+
+        for scenario_id, scenario in self.scenarios.items():
+            self.responses[scenario_id] = PreparedResponse({"success": True, "data": scenario})
+            self.responses[f"{scenario_id}/phrases"] = PreparedResponse({
+                "success": True,
+                "data": {"scenario": scenario_id, "phrases": scenario["key_phrases"]},
+            })
+            self.responses[f"{scenario_id}/vocabulary"] = PreparedResponse({
+                "success": True,
+                "data": {"scenario": scenario_id, "vocabulary": scenario["vocabulary"]},
+            })
+
+        # Content version: changes whenever any response body changes
+        digest = hashlib.sha256()
+        for key in sorted(self.responses):
+            digest.update(self.responses[key].etag.encode())
+        self.version = digest.hexdigest()[:12]
+
+    def get(self, scenario_id: str) -> Optional[Dict[str, Any]]:
+        return self.scenarios.get(scenario_id)
+
+    def response(self, key: str) -> Optional[PreparedResponse]:
+        return self.responses.get(key)
+
+    def spoken_texts(self, scenario_id: str) -> Set[str]:
+        """Khmer texts of a scenario that are synthesized for playback"""
+        scenario = self.scenarios.get(scenario_id)
+        if scenario is None:
+            return set()
+        texts = {p["khmer"] for p in scenario["key_phrases"]}
+        texts.update(v["khmer"] for v in scenario["vocabulary"])
+        texts.update(scenario["conversation_starters"])
+        return texts
+
+    def changed_scenarios(self, other: "ScenarioCatalog") -> Set[str]:
+        """Scenario ids added, removed or modified between this catalog and `other`"""
+        ids = set(self.scenarios) | set(other.scenarios)
+        return {
+            scenario_id for scenario_id in ids
+            if self.scenarios.get(scenario_id) != other.scenarios.get(scenario_id)
+            or self.instructions.get(scenario_id) != other.instructions.get(scenario_id)
+        }
+
+
+class ScenarioContent:
+    """Holds the current catalog snapshot; reloads replace it atomically"""
+
+    def __init__(self, catalog: ScenarioCatalog):
+        self._current = catalog
+
+    @property
+    def current(self) -> ScenarioCatalog:
+        """Take this once per request and use it for the whole request"""
+        return self._current
+
+    def swap(self, catalog: ScenarioCatalog) -> ScenarioCatalog:
+        """Install a new snapshot and return the previous one"""
+        previous, self._current = self._current, catalog
+        return previous
+
+
+def content_fingerprint(content_dir: str) -> Tuple[Tuple[str, int, int], ...]:
+    """Cheap change detector for the content directory (names, mtimes, sizes)"""
+    entries = []
+    for path in sorted(Path(content_dir).glob("*.json")):
+        stat = path.stat()
+        entries.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(entries)
+
+
+def load_scenario_catalog(content_dir: str) -> ScenarioCatalog:
+    """
+    Load and validate every *.json scenario file in `content_dir`
+
+    Raises:
+        ValueError: If a file is invalid, uses an unknown schema_version
+            or repeats a scenario id
+    """
+    scenarios: List[Scenario] = []
+    seen = set()
+
+    for path in sorted(Path(content_dir).glob("*.json")):
+        try:
+            scenario = Scenario.model_validate(orjson.loads(path.read_bytes()))
+        except (orjson.JSONDecodeError, ValidationError) as e:
+            raise ValueError(f"Invalid scenario file {path.name}: {e}") from e
+
+        if scenario.schema_version not in SUPPORTED_SCHEMA_VERSIONS:
+            raise ValueError(f"Unsupported schema_version {scenario.schema_version} in {path.name}")
+        if scenario.id in seen:
+            raise ValueError(f"Duplicate scenario id '{scenario.id}' in {path.name}")
+        seen.add(scenario.id)
+        scenarios.append(scenario)
+
+    if not scenarios:
+        raise ValueError(f"No scenario files found in {content_dir}")
+
+    catalog = ScenarioCatalog(scenarios)
+    logger.info(f"Loaded {len(scenarios)} scenarios (content version {catalog.version})")
+    return catalog
+
+
+# Global content holder (validated at import, i.e. on startup)
+scenario_catalog = ScenarioContent(load_scenario_catalog(settings.SCENARIO_CONTENT_DIR))
@@ -0,0 +1,230 @@
+"""
+Offline scenario packs
+오프라인 학습용 시나리오 팩 (시나리오 JSON + 음성) 생성 및 델타 업데이트
+
+A pack is a zip archive containing:
+- manifest.json: pack version, SHA-256 and size of every file, and which
+  audio file plays each phrase
+- scenario.json: the scenario as served by the API
+- audio/<sha256>.mp3: one clip per spoken text
+
+The pack version is derived from the file hashes, so unchanged content
+always produces the same version. Archives are built deterministically:
+JSON is deflated, and MP3 is stored as is because it is already compressed.
+
+A client that already has a version downloads a delta: a zip of the same
+layout holding only the added or changed files. Its manifest lists the
+removed paths. Audio files are content-addressed, so a changed clip is a
+new file and unchanged clips never transfer again.
+
+A pack built while TTS was unavailable lists its clips in missing_audio.
+Such a pack is rebuilt on a later request once TTS is back, with an
+exponential backoff between attempts while synthesis keeps failing.
+"""
+from app.core.config import settings
+from app.services.scenario_catalog import CONTENT_LANGUAGE_CODE, scenario_catalog
+from app.services.tts_service import tts_service
+import asyncio
+import hashlib
+import json
+import logging
+import orjson
+import os
+import tempfile
+import time
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PACK_FORMAT = 1
+MANIFEST = "manifest.json"
+# Fixed timestamp so identical content produces identical archives
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _write_zip(path: str, manifest: Dict[str, Any], files: Dict[str, bytes]) -> None:
+    """Write a pack archive atomically (manifest first)"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f, zipfile.ZipFile(f, "w") as archive:
+            entries = [(MANIFEST, orjson.dumps(manifest, option=orjson.OPT_SORT_KEYS))] + sorted(files.items())
+            for name, data in entries:
+                info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+                info.compress_type = zipfile.ZIP_STORED if name.endswith(".mp3") else zipfile.ZIP_DEFLATED
+                archive.writestr(info, data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class ScenarioPacks:
+    """Builds pack archives and serves full packs and deltas from disk"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # scenario_id -> (failed audio rebuilds, monotonic time of the next attempt)
+        self._audio_retry: Dict[str, Tuple[int, float]] = {}
+
+    def _dir(self, scenario_id: str) -> str:
+        return os.path.join(self.root, scenario_id)
+
+    def pack_path(self, scenario_id: str, version: str) -> str:
+        return os.path.join(self._dir(scenario_id), f"{version}.zip")
+
+    def _read_manifest(self, scenario_id: str, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self._dir(scenario_id), name), "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, scenario_id: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Manifest of a pack version (the latest when `version` is None)"""
+        if version is not None and not version.isalnum():
+            return None
+        return self._read_manifest(scenario_id, f"{version}.json" if version else "latest.json")
+
+    async def ensure(self, scenario_id: str) -> Optional[Dict[str, Any]]:
+        """Latest manifest, building the pack on first use (None for unknown scenarios)"""
+        if scenario_catalog.current.get(scenario_id) is None:
+            return None
+        manifest = self.manifest(scenario_id)
+        if manifest is not None and manifest["content_version"] == scenario_catalog.current.version:
+            if not manifest["missing_audio"] or not self._audio_retry_due(scenario_id):
+                return manifest
+        return await self.build(scenario_id)
+
+    def _audio_retry_due(self, scenario_id: str) -> bool:
+        """Whether to rebuild a pack with missing audio now (claims the attempt)"""
+        if tts_service.client is None:
+            return False
+        failures, retry_at = self._audio_retry.get(scenario_id, (0, 0.0))
+        now = time.monotonic()
+        if now < retry_at:
+            return False
+        # Concurrent requests keep serving the current pack until the next slot
+        delay = min(settings.PACK_AUDIO_RETRY_MAX_SECONDS, settings.PACK_AUDIO_RETRY_SECONDS * 2 ** failures)
+        self._audio_retry[scenario_id] = (failures + 1, now + delay)
+        return True
+
+    async def build(self, scenario_id: str) -> Dict[str, Any]:
+        """
+        Build the pack for the current content of a scenario
+
+        Audio comes from the TTS cache or one batch synthesis. Texts whose
+        audio cannot be produced (TTS unavailable) are listed in
+        missing_audio and the client falls back to streaming them.
+        """
+        lock = self._locks.setdefault(scenario_id, asyncio.Lock())
+        async with lock:
+            catalog = scenario_catalog.current
+            scenario = catalog.get(scenario_id)
+            if scenario is None:
+                raise KeyError(scenario_id)
+
+            texts = sorted(catalog.spoken_texts(scenario_id))
+            clips: Dict[str, bytes] = {}
+            if tts_service.client is not None:
+                try:
+                    clips = await tts_service.synthesize_batch(texts, CONTENT_LANGUAGE_CODE)
+                except Exception as e:
+                    logger.warning(f"Pack {scenario_id}: audio synthesis failed: {e}")
+
+            files: Dict[str, bytes] = {"scenario.json": orjson.dumps(scenario, option=orjson.OPT_SORT_KEYS)}
+            audio: Dict[str, str] = {}
+            for text in texts:
+                if text in clips:
+                    path = f"audio/{hashlib.sha256(clips[text]).hexdigest()}.mp3"
+                    files[path] = clips[text]
+                    audio[text] = path
+
+            entries = {
+                path: {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+                for path, data in files.items()
+            }
+            version = hashlib.sha256(
+                json.dumps([entries, audio], sort_keys=True, ensure_ascii=False).encode("utf-8")
+            ).hexdigest()[:16]
+            manifest = {
+                "format": PACK_FORMAT,
+                "scenario": scenario_id,
+                "version": version,
+                "content_version": catalog.version,
+                "language_code": CONTENT_LANGUAGE_CODE,
+                "files": entries,
+                "audio": audio,
+                "missing_audio": [text for text in texts if text not in audio],
+            }
+
+            await asyncio.to_thread(self._store, scenario_id, manifest, files)
+            if not manifest["missing_audio"]:
+                self._audio_retry.pop(scenario_id, None)
+            logger.info(f"Pack {scenario_id} {version}: {len(audio)} clips, {len(manifest['missing_audio'])} missing")
+            return manifest
+
+    def _store(self, scenario_id: str, manifest: Dict[str, Any], files: Dict[str, bytes]) -> None:
+        directory = self._dir(scenario_id)
+        os.makedirs(directory, exist_ok=True)
+        version = manifest["version"]
+        if not os.path.exists(self.pack_path(scenario_id, version)):
+            _write_zip(self.pack_path(scenario_id, version), manifest, files)
+        manifest_json = orjson.dumps(manifest, option=orjson.OPT_SORT_KEYS)
+        _write_atomic(os.path.join(directory, f"{version}.json"), manifest_json)
+        _write_atomic(os.path.join(directory, "latest.json"), manifest_json)
+        self._prune(directory, keep=version)
+
+    def _prune(self, directory: str, keep: str) -> None:
+        """Keep the newest PACK_KEEP_VERSIONS versions (and deltas between them)"""
+        manifests = [
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.endswith(".json") and name != "latest.json"
+        ]
+        manifests.sort(key=os.path.getmtime, reverse=True)
+        kept = {keep} | {os.path.basename(p)[:-5] for p in manifests[: settings.PACK_KEEP_VERSIONS]}
+        for name in os.listdir(directory):
+            stem = name.rsplit(".", 1)[0]
+            versions = stem.split("-")[1:] if stem.startswith("delta-") else [stem]
+            if stem != "latest" and not name.startswith(".tmp-") and not set(versions) <= kept:
+                os.unlink(os.path.join(directory, name))
+
+    async def delta_path(self, scenario_id: str, manifest: Dict[str, Any], since: str) -> Optional[str]:
+        """
+        Archive updating version `since` to `manifest` (built on first request)
+
+        Returns None when `since` is unknown (the client needs the full pack).
+        """
+        old = self.manifest(scenario_id, since)
+        if old is None:
+            return None
+        path = os.path.join(self._dir(scenario_id), f"delta-{since}-{manifest['version']}.zip")
+        if not os.path.exists(path):
+            await asyncio.to_thread(self._write_delta, scenario_id, old, manifest, path)
+        return path
+
+    def _write_delta(self, scenario_id: str, old: Dict[str, Any], new: Dict[str, Any], path: str) -> None:
+        changed = [
+            name for name, entry in new["files"].items()
+            if old["files"].get(name, {}).get("sha256") != entry["sha256"]
+        ]
+        removed: List[str] = sorted(set(old["files"]) - set(new["files"]))
+        with zipfile.ZipFile(self.pack_path(scenario_id, new["version"])) as full:
+            files = {name: full.read(name) for name in changed}
+        _write_zip(path, {**new, "delta": {"from": old["version"], "removed": removed}}, files)
+
+
+# Global pack store instance
+scenario_packs = ScenarioPacks(settings.PACK_DIR)
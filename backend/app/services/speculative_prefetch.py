@@ -0,0 +1,224 @@
+"""
+Speculative next-turn prefetch
+다음 학습자 발화를 예측하여 LLM 응답/TTS 음성을 미리 생성
+
+In scenario mode learners mostly answer with the scenario's key phrases.
+After each assistant turn the top-K likely learner replies are predicted,
+and the reply to each is generated in the background (LLM response plus
+TTS audio), which fills the shared LLM and TTS caches. When the learner's
+actual input is a prediction (the same grapheme clusters, ignoring spacing
+and punctuation), the predicted phrase is sent to the LLM so the turn is
+served from those caches. Anything else, including a near miss, goes to
+the LLM as said: the tutor has to react to the learner's mistakes.
+
+Key phrases are Khmer, so only Khmer conversations are prefetched.
+
+Predictions are kept per conversation state (scenario, language and the
+recent messages the prompt sees) in an LRU; replies generated for a state
+that is evicted without being served count as wasted. Prefetching is
+bounded by a concurrency limit and a per-minute budget of LLM calls, all
+per worker process. Hit, miss and wasted counts are exported so K can be
+tuned.
+"""
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.llm_service import llm_service
+from app.services.scenario_catalog import scenario_catalog
+from app.services.text_alignment import segment_clusters
+from app.services.tts_service import tts_service
+import asyncio
+import hashlib
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Messages of context the LLM prompt uses (see LLMService.generate_response)
+CONTEXT_MESSAGES = 5
+# Prefetches allowed to wait per concurrency slot before new ones are skipped
+QUEUED_PER_SLOT = 4
+# Language of the scenario key phrases that are predicted
+PREFETCH_LANGUAGE = "Khmer"
+
+
+class TurnPrediction:
+    """Predicted learner replies for one conversation state"""
+
+    __slots__ = ("scenario", "phrases", "generated", "used")
+
+    def __init__(self, scenario: str, phrases: List[str]):
+        self.scenario = scenario
+        self.phrases = phrases
+        self.generated: Set[str] = set()
+        self.used: Set[str] = set()
+
+
+class SpeculativePrefetcher:
+    """Predicts next learner turns and warms the caches for them"""
+
+    def __init__(self):
+        self._turns: "OrderedDict[str, TurnPrediction]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        self._calls: Deque[float] = deque()  # LLM calls in the last minute
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._phrase_hits: Counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.PREFETCH_ENABLED and settings.PREFETCH_TOP_K > 0
+
+    def applies(self, language: str) -> bool:
+        """Predictions are Khmer key phrases; other languages would only waste the budget"""
+        return self.enabled and language == PREFETCH_LANGUAGE
+
+    def _turn_key(self, scenario: str, language: str, context: List[Dict[str, str]]) -> str:
+        recent = "\n".join(f"{m['role']}: {m['content']}" for m in context[-CONTEXT_MESSAGES:])
+        return hashlib.sha256(f"{scenario}\n{language}\n{recent}".encode("utf-8")).hexdigest()
+
+    def predict(self, scenario: str, context: List[Dict[str, str]]) -> List[str]:
+        """
+        Top-K likely learner replies
+
+        Key phrases of the scenario the learner has not said yet, ranked by
+        how often they were the actual reply before, then by scenario order.
+        """
+        item = scenario_catalog.current.get(scenario)
+        if item is None:
+            return []
+
+        said = {tuple(segment_clusters(m["content"])) for m in context if m["role"] == "user"}
+        candidates = []
+        for position, phrase in enumerate(p["khmer"] for p in item["key_phrases"]):
+            if "..." in phrase or "/" in phrase:
+                continue  # templates and alternatives are not literal replies
+            if tuple(segment_clusters(phrase)) in said:
+                continue
+            candidates.append((-self._phrase_hits[(scenario, phrase)], position, phrase))
+
+        return [phrase for _, _, phrase in sorted(candidates)[: settings.PREFETCH_TOP_K]]
+
+    def schedule(
+        self,
+        scenario: str,
+        language: str,
+        language_code: str,
+        next_context: List[Dict[str, str]],
+    ) -> None:
+        """
+        Start prefetching the learner turn that follows `next_context`
+
+        Returns immediately; generation runs in background tasks.
+        """
+        if not self.applies(language):
+            return
+
+        key = self._turn_key(scenario, language, next_context)
+        if key in self._turns:
+            self._turns.move_to_end(key)
+            return  # same conversation state already prefetched
+
+        phrases = self.predict(scenario, next_context)
+        if not phrases:
+            return
+
+        self._register(key, TurnPrediction(scenario, phrases))
+        metrics.incr("prefetch_predictions_total", len(phrases), scenario=scenario)
+
+        for phrase in phrases:
+            if len(self._tasks) >= settings.PREFETCH_MAX_CONCURRENT * QUEUED_PER_SLOT:
+                metrics.incr("prefetch_skipped_total", reason="busy")
+                continue
+            task = asyncio.create_task(self._prefetch(key, phrase, next_context, scenario, language, language_code))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def resolve(self, scenario: str, language: str, context: List[Dict[str, str]], user_input: str) -> str:
+        """
+        Map the learner's input to a prefetched phrase when it is one
+
+        Only an exact (cluster-equal) match is substituted, so the LLM
+        always sees what the learner actually said.
+
+        Returns the phrase to send to the LLM (the input itself on a miss).
+        """
+        if not self.applies(language):
+            return user_input
+
+        prediction = self._turns.get(self._turn_key(scenario, language, context))
+        if prediction is None:
+            return user_input
+        metrics.incr("prefetch_lookups_total", scenario=scenario)
+
+        target = tuple(segment_clusters(user_input))
+        match = next((p for p in prediction.phrases if tuple(segment_clusters(p)) == target), None)
+
+        if match is not None and match in prediction.generated:
+            prediction.used.add(match)
+            self._phrase_hits[(scenario, match)] += 1
+            metrics.incr("prefetch_hits_total", scenario=scenario)
+            return match
+
+        metrics.incr("prefetch_misses_total", scenario=scenario)
+        return user_input
+
+    def _register(self, key: str, prediction: TurnPrediction) -> None:
+        self._turns[key] = prediction
+        self._turns.move_to_end(key)
+        while len(self._turns) > settings.PREFETCH_MAX_TURNS:
+            _, evicted = self._turns.popitem(last=False)
+            # Replies generated for a state that is gone and never served
+            wasted = len(evicted.generated - evicted.used)
+            if wasted:
+                metrics.incr("prefetch_wasted_total", wasted, scenario=evicted.scenario)
+
+    def _take_budget(self) -> bool:
+        """Reserve one LLM call from the per-minute budget"""
+        now = time.monotonic()
+        while self._calls and now - self._calls[0] > 60:
+            self._calls.popleft()
+        if len(self._calls) >= settings.PREFETCH_MAX_CALLS_PER_MINUTE:
+            return False
+        self._calls.append(now)
+        return True
+
+    async def _prefetch(
+        self,
+        key: str,
+        phrase: str,
+        context: List[Dict[str, str]],
+        scenario: str,
+        language: str,
+        language_code: str,
+    ) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.PREFETCH_MAX_CONCURRENT)
+        async with self._semaphore:
+            if not self._take_budget():
+                metrics.incr("prefetch_skipped_total", reason="budget")
+                return
+            try:
+                reply = await llm_service.generate_response(
+                    user_input=phrase,
+                    conversation_context=context,
+                    scenario=scenario,
+                    language=language,
+                )
+                if settings.PREFETCH_TTS and tts_service.client is not None and reply.get("response_text"):
+                    await tts_service.synthesize_speech(text=reply["response_text"], language_code=language_code)
+            except Exception as e:
+                metrics.incr("prefetch_failed_total", scenario=scenario)
+                logger.warning(f"Prefetch for '{phrase}' failed: {e}")
+                return
+
+        prediction = self._turns.get(key)
+        if prediction is not None:
+            prediction.generated.add(phrase)
+            metrics.incr("prefetch_generated_total", scenario=scenario)
+        else:
+            metrics.incr("prefetch_wasted_total", scenario=scenario)  # state evicted meanwhile
+
+
+# Global prefetcher instance
+speculative_prefetch = SpeculativePrefetcher()
@@ -5,8 +5,11 @@ Speech-to-Text Service using Google Cloud Speech API
 from google.cloud import speech
 from google.cloud.speech import RecognitionConfig, RecognitionAudio
 from app.core.config import settings
+from app.services.audio_segmenter import decode_pcm16, find_split_points
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -61,8 +64,8 @@ class STTService:
 
             audio = RecognitionAudio(content=audio_content)
 
-            # Perform recognition
-            response = self.client.recognize(config=config, audio=audio)
+            # Perform recognition (off the event loop so clips can be transcribed concurrently)
+            response = await asyncio.to_thread(self.client.recognize, config=config, audio=audio)
 
             if not response.results:
                 return {
@@ -98,6 +101,140 @@ class STTService:
             logger.error(f"Transcription error: {e}")
             raise Exception(f"Failed to transcribe audio: {str(e)}")
 
+    async def transcribe_long_audio(
+        self,
+        audio_content: bytes,
+        language_code: str = "km-KH",
+        sample_rate: Optional[int] = None,
+        frame_energies: Optional[np.ndarray] = None,
+    ) -> Dict[str, Any]:
+        """
+        Transcribe recordings longer than the synchronous recognition limit
+
+        The recording is split at pauses into chunks of at most
+        LONG_AUDIO_CHUNK_SECONDS, the chunks are recognized concurrently
+        (bounded by LONG_AUDIO_STT_CONCURRENCY), and transcripts and word
+        time offsets are stitched back together on the global timeline.
+
+        Args:
+            audio_content: LINEAR16 audio (WAV or raw PCM)
+            language_code: Language code
+            sample_rate: Sample rate for raw PCM (WAV headers take precedence)
+            frame_energies: VAD frame energies computed while the upload streamed in
+
+        Returns:
+            Same shape as transcribe_audio, plus duration and chunk details
+        """
+        if not self.client:
+            raise RuntimeError("STT Service not initialized")
+
+        try:
+            samples, rate = decode_pcm16(audio_content, sample_rate or settings.AUDIO_SAMPLE_RATE)
+            duration = len(samples) / rate
+            if duration > settings.LONG_AUDIO_MAX_SECONDS:
+                raise ValueError(
+                    f"Audio is {duration:.0f}s long; maximum is {settings.LONG_AUDIO_MAX_SECONDS}s"
+                )
+
+            ranges = find_split_points(
+                samples,
+                rate,
+                max_chunk_seconds=settings.LONG_AUDIO_CHUNK_SECONDS,
+                min_silence_ms=settings.LONG_AUDIO_MIN_SILENCE_MS,
+                energy=frame_energies,
+            )
+            semaphore = asyncio.Semaphore(settings.LONG_AUDIO_STT_CONCURRENCY)
+
+            async def recognize(start: int, end: int) -> Dict[str, Any]:
+                async with semaphore:
+                    # samples is a view over the upload; this is the one copy protobuf requires
+                    return await self._recognize_chunk(samples[start:end].tobytes(), language_code, rate)
+
+            chunk_results = await asyncio.gather(*(recognize(start, end) for start, end in ranges))
+
+            transcripts = []
+            words: List[Dict[str, Any]] = []
+            chunks = []
+            weighted_confidence = 0.0
+            for (start, end), result in zip(ranges, chunk_results):
+                offset = start / rate
+                chunk_duration = (end - start) / rate
+                if result["transcript"]:
+                    transcripts.append(result["transcript"])
+                    weighted_confidence += result["confidence"] * chunk_duration
+                for word in result["words"]:
+                    words.append({
+                        **word,
+                        "start_time": round(word["start_time"] + offset, 3),
+                        "end_time": round(word["end_time"] + offset, 3),
+                    })
+                chunks.append({
+                    "start_time": round(offset, 3),
+                    "end_time": round(end / rate, 3),
+                    "transcript": result["transcript"],
+                })
+
+            spoken_duration = sum(
+                (end - start) / rate
+                for (start, end), result in zip(ranges, chunk_results)
+                if result["transcript"]
+            )
+
+            return {
+                "transcript": " ".join(transcripts),
+                "confidence": weighted_confidence / spoken_duration if spoken_duration else 0.0,
+                "words": words,
+                "language": language_code,
+                "duration": round(duration, 3),
+                "chunks": chunks,
+            }
+
+        except Exception as e:
+            logger.error(f"Long audio transcription error: {e}")
+            raise Exception(f"Failed to transcribe long audio: {str(e)}")
+
+    async def _recognize_chunk(
+        self,
+        pcm_content: bytes,
+        language_code: str,
+        sample_rate: int,
+    ) -> Dict[str, Any]:
+        """Recognize one chunk and join all of its results (chunk-relative times)"""
+        config = RecognitionConfig(
+            encoding=RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=sample_rate,
+            language_code=language_code,
+            enable_word_time_offsets=True,
+            enable_word_confidence=True,
+            enable_automatic_punctuation=True,
+            model="default",
+        )
+        audio = RecognitionAudio(content=pcm_content)
+        response = await asyncio.to_thread(self.client.recognize, config=config, audio=audio)
+
+        transcripts = []
+        confidences = []
+        words = []
+        for result in response.results:
+            if not result.alternatives:
+                continue
+            alternative = result.alternatives[0]
+            transcripts.append(alternative.transcript.strip())
+            confidences.append(alternative.confidence)
+            for word_info in alternative.words:
+                words.append({
+                    "word": word_info.word,
+                    "start_time": word_info.start_time.total_seconds(),
+                    "end_time": word_info.end_time.total_seconds(),
+                    "confidence": getattr(word_info, "confidence", alternative.confidence),
+                })
+
+        return {
+            "transcript": " ".join(t for t in transcripts if t),
+            "confidence": sum(confidences) / len(confidences) if confidences else 0.0,
+            "words": words,
+        }
+
     async def transcribe_with_alternatives(
         self,
         audio_content: bytes,
@@ -122,7 +259,7 @@ class STTService:
             )
 
             audio = RecognitionAudio(content=audio_content)
-            response = self.client.recognize(config=config, audio=audio)
+            response = await asyncio.to_thread(self.client.recognize, config=config, audio=audio)
 
             if not response.results:
                 return {"alternatives": [], "message": "No speech detected"}
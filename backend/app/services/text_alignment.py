@@ -0,0 +1,301 @@
+"""
+Grapheme cluster segmentation and alignment
+크메르/라오/베트남어 음절 단위 분리 및 정렬
+
+In Khmer a consonant together with its subscripts (COENG + consonant),
+vowel signs and diacritics forms one written unit. Comparing raw code
+points treats a wrong vowel sign as a tiny difference and a missing
+subscript as an unrelated one, so scoring works on these clusters instead.
+
+Alignment is a weighted edit distance over cluster ids computed row by row
+with NumPy inside a diagonal band, which keeps long reading passages fast.
+"""
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+KHMER_COENG = "\u17d2"
+KHMER_DEPENDENT_VOWELS = ("\u17b6", "\u17c5")
+KHMER_SIGNS = ("\u17c6", "\u17d3")
+LAO_LEADING_VOWELS = ("\u0ec0", "\u0ec4")  # written before the consonant they follow in speech
+LAO_TONE_MARKS = ("\u0ec8", "\u0ecb")
+# Vietnamese tone marks after NFD (grave, acute, tilde, hook above, dot below);
+# other combining marks (circumflex, breve, horn) change the vowel itself
+VIETNAMESE_TONE_MARKS = "\u0300\u0301\u0303\u0309\u0323"
+LATIN_VOWELS = "aeiouy"
+WORD_SEPARATORS = "\u200b"  # zero width space, used between Khmer words
+
+# Minimum band half-width and band growth relative to the longer sequence
+BAND_MIN = 8
+BAND_RATIO = 0.25
+
+# Alignment operations
+MATCH = "match"
+SUBSTITUTE = "substitute"
+DELETE = "delete"  # expected cluster missing from what the learner said
+INSERT = "insert"  # extra cluster the learner added
+
+
+def _in_range(char: str, bounds: Tuple[str, str]) -> bool:
+    return bounds[0] <= char <= bounds[1]
+
+
+def _is_separator(char: str) -> bool:
+    return char.isspace() or char in WORD_SEPARATORS or unicodedata.category(char).startswith("P")
+
+
+def segment_words(text: str) -> List[List[str]]:
+    """
+    Split text into words, each a list of grapheme clusters
+
+    Text is NFC-normalized and case-folded (Vietnamese tone marks stay
+    attached to their letter). Combining marks attach to the preceding base
+    character, a Khmer COENG joins the following consonant, and a Lao
+    leading vowel joins the consonant after it. Whitespace and punctuation
+    separate words and are dropped.
+    """
+    text = unicodedata.normalize("NFC", text).casefold()
+    words: List[List[str]] = []
+    clusters: List[str] = []
+    current = ""
+    join_next = False
+
+    for char in text:
+        if _is_separator(char):
+            if current:
+                clusters.append(current)
+            if clusters:
+                words.append(clusters)
+            clusters, current, join_next = [], "", False
+            continue
+
+        if current and (join_next or unicodedata.category(char).startswith("M") or char in "\u200c\u200d"):
+            current += char
+        else:
+            if current:
+                clusters.append(current)
+            current = char
+
+        join_next = char == KHMER_COENG or _in_range(char, LAO_LEADING_VOWELS)
+
+    if current:
+        clusters.append(current)
+    if clusters:
+        words.append(clusters)
+    return words
+
+
+def segment_clusters(text: str) -> List[str]:
+    """Split text into grapheme clusters (word boundaries dropped)"""
+    return [cluster for word in segment_words(text) for cluster in word]
+
+
+def base_char(cluster: str) -> str:
+    """Base letter of a cluster without vowel signs or tone marks"""
+    return unicodedata.normalize("NFD", cluster)[:1]
+
+
+def substitution_cost(expected: str, actual: str) -> float:
+    """Clusters sharing a base character (vowel/subscript/tone slip) cost half an edit"""
+    if expected == actual:
+        return 0.0
+    if base_char(expected) == base_char(actual):
+        return 0.5
+    return 1.0
+
+
+def _encode(expected: List[str], actual: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Map clusters and their base characters to integer ids"""
+    cluster_ids: Dict[str, int] = {}
+    base_ids: Dict[str, int] = {}
+
+    def ids(clusters: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        c = np.fromiter((cluster_ids.setdefault(x, len(cluster_ids)) for x in clusters), dtype=np.int32, count=len(clusters))
+        b = np.fromiter((base_ids.setdefault(base_char(x), len(base_ids)) for x in clusters), dtype=np.int32, count=len(clusters))
+        return c, b
+
+    e_ids, e_base = ids(expected)
+    a_ids, a_base = ids(actual)
+    return e_ids, e_base, a_ids, a_base
+
+
+def distance_matrix(expected: List[str], actual: List[str], band: Optional[int] = None) -> np.ndarray:
+    """
+    Banded weighted edit distance matrix
+
+    Cells further than `band` from the diagonal are left at infinity. Each
+    row is computed with vector operations: substitution and deletion come
+    from the previous row, and insertions are resolved with a running
+    minimum (d[j] = min_k(d[k] + j - k)).
+    """
+    n, m = len(expected), len(actual)
+    if band is None:
+        band = max(BAND_MIN, int(max(n, m) * BAND_RATIO))
+    band = max(band, abs(n - m))
+
+    e_ids, e_base, a_ids, a_base = _encode(expected, actual)
+
+    dist = np.full((n + 1, m + 1), np.inf, dtype=np.float32)
+    first = min(m, band)
+    dist[0, : first + 1] = np.arange(first + 1, dtype=np.float32)
+
+    for i in range(1, n + 1):
+        lo, hi = max(0, i - band), min(m, i + band)
+        cols = np.arange(lo, hi + 1)
+        row = np.full(hi - lo + 1, np.inf, dtype=np.float32)
+
+        if lo == 0:
+            row[0] = i
+        inner = cols[cols >= 1]
+        if inner.size:
+            cost = np.where(
+                a_ids[inner - 1] == e_ids[i - 1],
+                0.0,
+                np.where(a_base[inner - 1] == e_base[i - 1], 0.5, 1.0),
+            )
+            substitute = dist[i - 1, inner - 1] + cost
+            delete = dist[i - 1, inner] + 1.0
+            row[inner - lo] = np.minimum(substitute, delete)
+
+        # Insertions: running minimum along the row
+        offsets = cols.astype(np.float32)
+        dist[i, lo : hi + 1] = np.minimum.accumulate(row - offsets) + offsets
+
+    return dist
+
+
+def _backtrace(expected: List[str], actual: List[str], dist: np.ndarray) -> List[Tuple[str, int, int]]:
+    """Recover (op, expected index, actual index) steps in reading order (-1 = none)"""
+    steps: List[Tuple[str, int, int]] = []
+    i, j = len(expected), len(actual)
+    while i > 0 or j > 0:
+        if i > 0 and j > 0:
+            cost = substitution_cost(expected[i - 1], actual[j - 1])
+            if dist[i, j] == dist[i - 1, j - 1] + cost:
+                steps.append((MATCH if cost == 0 else SUBSTITUTE, i - 1, j - 1))
+                i, j = i - 1, j - 1
+                continue
+        if i > 0 and dist[i, j] == dist[i - 1, j] + 1:
+            steps.append((DELETE, i - 1, -1))
+            i -= 1
+        else:
+            steps.append((INSERT, -1, j - 1))
+            j -= 1
+
+    steps.reverse()
+    return steps
+
+
+def align_clusters(expected: List[str], actual: List[str]) -> List[Dict[str, str]]:
+    """
+    Weighted edit-distance alignment of two cluster sequences
+
+    Returns the edit script as a list of
+    {"op", "expected", "actual"} entries in reading order.
+    """
+    dist = distance_matrix(expected, actual)
+    return [
+        {
+            "op": op,
+            "expected": expected[i] if i >= 0 else "",
+            "actual": actual[j] if j >= 0 else "",
+        }
+        for op, i, j in _backtrace(expected, actual, dist)
+    ]
+
+
+def compare_texts(expected_text: str, actual_text: str) -> Dict[str, Any]:
+    """
+    Compare what the learner said with the expected text
+
+    Returns:
+        Dictionary containing:
+        - similarity: 0-100, 1 - distance / longer cluster count
+        - distance: weighted edit distance in clusters
+        - words: per expected word {"word", "heard", "status", "operations"}
+          where status is correct, partial or missed (for highlighting)
+    """
+    expected_words = segment_words(expected_text)
+    expected = [c for word in expected_words for c in word]
+    actual = segment_clusters(actual_text)
+
+    if not expected or not actual:
+        return {"similarity": 0.0, "distance": float(max(len(expected), len(actual))), "words": []}
+
+    word_of = [w for w, word in enumerate(expected_words) for _ in word]
+    dist = distance_matrix(expected, actual)
+    distance = float(dist[len(expected), len(actual)])
+
+    words = [
+        {"word": "".join(word), "heard": "", "status": "", "operations": []}
+        for word in expected_words
+    ]
+    current = 0
+    for op, i, j in _backtrace(expected, actual, dist):
+        if i >= 0:
+            current = word_of[i]
+        entry = words[current]
+        entry["operations"].append({
+            "op": op,
+            "expected": expected[i] if i >= 0 else "",
+            "actual": actual[j] if j >= 0 else "",
+        })
+        if j >= 0:
+            entry["heard"] += actual[j]
+
+    for entry in words:
+        ops = {o["op"] for o in entry["operations"]}
+        if ops == {MATCH}:
+            entry["status"] = "correct"
+        elif ops == {DELETE}:
+            entry["status"] = "missed"
+        else:
+            entry["status"] = "partial"
+
+    similarity = max(0.0, 1.0 - distance / max(len(expected), len(actual))) * 100
+    return {"similarity": similarity, "distance": distance, "words": words}
+
+
+def _tone_marks(cluster: str) -> str:
+    return "".join(
+        c for c in unicodedata.normalize("NFD", cluster)
+        if c in VIETNAMESE_TONE_MARKS or _in_range(c, LAO_TONE_MARKS)
+    )
+
+
+def classify_substitution(expected: str, actual: str) -> str:
+    """
+    Name the kind of difference between two clusters
+
+    Base letters are compared with base_char(), as in substitution_cost, so
+    a Vietnamese or Lao tone slip on the same letter is a "tone" error.
+
+    Returns one of "tone", "vowel", "subscript", "diacritic" or "consonant".
+    """
+    e_letter, a_letter = base_char(expected), base_char(actual)
+    if e_letter != a_letter:
+        if e_letter in LATIN_VOWELS and a_letter in LATIN_VOWELS:
+            return "vowel"
+        return "consonant"
+    if _tone_marks(expected) != _tone_marks(actual):
+        return "tone"
+
+    def parts(cluster: str) -> Tuple[str, str, str, str]:
+        base = cluster[:1]
+        subscripts = "".join(
+            cluster[k + 1] for k in range(len(cluster) - 1)
+            if cluster[k] == KHMER_COENG
+        )
+        vowels = "".join(c for c in cluster if _in_range(c, KHMER_DEPENDENT_VOWELS))
+        signs = "".join(c for c in cluster if _in_range(c, KHMER_SIGNS) and c != KHMER_COENG)
+        return base, subscripts, vowels, signs
+
+    _, e_sub, e_vowel, e_sign = parts(expected)
+    _, a_sub, a_vowel, a_sign = parts(actual)
+
+    if e_sub != a_sub:
+        return "subscript"
+    if e_vowel != a_vowel or e_letter in LATIN_VOWELS:
+        return "vowel"  # Latin vowel letters: circumflex/breve/horn differ
+    return "diacritic"
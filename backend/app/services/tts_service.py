@@ -3,12 +3,23 @@ Text-to-Speech Service using Google Cloud TTS API
 텍스트를 크메르어 음성으로 변환
 """
 from google.cloud import texttospeech
+from google.cloud import texttospeech_v1beta1
 from app.core.config import settings
+from app.core.cache import cache, make_key
+from app.core.metrics import metrics
+from app.services.mp3_frames import split_at
+from app.services.voice_catalog import VoiceCatalog
+import hashlib
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+from xml.sax.saxutils import escape
 
 logger = logging.getLogger(__name__)
 
+# Mark placed before each item of a batch SSML document
+BATCH_MARK_PREFIX = "item"
+
+
 
 class TTSService:
     """Text-to-Speech service for converting text to natural audio"""
@@ -17,10 +28,14 @@ class TTSService:
         """Initialize Google Cloud TTS client"""
         try:
             self.client = texttospeech.TextToSpeechClient()
+            # Timepoints for <mark> tags are only available in v1beta1
+            self.beta_client = texttospeech_v1beta1.TextToSpeechClient()
             logger.info("TTS Service initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize TTS Service: {e}")
             self.client = None
+            self.beta_client = None
+        self.voices = VoiceCatalog(self.client)
 
     async def synthesize_speech(
         self,
@@ -29,6 +44,7 @@ class TTSService:
         voice_gender: str = "NEUTRAL",
         speaking_rate: float = 1.0,
         pitch: float = 0.0,
+        voice_name: Optional[str] = None,
     ) -> bytes:
         """
         Convert text to speech audio
@@ -39,6 +55,7 @@ class TTSService:
             voice_gender: Voice gender (NEUTRAL, MALE, FEMALE)
             speaking_rate: Speaking rate (0.25 to 4.0, 1.0 is normal)
             pitch: Pitch adjustment (-20.0 to 20.0, 0.0 is normal)
+            voice_name: Preferred voice name or voice type (optional)
 
         Returns:
             Audio content in bytes (MP3 format)
@@ -46,6 +63,13 @@ class TTSService:
         if not self.client:
             raise RuntimeError("TTS Service not initialized")
 
+        voice_gender = voice_gender.upper()
+        resolved = self.voices.resolve(language_code, voice_gender, voice_name)
+        cache_key = self._cache_key(text, language_code, resolved or voice_gender, speaking_rate, pitch)
+        cached_audio = await cache.get(cache_key)
+        if cached_audio is not None:
+            return cached_audio
+
         try:
             # Set the text input to be synthesized
             synthesis_input = texttospeech.SynthesisInput(text=text)
@@ -57,10 +81,11 @@ class TTSService:
                 "FEMALE": texttospeech.SsmlVoiceGender.FEMALE,
             }
 
-            # Build the voice request
+            # Build the voice request (by name once the voice catalog is loaded)
             voice = texttospeech.VoiceSelectionParams(
                 language_code=language_code,
-                ssml_gender=gender_map.get(voice_gender.upper(), texttospeech.SsmlVoiceGender.NEUTRAL),
+                name=resolved or "",
+                ssml_gender=gender_map.get(voice_gender, texttospeech.SsmlVoiceGender.NEUTRAL),
             )
 
             # Select the type of audio file and audio settings
@@ -79,12 +104,37 @@ class TTSService:
             )
 
             logger.info(f"Successfully synthesized speech for text: {text[:50]}...")
+            await cache.set(cache_key, response.audio_content, ttl=settings.TTS_CACHE_TTL_SECONDS)
             return response.audio_content
 
         except Exception as e:
             logger.error(f"TTS synthesis error: {e}")
             raise Exception(f"Failed to synthesize speech: {str(e)}")
 
+    async def invalidate(
+        self,
+        text: str,
+        language_code: str = "km-KH",
+        voice_gender: str = "NEUTRAL",
+        speaking_rate: float = 1.0,
+        pitch: float = 0.0,
+        voice_name: Optional[str] = None,
+    ) -> None:
+        """Evict the cached audio for one synthesis request"""
+        voice_gender = voice_gender.upper()
+        resolved = self.voices.resolve(language_code, voice_gender, voice_name)
+        await cache.delete(self._cache_key(text, language_code, resolved or voice_gender, speaking_rate, pitch))
+
+    def _cache_key(self, *params: Any) -> str:
+        """
+        Cache key shared by all workers for identical synthesis parameters
+
+        Takes the resolved voice name (the gender only while the voice
+        catalog is unavailable).
+        """
+        digest = hashlib.sha256("\x1f".join(str(p) for p in params).encode("utf-8")).hexdigest()
+        return make_key("tts", digest)
+
     async def get_available_voices(self, language_code: str = "km-KH") -> list:
         """
         Get available voices for a specific language
@@ -93,24 +143,14 @@ class TTSService:
             language_code: Language code to get voices for
 
         Returns:
-            List of available voices with their properties
+            List of available voices with their properties (from the voice
+            catalog, preferred voices first)
         """
         if not self.client:
             raise RuntimeError("TTS Service not initialized")
 
         try:
-            voices = self.client.list_voices(language_code=language_code)
-
-            available_voices = []
-            for voice in voices.voices:
-                available_voices.append({
-                    "name": voice.name,
-                    "language_codes": voice.language_codes,
-                    "gender": texttospeech.SsmlVoiceGender(voice.ssml_gender).name,
-                    "natural_sample_rate": voice.natural_sample_rate_hertz,
-                })
-
-            return available_voices
+            return await self.voices.list(language_code)
 
         except Exception as e:
             logger.error(f"Failed to get available voices: {e}")
@@ -136,28 +176,168 @@ class TTSService:
             raise RuntimeError("TTS Service not initialized")
 
         try:
-            synthesis_input = texttospeech.SynthesisInput(ssml=ssml_text)
+            audio, _ = self._synthesize_ssml(ssml_text, language_code, voice_name=self.voices.resolve(language_code))
+            return audio
 
-            voice = texttospeech.VoiceSelectionParams(
-                language_code=language_code,
-                ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL,
-            )
+        except Exception as e:
+            logger.error(f"SSML synthesis error: {e}")
+            raise Exception(f"Failed to synthesize SSML: {str(e)}")
 
-            audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3,
-            )
+    def _synthesize_ssml(
+        self,
+        ssml_text: str,
+        language_code: str,
+        voice_gender: str = "NEUTRAL",
+        speaking_rate: float = 1.0,
+        pitch: float = 0.0,
+        with_marks: bool = False,
+        voice_name: Optional[str] = None,
+    ) -> Tuple[bytes, Dict[str, float]]:
+        """
+        One SSML synthesis request
 
+        Returns the MP3 audio and, with `with_marks`, the time in seconds
+        of every <mark> by name.
+        """
+        if voice_gender not in ("MALE", "FEMALE"):
+            voice_gender = "NEUTRAL"
+        if not with_marks:
             response = self.client.synthesize_speech(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config,
+                input=texttospeech.SynthesisInput(ssml=ssml_text),
+                voice=texttospeech.VoiceSelectionParams(
+                    language_code=language_code,
+                    name=voice_name or "",
+                    ssml_gender=texttospeech.SsmlVoiceGender[voice_gender],
+                ),
+                audio_config=texttospeech.AudioConfig(
+                    audio_encoding=texttospeech.AudioEncoding.MP3,
+                    speaking_rate=speaking_rate,
+                    pitch=pitch,
+                ),
+            )
+            return response.audio_content, {}
+
+        beta = texttospeech_v1beta1
+        response = self.beta_client.synthesize_speech(
+            request=beta.SynthesizeSpeechRequest(
+                input=beta.SynthesisInput(ssml=ssml_text),
+                voice=beta.VoiceSelectionParams(
+                    language_code=language_code,
+                    name=voice_name or "",
+                    ssml_gender=beta.SsmlVoiceGender[voice_gender],
+                ),
+                audio_config=beta.AudioConfig(
+                    audio_encoding=beta.AudioEncoding.MP3,
+                    speaking_rate=speaking_rate,
+                    pitch=pitch,
+                    effects_profile_id=["handset-class-device"],  # same profile as synthesize_speech
+                ),
+                enable_time_pointing=[beta.SynthesizeSpeechRequest.TimepointType.SSML_MARK],
             )
+        )
+        return response.audio_content, {tp.mark_name: tp.time_seconds for tp in response.timepoints}
 
-            return response.audio_content
+    async def synthesize_batch(
+        self,
+        texts: List[str],
+        language_code: str = "km-KH",
+        voice_gender: str = "NEUTRAL",
+        speaking_rate: float = 1.0,
+        pitch: float = 0.0,
+        voice_name: Optional[str] = None,
+    ) -> Dict[str, bytes]:
+        """
+        Synthesize many short texts with as few upstream calls as possible
 
-        except Exception as e:
-            logger.error(f"SSML synthesis error: {e}")
-            raise Exception(f"Failed to synthesize SSML: {str(e)}")
+        Texts missing from the cache are joined into SSML documents (up to
+        TTS_BATCH_MAX_SSML_BYTES each) with a <mark> before every item and a
+        pause between items. The audio is cut at the frame boundary in the
+        middle of each pause, using the mark timepoints, and every clip is
+        cached under the same key synthesize_speech uses.
+
+        Returns:
+            MP3 audio per text
+        """
+        if not self.client:
+            raise RuntimeError("TTS Service not initialized")
+
+        voice_gender = voice_gender.upper()
+        resolved = self.voices.resolve(language_code, voice_gender, voice_name)
+        voice_key = resolved or voice_gender
+        clips: Dict[str, bytes] = {}
+        missing: List[str] = []
+        for text in dict.fromkeys(t for t in texts if t.strip()):
+            cached_audio = await cache.get(self._cache_key(text, language_code, voice_key, speaking_rate, pitch))
+            if cached_audio is not None:
+                clips[text] = cached_audio
+            else:
+                missing.append(text)
+
+        for group in self._batch_groups(missing):
+            try:
+                audio, marks = self._synthesize_ssml(
+                    self._batch_ssml(group),
+                    language_code,
+                    voice_gender,
+                    speaking_rate,
+                    pitch,
+                    with_marks=True,
+                    voice_name=resolved,
+                )
+                pieces = self._split_batch(audio, marks, len(group))
+            except Exception as e:
+                logger.warning(f"Batch synthesis of {len(group)} texts failed, synthesizing one by one: {e}")
+                pieces = None
+
+            metrics.incr("tts_batch_requests_total", outcome="split" if pieces else "fallback")
+            if pieces is None:
+                for text in group:
+                    clips[text] = await self.synthesize_speech(text, language_code, voice_gender, speaking_rate, pitch, resolved)
+                continue
+
+            for text, clip in zip(group, pieces):
+                await cache.set(
+                    self._cache_key(text, language_code, voice_key, speaking_rate, pitch),
+                    clip,
+                    ttl=settings.TTS_CACHE_TTL_SECONDS,
+                )
+                clips[text] = clip
+
+        logger.info(f"Batch synthesis: {len(clips) - len(missing)} cached, {len(missing)} synthesized")
+        return clips
+
+    def _batch_ssml(self, texts: List[str]) -> str:
+        pause = f'<break time="{settings.TTS_BATCH_BREAK_MS}ms"/>'
+        items = "".join(
+            f'<mark name="{BATCH_MARK_PREFIX}{i}"/>{escape(text)}{pause}'
+            for i, text in enumerate(texts)
+        )
+        return f"<speak>{items}</speak>"
+
+    def _batch_groups(self, texts: List[str]) -> List[List[str]]:
+        """Group texts so each SSML document stays under the size limit"""
+        groups: List[List[str]] = []
+        current: List[str] = []
+        for text in texts:
+            candidate = current + [text]
+            if current and len(self._batch_ssml(candidate).encode("utf-8")) > settings.TTS_BATCH_MAX_SSML_BYTES:
+                groups.append(current)
+                candidate = [text]
+            current = candidate
+        if current:
+            groups.append(current)
+        return groups
+
+    def _split_batch(self, audio: bytes, marks: Dict[str, float], count: int) -> Optional[List[bytes]]:
+        """Per-item clips cut halfway through the pause before each mark (None if marks are missing)"""
+        starts = [marks.get(f"{BATCH_MARK_PREFIX}{i}") for i in range(count)]
+        if any(start is None for start in starts) or starts != sorted(starts):
+            return None
+        half_pause = settings.TTS_BATCH_BREAK_MS / 2000
+        pieces = split_at(audio, [max(0.0, start - half_pause) for start in starts[1:]])
+        if not all(pieces):
+            return None
+        return pieces
 
 
 # Global service instance
@@ -0,0 +1,120 @@
+"""
+TTS voice catalog
+사용 가능한 TTS 음성 목록 캐시 및 합성 음성 선택
+
+All voices are fetched from Google Cloud TTS once at startup and refreshed
+in the background, so voice listings are served from memory. Every
+synthesis resolves a concrete voice name for (language, gender,
+preference) instead of letting the upstream pick one by gender. The same
+request therefore always uses the same voice, and the voice name can be
+part of the TTS cache key.
+"""
+from google.cloud import texttospeech
+from app.core.config import settings
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def voice_type(name: str) -> str:
+    """Voice technology from a name like km-KH-Standard-A ("Standard")"""
+    parts = name.split("-")
+    return parts[2] if len(parts) >= 4 else ""
+
+
+class VoiceCatalog:
+    """In-memory voice list per language, refreshed periodically"""
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.fetched_at: Optional[float] = None
+        self._by_language: Dict[str, List[Dict[str, Any]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> int:
+        """Fetch all voices (every language) in one call; returns the voice count"""
+        response = await asyncio.to_thread(self.client.list_voices)
+
+        by_language: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for voice in response.voices:
+            entry = {
+                "name": voice.name,
+                "language_codes": list(voice.language_codes),
+                "gender": texttospeech.SsmlVoiceGender(voice.ssml_gender).name,
+                "natural_sample_rate": voice.natural_sample_rate_hertz,
+            }
+            for code in entry["language_codes"]:
+                by_language[code].append(entry)
+
+        preference = settings.TTS_VOICE_TYPE_PREFERENCE
+        rank = {kind: i for i, kind in enumerate(preference)}
+        for voices in by_language.values():
+            voices.sort(key=lambda v: (rank.get(voice_type(v["name"]), len(preference)), v["name"]))
+
+        self._by_language = dict(by_language)
+        self.fetched_at = time.time()
+        count = len(response.voices)
+        logger.info(f"Voice catalog loaded: {count} voices in {len(by_language)} languages")
+        return count
+
+    async def list(self, language_code: str) -> List[Dict[str, Any]]:
+        """Voices for a language, best preferred first"""
+        if self.fetched_at is None:
+            await self.refresh()
+        return self._by_language.get(language_code, [])
+
+    def resolve(self, language_code: str, gender: str = "NEUTRAL", preferred: Optional[str] = None) -> Optional[str]:
+        """
+        Concrete voice name for a synthesis request
+
+        `preferred` may be a voice name of the language or a voice type
+        (Standard, Wavenet, ...). Otherwise the first voice in preference
+        order with the requested gender is chosen, then any voice of the
+        language. Returns None when the catalog has no voice for it.
+        """
+        voices = self._by_language.get(language_code)
+        if not voices:
+            return None
+
+        if preferred:
+            for voice in voices:
+                if voice["name"] == preferred:
+                    return voice["name"]
+            typed = [v for v in voices if voice_type(v["name"]).lower() == preferred.lower()]
+            voices = typed or voices
+
+        for voice in voices:
+            if voice["gender"] == gender.upper():
+                return voice["name"]
+        return voices[0]["name"]
+
+    def defaults(self, language_code: str) -> Dict[str, Optional[str]]:
+        """Voice used for each gender when none is preferred"""
+        return {gender: self.resolve(language_code, gender) for gender in ("NEUTRAL", "FEMALE", "MALE")}
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(settings.TTS_VOICE_REFRESH_SECONDS)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Voice catalog refresh failed, keeping the previous list: {e}")
+
+    async def start(self) -> None:
+        """Load the catalog and start refreshing it (call from app startup)"""
+        if self.client is None or self._task is not None:
+            return
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"Could not load the voice catalog: {e}")
+        self._task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
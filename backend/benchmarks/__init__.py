@@ -0,0 +1,4 @@
+"""
+Performance benchmarks
+성능 측정 스크립트 (python -m benchmarks.<name>)
+"""
@@ -0,0 +1,94 @@
+"""
+Response serialization benchmark: jsonable_encoder + JSONResponse vs orjson
+
+Builds representative payloads for the heaviest routes and times how long
+it takes to turn each into response bytes the old way (plain dict through
+FastAPI's jsonable_encoder and the stdlib-based JSONResponse) and with
+success_response().
+
+Usage:
+    python -m benchmarks.bench_json_responses [--repeat 200]
+"""
+import argparse
+import base64
+import os
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.responses import success_response
+from app.services.scenario_catalog import scenario_catalog
+from app.services.text_alignment import compare_texts
+from benchmarks.bench_text_similarity import build_passage, corrupt
+
+
+def pronunciation_result(words: int) -> dict:
+    expected = build_passage(words)
+    actual = corrupt(expected, rate=0.08)
+    comparison = compare_texts(expected, actual)
+    return {
+        "overall_score": 82.4,
+        "stt_confidence": 91.2,
+        "similarity_score": round(comparison["similarity"], 1),
+        "transcription": actual,
+        "expected_text": expected,
+        "word_analysis": [
+            {"word": w["word"], "confidence": 88.5, "start_time": i * 0.4, "end_time": i * 0.4 + 0.35, "needs_practice": False}
+            for i, w in enumerate(comparison["words"])
+        ],
+        "alignment": comparison["words"],
+        "llm_feedback": {"accuracy_score": 82, "pronunciation_feedback": "모음 길이에 주의하세요.", "suggestions": ["천천히 말해보세요"]},
+        "pronunciation_feedback": "모음 길이에 주의하세요.",
+        "suggestions": ["천천히 말해보세요"],
+        "feedback_source": "local",
+        "grade": "B - 우수",
+    }
+
+
+def payloads() -> dict:
+    audio = base64.b64encode(os.urandom(48 * 1024)).decode("ascii")  # ~6s reply MP3
+    catalog = scenario_catalog.current
+    return {
+        "scenarios/{id}": catalog.get("market"),
+        "voice-conversation": {
+            "user_input": {"transcript": "នេះថ្លៃប៉ុន្មាន", "confidence": 0.93},
+            "ai_response": {
+                "text": "មួយគីឡូ ពីរពាន់រៀល",
+                "translation_kr": "1킬로에 2천 리엘이에요",
+                "key_phrases": ["មួយគីឡូ - 1킬로"],
+                "cultural_note": "",
+                "audio": audio,
+            },
+        },
+        "evaluate-pronunciation": pronunciation_result(12),
+        "evaluate-pronunciation (reading)": pronunciation_result(120),
+        "evaluate-pronunciation-batch": {
+            "results": [pronunciation_result(6) for _ in range(20)],
+            "total": 20,
+        },
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'route':<34} {'bytes':>8} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for route, data in payloads().items():
+        before = timed(lambda: JSONResponse(jsonable_encoder({"success": True, "data": data})).body, args.repeat)
+        after = timed(lambda: success_response(data).body, args.repeat)
+        size = len(success_response(data).body)
+        print(f"{route:<34} {size:>8} {before:>10.3f} {after:>10.3f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Text similarity benchmark: difflib vs grapheme cluster alignment
+
+Usage:
+    python -m benchmarks.bench_text_similarity [--repeat 20]
+"""
+import argparse
+import difflib
+import random
+import time
+
+from app.services.text_alignment import compare_texts
+
+PHRASES = [
+    "នេះថ្លៃប៉ុន្មាន",
+    "សុំថោកបន្តិចបានទេ",
+    "ស្រស់ទេ",
+    "អរគុណច្រើន",
+    "ជំរាបសួរ លោកស្រី",
+    "សុខសប្បាយទេ",
+    "ថ្ងៃនេះមានការងារច្រើនទេ",
+    "ឆ្ងាយប៉ុន្មាន",
+]
+
+
+def build_passage(words: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(PHRASES) for _ in range(words))
+
+
+def corrupt(text: str, rate: float, seed: int = 11) -> str:
+    """Drop or duplicate characters to imitate a learner's reading"""
+    rng = random.Random(seed)
+    out = []
+    for char in text:
+        roll = rng.random()
+        if roll < rate / 2:
+            continue
+        out.append(char)
+        if roll > 1 - rate / 2:
+            out.append(char)
+    return "".join(out)
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'phrases':>8} {'chars':>7} {'difflib ms':>11} {'cluster ms':>11} {'difflib %':>10} {'cluster %':>10}")
+    for size in (5, 50, 200, 600):
+        expected = build_passage(size)
+        actual = corrupt(expected, rate=0.08)
+
+        difflib_ms = timed(lambda: difflib.SequenceMatcher(None, actual.lower(), expected.lower()).ratio(), args.repeat)
+        cluster_ms = timed(lambda: compare_texts(expected, actual), args.repeat)
+        difflib_score = difflib.SequenceMatcher(None, actual.lower(), expected.lower()).ratio() * 100
+        cluster_score = compare_texts(expected, actual)["similarity"]
+
+        print(
+            f"{size:>8} {len(expected):>7} {difflib_ms:>11.2f} {cluster_ms:>11.2f} "
+            f"{difflib_score:>10.1f} {cluster_score:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
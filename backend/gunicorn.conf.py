@@ -0,0 +1,23 @@
+"""
+Gunicorn configuration for the production run mode
+N개의 uvicorn 워커로 실행 (캐시/상태는 CACHE_BACKEND로 공유)
+
+Usage:
+    gunicorn app.main:app -c gunicorn.conf.py
+"""
+from app.core.config import settings
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = settings.WORKER_TIMEOUT_SECONDS
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = "-"
+errorlog = "-"
+loglevel = "debug" if settings.DEBUG else "info"
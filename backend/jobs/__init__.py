@@ -0,0 +1,4 @@
+"""
+Maintenance jobs
+운영 작업 스크립트 (python -m jobs.<name>)
+"""
@@ -0,0 +1,24 @@
+"""
+Rebuild progress rollups from raw evaluation and session rows
+
+Usage:
+    python -m jobs.backfill_progress [--user-id 42]
+"""
+import argparse
+import logging
+
+from app.services.progress_service import progress_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-id", type=int, default=None, help="Rebuild a single user only")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    users = progress_service.rebuild(user_id=args.user_id)
+    print(f"Rebuilt progress rollups for {users} users")
+
+
+if __name__ == "__main__":
+    main()
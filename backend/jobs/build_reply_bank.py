@@ -0,0 +1,124 @@
+"""
+Pre-generate the scenario reply bank served when Gemini is unavailable
+
+For every scenario, replies (text, Korean translation, audio) are generated
+for its key phrases, a few general learner inputs and any extra inputs
+given in a file. Print the results with --show and review the bank file
+before shipping it to field sites.
+
+Usage:
+    python -m jobs.build_reply_bank [--scenario market] [--language-code km-KH] [--inputs inputs.txt]
+    python -m jobs.build_reply_bank --show
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sqlite3
+from typing import List
+
+from app.core.config import settings
+from app.services.llm_service import llm_service
+from app.services.reply_bank import reply_bank
+from app.services.scenario_catalog import scenario_catalog
+from app.services.tts_service import tts_service
+
+LANGUAGES = {"km-KH": "Khmer", "lo-LA": "Lao", "vi-VN": "Vietnamese"}
+
+# Learner inputs that come up in every scenario (Khmer)
+GENERAL_INPUTS = [
+    "ជំរាបសួរ",  # hello
+    "អរគុណ",  # thank you
+    "បាទ",  # yes (male speaker)
+    "ចាស",  # yes (female speaker)
+    "ទេ",  # no
+    "ខ្ញុំមិនយល់ទេ",  # I don't understand
+    "សូមនិយាយយឺតៗ",  # please speak slowly
+    "លាហើយ",  # goodbye
+]
+
+
+def learner_inputs(scenario: str, language_code: str, extra: List[str]) -> List[str]:
+    """Inputs to bank for one scenario"""
+    inputs = list(extra)
+    if language_code == "km-KH":
+        item = scenario_catalog.current.get(scenario)
+        if item is not None:
+            inputs += [p["khmer"] for p in item["key_phrases"] if "..." not in p["khmer"] and "/" not in p["khmer"]]
+        inputs += GENERAL_INPUTS
+    return list(dict.fromkeys(inputs))
+
+
+async def build(scenarios: List[str], language_code: str, extra: List[str]) -> int:
+    language = LANGUAGES[language_code]
+    stored = 0
+    for scenario in scenarios:
+        for text in learner_inputs(scenario, language_code, extra):
+            try:
+                reply = await llm_service.generate_response(
+                    user_input=text,
+                    conversation_context=[],
+                    scenario=scenario,
+                    language=language,
+                )
+            except Exception as e:
+                logging.warning(f"{scenario}: no reply for {text!r}: {e}")
+                continue
+            if reply.get("is_fallback") or reply.get("source") == "reply_bank":
+                logging.warning(f"{scenario}: skipped degraded reply for {text!r}")
+                continue
+
+            audio = None
+            if tts_service.client is not None:
+                audio = await tts_service.synthesize_speech(text=reply["response_text"], language_code=language_code)
+            reply_bank.store(scenario, language, text, reply, audio)
+            stored += 1
+    return stored
+
+
+def show() -> None:
+    conn = sqlite3.connect(reply_bank.path)
+    try:
+        rows = conn.execute(
+            "SELECT id, scenario, language, input_text, reply_json, audio IS NOT NULL "
+            "FROM reply_bank ORDER BY scenario, id"
+        ).fetchall()
+    finally:
+        conn.close()
+    for entry_id, scenario, language, input_text, reply_json, has_audio in rows:
+        reply = json.loads(reply_json)
+        audio = "audio" if has_audio else "no audio"
+        print(f"[{entry_id}] {scenario}/{language} ({audio})")
+        print(f"  learner: {input_text}")
+        print(f"  reply:   {reply['response_text']} / {reply.get('response_translation_kr', '')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", help="Scenario id (repeatable; default all)")
+    parser.add_argument("--language-code", default="km-KH", choices=sorted(LANGUAGES))
+    parser.add_argument("--inputs", help="File with extra learner inputs, one per line")
+    parser.add_argument("--show", action="store_true", help="Print the bank for review instead of building")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.show:
+        show()
+        return
+
+    extra = []
+    if args.inputs:
+        with open(args.inputs, encoding="utf-8") as f:
+            extra = [line.strip() for line in f if line.strip()]
+
+    # Always ask Gemini: a banked answer must never be banked again
+    settings.REPLY_BANK_ENABLED = False
+    settings.LLM_REPLY_DEADLINE_SECONDS = 0
+
+    scenarios = args.scenario or ["general"] + sorted(scenario_catalog.current.scenarios)
+    stored = asyncio.run(build(scenarios, args.language_code, extra))
+    print(f"Stored {stored} replies in {reply_bank.path}")
+
+
+if __name__ == "__main__":
+    main()
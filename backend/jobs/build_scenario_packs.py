@@ -0,0 +1,32 @@
+"""
+Build offline scenario packs (scenario JSON + synthesized audio)
+
+Usage:
+    python -m jobs.build_scenario_packs [--scenario market]
+"""
+import argparse
+import asyncio
+import logging
+
+from app.services.scenario_catalog import scenario_catalog
+from app.services.scenario_packs import scenario_packs
+
+
+async def build(scenario_ids):
+    for scenario_id in scenario_ids:
+        manifest = await scenario_packs.build(scenario_id)
+        missing = len(manifest["missing_audio"])
+        print(f"{scenario_id}: version {manifest['version']}, {len(manifest['audio'])} clips, {missing} missing")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenario", action="append", help="Scenario id (repeatable; default all)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(build(args.scenario or sorted(scenario_catalog.current.scenarios)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+-- Spaced repetition scheduling for vocabulary_progress
+-- 기존 데이터베이스에 복습 일정 컬럼과 인덱스 추가
+
+ALTER TABLE vocabulary_progress ADD COLUMN IF NOT EXISTS ease_factor FLOAT DEFAULT 2.5;
+ALTER TABLE vocabulary_progress ADD COLUMN IF NOT EXISTS interval_days FLOAT DEFAULT 0;
+ALTER TABLE vocabulary_progress ADD COLUMN IF NOT EXISTS repetitions INTEGER DEFAULT 0;
+ALTER TABLE vocabulary_progress ADD COLUMN IF NOT EXISTS lapses INTEGER DEFAULT 0;
+ALTER TABLE vocabulary_progress ADD COLUMN IF NOT EXISTS next_review_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+-- Built concurrently so large progress tables stay writable
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_vocabulary_progress_user_due
+    ON vocabulary_progress(user_id, next_review_at);
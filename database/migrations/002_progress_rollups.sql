@@ -0,0 +1,23 @@
+-- Materialized progress rollups for the dashboard
+-- 사용자별 학습 통계 집계 테이블 추가
+-- After applying, fill the table from existing rows:
+--   cd backend && python -m jobs.backfill_progress
+
+ALTER TABLE pronunciation_evaluations ADD COLUMN IF NOT EXISTS scenario VARCHAR(50);
+
+CREATE TABLE IF NOT EXISTS user_progress_rollups (
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    scenario VARCHAR(50) NOT NULL,
+    attempt_count INTEGER DEFAULT 0,
+    score_sum FLOAT DEFAULT 0,
+    best_score FLOAT,
+    last_score FLOAT,
+    session_count INTEGER DEFAULT 0,
+    session_score_sum FLOAT DEFAULT 0,
+    current_streak INTEGER DEFAULT 0,
+    longest_streak INTEGER DEFAULT 0,
+    last_practice_date DATE,
+    weak_words JSONB DEFAULT '{}',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, scenario)
+);
@@ -43,6 +43,7 @@ CREATE TABLE IF NOT EXISTS pronunciation_evaluations (
     id SERIAL PRIMARY KEY,
     user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
     session_id INTEGER REFERENCES conversation_sessions(id) ON DELETE CASCADE,
+    scenario VARCHAR(50), -- Drill scenario when not part of a session
     message_id INTEGER REFERENCES conversation_messages(id) ON DELETE CASCADE,
     transcript TEXT NOT NULL,
     expected_text TEXT,
@@ -78,15 +79,42 @@ CREATE TABLE IF NOT EXISTS vocabulary_progress (
     times_practiced INTEGER DEFAULT 0,
     times_correct INTEGER DEFAULT 0,
     last_practiced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Spaced repetition (SM-2) state
+    ease_factor FLOAT DEFAULT 2.5,
+    interval_days FLOAT DEFAULT 0,
+    repetitions INTEGER DEFAULT 0,
+    lapses INTEGER DEFAULT 0,
+    next_review_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(user_id, word, language_code)
 );
 
+-- Per-user, per-scenario progress rollups (scenario 'all' = overall)
+-- Maintained together with pronunciation_evaluations / conversation_sessions writes
+CREATE TABLE IF NOT EXISTS user_progress_rollups (
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    scenario VARCHAR(50) NOT NULL,
+    attempt_count INTEGER DEFAULT 0,
+    score_sum FLOAT DEFAULT 0,
+    best_score FLOAT,
+    last_score FLOAT,
+    session_count INTEGER DEFAULT 0,
+    session_score_sum FLOAT DEFAULT 0,
+    current_streak INTEGER DEFAULT 0,
+    longest_streak INTEGER DEFAULT 0,
+    last_practice_date DATE,
+    weak_words JSONB DEFAULT '{}', -- word -> miss count
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, scenario)
+);
+
 -- Indexes for performance
 CREATE INDEX idx_conversation_sessions_user ON conversation_sessions(user_id);
 CREATE INDEX idx_conversation_messages_session ON conversation_messages(session_id);
 CREATE INDEX idx_pronunciation_evaluations_user ON pronunciation_evaluations(user_id);
 CREATE INDEX idx_learning_progress_user_scenario ON learning_progress(user_id, scenario);
 CREATE INDEX idx_vocabulary_progress_user ON vocabulary_progress(user_id);
+-- Due-review queue: WHERE user_id = ? AND next_review_at <= ? ORDER BY next_review_at
+CREATE INDEX idx_vocabulary_progress_user_due ON vocabulary_progress(user_id, next_review_at);
 
 -- Insert sample user for testing
 INSERT INTO users (username, email, full_name, native_language, target_language)